@@ -0,0 +1,141 @@
+# BYTECODE
+# A compiled function body or program is a list of (opcode, argument) instructions run by the
+# virtual machine on a stack of values. Numbers and strings are kept on the stack as plain Python
+# ints, floats and strs; functions are kept as the Function, Lambda and BuiltInFunction values of
+# the tree-walking interpreter. Every instruction also remembers the AST node it was compiled
+# from, which is where its errors are reported.
+
+# Opcodes, with the meaning of their argument.
+LOAD_CONST = 0      # Index of a constant to push.
+LOAD_LOCAL = 1      # Slot of the current frame to push; an unbound slot is looked up in the callers.
+LOAD_GLOBAL = 2     # Index of a name to push from the global symbol table.
+LOAD_NAME = 3       # Index of a name to push, looked up through the frames of the callers.
+STORE_LOCAL = 4     # Slot of the current frame the value on top is bound to. The value stays.
+STORE_NAME = 5      # Index of a name the value on top is bound to in the current symbol table.
+MAKE_FUNCTION = 6   # Index of the function constant to push.
+ADD = 7             # Binary operators: pop the right operand and replace the left one by the result.
+SUB = 8
+MUL = 9
+DIV = 10
+MOD = 11
+EQ = 12
+NE = 13
+LT = 14
+GT = 15
+LTE = 16
+GTE = 17
+AND = 18
+OR = 19
+NEGATE = 20         # Unary operators: replace the operand by the result.
+NOT = 21
+JUMP_IF_TRUE = 22   # Target to jump to, keeping the value on top, if it is 1 ('or' short-circuits).
+JUMP_IF_FALSE = 23  # Target to jump to, keeping the value on top, if it is 0 ('and' short-circuits).
+JUMP_IF_TRUE_NOTED = 24     # Like JUMP_IF_TRUE, and notes which way it went for the errors of the
+JUMP_IF_FALSE_NOTED = 25    # operator the value is the right operand of.
+CALL = 26           # Number of arguments on top of the function to call.
+RETURN = 27         # Returns the value on top to the caller.
+POP = 28            # Drops the value on top.
+ADD_RESULT = 29     # Moves the value on top to the list of the program's results.
+STOP = 30           # Stops the program, as a return outside of a function does.
+HALT = 31           # Ends the program and gives the list of its results.
+
+OPCODES = tuple(range(32))
+
+OPCODE_NAMES = [
+    'LOAD_CONST', 'LOAD_LOCAL', 'LOAD_GLOBAL', 'LOAD_NAME', 'STORE_LOCAL', 'STORE_NAME', 'MAKE_FUNCTION',
+    'ADD', 'SUB', 'MUL', 'DIV', 'MOD', 'EQ', 'NE', 'LT', 'GT', 'LTE', 'GTE', 'AND', 'OR', 'NEGATE', 'NOT',
+    'JUMP_IF_TRUE', 'JUMP_IF_FALSE', 'JUMP_IF_TRUE_NOTED', 'JUMP_IF_FALSE_NOTED',
+    'CALL', 'RETURN', 'POP', 'ADD_RESULT', 'STOP', 'HALT',
+]
+
+# Opcodes whose argument is the index of a name.
+NAME_OPCODES = {LOAD_GLOBAL, LOAD_NAME, STORE_NAME}
+# Opcodes whose argument is a slot.
+SLOT_OPCODES = {LOAD_LOCAL, STORE_LOCAL}
+# Opcodes whose argument is the index of a constant.
+CONST_OPCODES = {LOAD_CONST, MAKE_FUNCTION}
+# Opcodes whose argument is the index of an instruction.
+JUMP_OPCODES = {JUMP_IF_TRUE, JUMP_IF_FALSE, JUMP_IF_TRUE_NOTED, JUMP_IF_FALSE_NOTED}
+
+
+# Compiled body of a function, or of a program when arg_names is None.
+class Code:
+    def __init__(self, name, arg_names, layout):
+        self.name = name    # Name of the function, or '<program>'.
+        self.arg_names = arg_names  # Names of the arguments, or None for a program.
+        self.arg_count = len(arg_names or ())
+        self.layout = layout    # Name -> slot in the frames of its calls.
+        self.local_names = list(layout)     # Slot -> name.
+        self.arg_slots = [layout[name] for name in arg_names or ()]   # Slot every argument is bound to.
+        # Whether the arguments are bound to the first slots in order, so their list can become the frame
+        self.simple_args = self.arg_slots == list(range(self.arg_count))
+        self.instructions = []  # (opcode, argument) pairs.
+        self.nodes = []     # Node of every instruction.
+        self.constants = []
+        self.names = []
+        self.lambda_calls = set()   # Indexes of the calls passing a lambda written in their arguments.
+        self.global_names = set()   # Names its functions read from the global symbol table without looking them up.
+        self.constant_indexes = {}  # (type, value) of a number or string constant -> index.
+        self.name_indexes = {}  # Name -> index.
+
+    # Adds an instruction and returns its index.
+    def emit(self, opcode, arg, node):
+        self.instructions.append((opcode, arg))
+        self.nodes.append(node)
+        return len(self.instructions) - 1
+
+    # Points a jump at the next instruction to be added.
+    def patch(self, index):
+        opcode, _ = self.instructions[index]
+        self.instructions[index] = (opcode, len(self.instructions))
+
+    # Returns the index of a constant, adding it if needed. Numbers and strings are added once.
+    def constant_index(self, value):
+        if type(value) in (int, float, str):
+            key = (type(value), value)
+            if key not in self.constant_indexes:
+                self.constant_indexes[key] = len(self.constants)
+                self.constants.append(value)
+            return self.constant_indexes[key]
+        self.constants.append(value)
+        return len(self.constants) - 1
+
+    # Returns the index of a name, adding it if needed.
+    def name_index(self, name):
+        if name not in self.name_indexes:
+            self.name_indexes[name] = len(self.names)
+            self.names.append(name)
+        return self.name_indexes[name]
+
+
+# Returns a readable listing of a code object and of the functions defined in it, with the source
+# line of every instruction that starts a new line.
+def disassemble(code):
+    args = '' if code.arg_names is None else f"({', '.join(code.arg_names)})"
+    lines = [f'Disassembly of {code.name}{args}:']
+    last_line = None
+    for index, (opcode, arg) in enumerate(code.instructions):
+        node = code.nodes[index]
+        line = node.pos_start.ln + 1 if node is not None else None
+        line_text = '' if line == last_line else str(line)
+        last_line = line
+
+        if opcode in NAME_OPCODES:
+            detail = code.names[arg]
+        elif opcode in SLOT_OPCODES:
+            detail = code.local_names[arg]
+        elif opcode in CONST_OPCODES:
+            detail = repr(code.constants[arg])
+        elif opcode in JUMP_OPCODES:
+            detail = f'to {arg}'
+        else:
+            detail = ''
+        arg_text = '' if arg is None else str(arg)
+        lines.append(f"{line_text:>5} {index:>5} {OPCODE_NAMES[opcode]:<20} {arg_text:>4}{f' ({detail})' if detail else ''}".rstrip())
+
+    for constant in code.constants:
+        function_code = getattr(constant, 'code', None)
+        if function_code is not None:
+            lines.append('')
+            lines.append(disassemble(function_code))
+    return '\n'.join(lines)
@@ -0,0 +1,364 @@
+from COMPILER.compiler import can_compile, program_makes_tail_calls, collect_frame_names, reads_name, release_stale_functions, is_short_circuit
+from COMPILER.runtime import *
+from OPTIMIZER.constant_folding import NUMBER_OPERATIONS
+from OPTIMIZER.resolver import body_layout
+
+
+# Raised by a compiled return statement, and caught by the body of the function it returns from,
+# or by the program, which it stops.
+class CompiledReturn(Exception):
+    def __init__(self, value):
+        self.value = value
+
+
+# Body of a function compiled to a closure, kept by the function value as its closure.
+class CompiledBody:
+    def __init__(self, arg_names, layout, run, global_names):
+        self.arg_count = len(arg_names)
+        self.layout = layout    # Name -> slot in the frames of its calls.
+        self.arg_slots = [layout[name] for name in arg_names]
+        # Whether the arguments are bound to the first slots in order, so their list can become the frame
+        self.simple_args = self.arg_slots == list(range(self.arg_count))
+        self.run = run  # Closure taking a frame and giving the value the call returns.
+        self.global_names = global_names    # Names its functions read from the global symbol table without looking them up.
+
+    # Returns the slots of a new frame, with the arguments bound.
+    def bind(self, args):
+        if self.simple_args:
+            if len(self.layout) > len(args):
+                args.extend([None] * (len(self.layout) - len(args)))
+            return args
+        slots = [None] * len(self.layout)
+        for slot, value in zip(self.arg_slots, args):
+            slots[slot] = value
+        return slots
+
+    # Runs the body for a call made by the tree-walking interpreter, taking and giving the
+    # interpreter's values. The function was placed at the call and given the caller's context.
+    def execute(self, function, args):
+        res = RTResult()
+        if len(args) != self.arg_count:
+            return function.check_args(function.arg_names, args)
+        frame = CompiledFrame(function.name, function.context, function, self.layout, self.bind([unwrap(arg) for arg in args]))
+        try:
+            value = self.run(frame)
+        except CompiledError as e:
+            return res.failure(e.error)
+        return res.success(wrap(value))
+
+
+# CLOSURE COMPILER
+# Turns every node of a program into a Python closure once, before it runs, so evaluating the
+# program is a chain of direct calls instead of a dispatch on node type names with a result object
+# per node. Closures take the frame they run in and give back the value, kept as a plain Python
+# number or string like the virtual machine keeps it; errors and returns are raised. Names are
+# read like the bytecode compiler reads them, and numbers are computed directly, with everything
+# else handed to the interpreter's own methods. Every definition becomes one function value that
+# carries its compiled body, and the interpreter runs that body too when it calls the function.
+class ClosureCompiler:
+    def __init__(self, frame_names=None):
+        self.frame_names = frame_names  # Names bound in some frame, or None to look every name up.
+        self.noted = set()  # ids of the 'and' and 'or' nodes whose place may be reported in an error.
+        self.shorted = {}   # Noted node -> whether it short-circuited the last time it ran.
+        self.global_names = set()   # Names the functions compiled read as globals, shared by their bodies.
+
+    # Compiles the body of a function into a CompiledBody.
+    def compile_body(self, arg_names, body_node, should_auto_return):
+        layout = body_layout(arg_names, body_node)
+        if should_auto_return:
+            return CompiledBody(arg_names, layout, self.compile(body_node, layout), self.global_names)
+
+        statements = [self.compile(element_node, layout) for element_node in body_node.element_nodes]
+
+        def run_block(frame):
+            try:
+                for statement in statements:
+                    statement(frame)
+            except CompiledReturn as e:
+                return e.value
+            return 0
+        return CompiledBody(arg_names, layout, run_block, self.global_names)
+
+    # Dispatches node to the compile method of its type. layout is the frame layout of the
+    # function the node is in, or None at the top level.
+    def compile(self, node, layout):
+        method_name = f'compile_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_compile_method)
+        return method(node, layout)
+
+    # Default method for node types closures cannot be made for
+    def no_compile_method(self, node, layout):
+        raise Exception(f'No compile_{type(node).__name__} method defined')
+
+    ###################################
+    # Compiles a number to a closure giving it
+    def compile_NumberNode(self, node, layout):
+        return self.constant(node.tok.value)
+
+    # Compiles a string to a closure giving it
+    def compile_StringNode(self, node, layout):
+        return self.constant(node.tok.value)
+
+    # Compiles a folded constant to a closure giving it
+    def compile_ConstantNode(self, node, layout):
+        return self.constant(node.value)
+
+    # Returns a closure giving a constant.
+    def constant(self, value):
+        def load_constant(frame):
+            return value
+        return load_constant
+
+    # Compiles 'true' and 'false' to reads of the global symbol table
+    def compile_BoolAccessNode(self, node, layout):
+        return self.load_global(node.bool_name_tok.value, node)
+
+    # Compiles a variable access to a read of a slot, of a global, or of the frames of the callers
+    def compile_VarAccessNode(self, node, layout):
+        name = node.var_name_tok.value
+        if layout is not None and name in layout:
+            slot = layout[name]
+
+            def load_local(frame):
+                value = frame.values[slot]
+                if value is None:
+                    # A function defined in the body is only bound once its definition ran
+                    value = frame.parent.symbol_table.get(name)
+                    if value is None:
+                        raise CompiledError(undefined(name, node, frame))
+                    value = unwrap(value)
+                return value
+            return load_local
+
+        if layout is None:
+            return self.load_global(name, node)
+        if self.frame_names is not None and name not in self.frame_names:
+            self.global_names.add(name)
+            return self.load_global(name, node)
+
+        def load_name(frame):
+            value = frame.symbol_table.get(name)
+            if value is None:
+                raise CompiledError(undefined(name, node, frame))
+            return unwrap(value)
+        return load_name
+
+    # Returns a closure reading a name from the global symbol table.
+    def load_global(self, name, node):
+        symbols_get = global_symbol_table.symbols.get
+
+        def load_global(frame):
+            value = symbols_get(name)
+            if type(value) is not Function:
+                if value is None:
+                    raise CompiledError(undefined(name, node, frame))
+                value = unwrap(value)
+            return value
+        return load_global
+
+    # Compiles a binary operation. Numbers are computed directly, and right operands that are
+    # number literals are built into the closure.
+    def compile_BinOpNode(self, node, layout):
+        # A short-circuited 'and' or 'or' takes the place of its left operand, which errors about
+        # the right operand point at
+        right_node = node.right_node
+        while is_short_circuit(right_node):
+            self.noted.add(id(right_node))
+            right_node = right_node.left_node
+
+        left = self.compile(node.left_node, layout)
+        right = self.compile(node.right_node, layout)
+        op = node.op_tok.type
+        operation = NUMBER_OPERATIONS[op]
+        shorted = self.shorted
+
+        def fallback(left_value, right_value, frame):
+            value, error = binary_operation(node, left_value, right_value, frame, shorted)
+            if error:
+                raise CompiledError(error)
+            return value
+
+        if is_short_circuit(node):
+            return self.short_circuit(node, left, right, operation, fallback)
+
+        if op == TT_DIV:
+            def divide(frame):
+                left_value = left(frame)
+                right_value = right(frame)
+                if type(left_value) in NUMBER_TYPES and type(right_value) in NUMBER_TYPES and right_value != 0:
+                    return left_value / right_value
+                return fallback(left_value, right_value, frame)
+            return divide
+
+        if type(node.right_node) is NumberNode:
+            constant = node.right_node.tok.value
+
+            def operate_on_constant(frame):
+                left_value = left(frame)
+                if type(left_value) in NUMBER_TYPES:
+                    return operation(left_value, constant)
+                return fallback(left_value, constant, frame)
+            return operate_on_constant
+
+        def operate(frame):
+            left_value = left(frame)
+            right_value = right(frame)
+            if type(left_value) in NUMBER_TYPES and type(right_value) in NUMBER_TYPES:
+                return operation(left_value, right_value)
+            return fallback(left_value, right_value, frame)
+        return operate
+
+    # Returns the closure of an 'and' or an 'or', giving back the left operand without evaluating
+    # the right one when it is 0 or 1.
+    def short_circuit(self, node, left, right, operation, fallback):
+        shorted = self.shorted
+        noted = id(node) in self.noted
+        stop_value = 1 if node.op_tok.type == TT_OR else 0
+
+        def short_circuit(frame):
+            left_value = left(frame)
+            if left_value == stop_value:
+                if noted:
+                    shorted[node] = True
+                return left_value
+            if type(left_value) not in PLAIN_TYPES:
+                left_value.value    # Fails like the interpreter does for a function
+            if noted:
+                shorted[node] = False
+            right_value = right(frame)
+            if type(left_value) in NUMBER_TYPES and type(right_value) in NUMBER_TYPES:
+                return operation(left_value, right_value)
+            return fallback(left_value, right_value, frame)
+        return short_circuit
+
+    # Compiles a unary operation; '+' gives its operand as it is
+    def compile_UnaryOpNode(self, node, layout):
+        operand_closure = self.compile(node.node, layout)
+        op = node.op_tok.type
+        if op != TT_MINUS and op != TT_NOT:
+            return operand_closure
+        shorted = self.shorted
+
+        def unary(frame):
+            value = operand_closure(frame)
+            if type(value) in NUMBER_TYPES:
+                if op == TT_MINUS:
+                    return value * -1
+                return 1 if value == 0 else 0
+            value, error = unary_operation(node, value, frame, shorted)
+            if error:
+                raise CompiledError(error)
+            return value
+        return unary
+
+    # Compiles a function definition to a closure binding and giving its value
+    def compile_FuncDefNode(self, node, layout):
+        return self.compile_definition(node, layout, Function)
+
+    # Compiles a lambda definition to a closure binding and giving its value
+    def compile_LambdaDefNode(self, node, layout):
+        return self.compile_definition(node, layout, Lambda)
+
+    # Compiles a definition's body and makes the value its closure gives.
+    def compile_definition(self, node, layout, function_class):
+        name = node.var_name_tok.value if node.var_name_tok else None
+        arg_names = [arg_name.value for arg_name in node.arg_name_toks]
+        value = function_class(name, node.body_node, arg_names, node.should_auto_return, node.pure, None, node.frame_layout, node.escapes is not None)
+        value.set_pos(node.pos_start, node.pos_end)
+        value.closure = self.compile_body(arg_names, node.body_node, node.should_auto_return)
+        # Names bound to a lambda are read as a function
+        bound_value = value.copy() if function_class is Lambda else value
+
+        if name is None:
+            return self.constant(value)
+        if layout is None:
+            def define_global(frame):
+                frame.symbol_table.set(name, bound_value)
+                return value
+            return define_global
+
+        slot = layout[name]
+
+        def define_local(frame):
+            frame.values[slot] = bound_value
+            return value
+        return define_local
+
+    # Compiles a call: the function, then its arguments, then the call of its compiled body or of
+    # the value
+    def compile_CallNode(self, node, layout):
+        function_closure = self.compile(node.node_to_call, layout)
+        arg_closures = [self.compile(arg_node, layout) for arg_node in node.arg_nodes]
+        arg_count = len(arg_closures)
+        first = arg_closures[0] if arg_count > 0 else None
+        second = arg_closures[1] if arg_count > 1 else None
+        # Lambdas written in the arguments are bound as functions
+        unwraps_args = any(type(arg_node) is LambdaDefNode for arg_node in node.arg_nodes)
+        shorted = self.shorted
+        compile_function = self.compile_function
+
+        def call(frame):
+            function = function_closure(frame)
+            if arg_count == 1:
+                args = [first(frame)]
+            elif arg_count == 2:
+                args = [first(frame), second(frame)]
+            else:
+                args = [arg_closure(frame) for arg_closure in arg_closures]
+
+            function_type = type(function)
+            if function_type is Function or function_type is Lambda:
+                body = function.closure
+                if body is None:
+                    body = function.closure = compile_function(function)
+                if arg_count != body.arg_count:
+                    raise CompiledError(wrong_arg_count(function, args, node, frame))
+                if unwraps_args:
+                    args = [unwrap(arg) for arg in args]
+                value = body.run(CompiledFrame(function.name, frame, node, body.layout, body.bind(args)))
+                return value.copy() if type(value) is Lambda else value
+
+            value, error = call_value(function, args, node, frame, shorted)
+            if error:
+                raise CompiledError(error)
+            return value
+        return call
+
+    # Compiles the body of a function called without one, like a function an earlier line of the
+    # shell defined or one the tree-walking interpreter made. The frames it can be called from are
+    # those of the program's functions and of the global ones, so it reads names like the program.
+    def compile_function(self, function):
+        return self.compile_body(function.arg_names, function.body_node, function.should_auto_return)
+
+    # Compiles a return to a closure raising its value
+    def compile_ReturnNode(self, node, layout):
+        value_closure = self.compile(node.node_to_return, layout) if node.node_to_return else self.constant(0)
+
+        def return_value(frame):
+            raise CompiledReturn(value_closure(frame))
+        return return_value
+
+
+# Returns whether closures can be made for a program and every function it may call, which run it
+# like the tree-walking interpreter would.
+def can_run_closures(ast):
+    return can_compile(ast, ClosureCompiler) and not program_makes_tail_calls(ast)
+
+
+# Compiles a program to closures and runs them in the context run() made for it. Returns the list
+# of the statements' values, or None if the program returned, and the error it stopped with.
+def run_closures(ast, context):
+    frame_names = collect_frame_names(ast)
+    release_stale_functions(frame_names)
+    compiler = ClosureCompiler(None if reads_name(ast, 'run') else frame_names)
+    statements = [compiler.compile(element_node, None) for element_node in ast.element_nodes]
+
+    results = []
+    try:
+        for statement in statements:
+            results.append(statement(context))
+    except CompiledError as e:
+        return None, e.error
+    except CompiledReturn:
+        return None, None
+    return List([wrap(value) for value in results]).set_context(context).set_pos(ast.pos_start, ast.pos_end), None
@@ -0,0 +1,328 @@
+from COMPILER.bytecode import *
+from INTERPRETER.Interpreter import *
+from OPTIMIZER.nodes import *
+from OPTIMIZER.resolver import frame_layout, body_layout
+
+
+FUNCTION_NODES = (FuncDefNode, LambdaDefNode)
+
+# Opcode of every binary operator.
+BINARY_OPCODES = {
+    TT_PLUS: ADD,
+    TT_MINUS: SUB,
+    TT_MUL: MUL,
+    TT_DIV: DIV,
+    TT_MODULO: MOD,
+    TT_EQ: EQ,
+    TT_NE: NE,
+    TT_LT: LT,
+    TT_GT: GT,
+    TT_LTE: LTE,
+    TT_GTE: GTE,
+    TT_AND: AND,
+    TT_OR: OR,
+}
+
+
+# Returns whether a node's value has no context, like the values derived from 'true' and 'false'.
+def is_contextless(node):
+    node_type = type(node)
+    if node_type is BoolAccessNode:
+        return True
+    if node_type is ConstantNode:
+        return not node.contextual
+    if node_type is BinOpNode:
+        return is_contextless(node.left_node)
+    if node_type is UnaryOpNode:
+        return is_contextless(node.node)
+    return False
+
+
+# Returns whether a node is an 'and' or an 'or'.
+def is_short_circuit(node):
+    return type(node) is BinOpNode and node.op_tok.type in (TT_AND, TT_OR)
+
+
+# Returns the names bound in the frame of some function: those of the program's definitions, and
+# those of the functions already in the global symbol table, like the ones an earlier line of the
+# shell defined.
+def collect_frame_names(ast):
+    names = set()
+    nodes = [ast]
+    for value in global_symbol_table.symbols.values():
+        body_node = getattr(value, 'body_node', None)
+        if body_node is not None:
+            names.update(body_layout(value.arg_names, body_node))
+            nodes.append(body_node)
+    while nodes:
+        node = nodes.pop()
+        if type(node) in FUNCTION_NODES:
+            names.update(frame_layout(node))
+        nodes.extend(children(node))
+    return names
+
+
+# COMPILER
+# Compiles an AST into bytecode for the virtual machine. Scoping is dynamic, so names are compiled
+# like the resolver addresses them: a name bound in the frame of the function reading it is read
+# from its slot, a name no function binds is read from the global symbol table, and the others are
+# looked up through the frames of the callers. Every function definition becomes one Function or
+# Lambda value that all its evaluations give, carrying the code of its body.
+class Compiler:
+    def __init__(self, frame_names=None):
+        self.frame_names = frame_names  # Names bound in some frame, or None to look every name up.
+        self.noted = set()  # ids of the 'and' and 'or' nodes whose place may be reported in an error.
+        self.global_names = set()   # Names the functions compiled read as globals, shared by their code.
+
+    # Compiles a program. Its statements run in the global symbol table.
+    def compile_program(self, ast):
+        code = Code('<program>', None, {})
+        for element_node in ast.element_nodes:
+            self.compile(element_node, code)
+            code.emit(ADD_RESULT, None, element_node)
+        code.emit(HALT, None, ast)
+        return code
+
+    # Compiles the body of a function.
+    def compile_function(self, name, arg_names, body_node, should_auto_return):
+        code = Code(name, arg_names, body_layout(arg_names, body_node))
+        code.global_names = self.global_names
+        if should_auto_return:
+            self.compile(body_node, code)
+        else:
+            for element_node in body_node.element_nodes:
+                self.compile(element_node, code)
+                code.emit(POP, None, element_node)
+            code.emit(LOAD_CONST, code.constant_index(0), body_node)
+        code.emit(RETURN, None, body_node)
+        return code
+
+    # Dispatches node to the compile method of its type
+    def compile(self, node, code):
+        method_name = f'compile_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_compile_method)
+        method(node, code)
+
+    # Default method for node types the virtual machine cannot run
+    def no_compile_method(self, node, code):
+        raise Exception(f'No compile_{type(node).__name__} method defined')
+
+    ###################################
+    # Compiles a number by pushing it
+    def compile_NumberNode(self, node, code):
+        code.emit(LOAD_CONST, code.constant_index(node.tok.value), node)
+
+    # Compiles a string by pushing it
+    def compile_StringNode(self, node, code):
+        code.emit(LOAD_CONST, code.constant_index(node.tok.value), node)
+
+    # Compiles a constant folded by the optimizer by pushing it
+    def compile_ConstantNode(self, node, code):
+        code.emit(LOAD_CONST, code.constant_index(node.value), node)
+
+    # Compiles 'true' and 'false', which are read from the global symbol table
+    def compile_BoolAccessNode(self, node, code):
+        code.emit(LOAD_GLOBAL, code.name_index(node.bool_name_tok.value), node)
+
+    # Compiles a variable access to the slot, global or lookup its name resolves to
+    def compile_VarAccessNode(self, node, code):
+        name = node.var_name_tok.value
+        if name in code.layout:
+            code.emit(LOAD_LOCAL, code.layout[name], node)
+        elif code.arg_names is None:
+            code.emit(LOAD_GLOBAL, code.name_index(name), node)
+        elif self.frame_names is not None and name not in self.frame_names:
+            self.global_names.add(name)
+            code.emit(LOAD_GLOBAL, code.name_index(name), node)
+        else:
+            code.emit(LOAD_NAME, code.name_index(name), node)
+
+    # Compiles a binary operation. 'and' and 'or' jump over their right operand when the left one
+    # is given back as it is.
+    def compile_BinOpNode(self, node, code):
+        self.compile(node.left_node, code)
+        jump = None
+        if is_short_circuit(node):
+            noted = id(node) in self.noted
+            if node.op_tok.type == TT_OR:
+                jump = code.emit(JUMP_IF_TRUE_NOTED if noted else JUMP_IF_TRUE, None, node)
+            else:
+                jump = code.emit(JUMP_IF_FALSE_NOTED if noted else JUMP_IF_FALSE, None, node)
+
+        # A short-circuited 'and' or 'or' takes the place of its left operand, which errors about
+        # the right operand point at
+        right_node = node.right_node
+        while is_short_circuit(right_node):
+            self.noted.add(id(right_node))
+            right_node = right_node.left_node
+        self.compile(node.right_node, code)
+        code.emit(BINARY_OPCODES[node.op_tok.type], None, node)
+        if jump is not None:
+            code.patch(jump)
+
+    # Compiles a unary operation; '+' leaves its operand as it is
+    def compile_UnaryOpNode(self, node, code):
+        self.compile(node.node, code)
+        if node.op_tok.type == TT_MINUS:
+            code.emit(NEGATE, None, node)
+        elif node.op_tok.type == TT_NOT:
+            code.emit(NOT, None, node)
+
+    # Compiles a function definition to push its value and bind its name
+    def compile_FuncDefNode(self, node, code):
+        self.compile_function_definition(node, code, Function)
+
+    # Compiles a lambda definition to push its value and bind its name
+    def compile_LambdaDefNode(self, node, code):
+        self.compile_function_definition(node, code, Lambda)
+
+    # Compiles a definition's body and makes the value it pushes
+    def compile_function_definition(self, node, code, function_class):
+        name = node.var_name_tok.value if node.var_name_tok else None
+        arg_names = [arg_name.value for arg_name in node.arg_name_toks]
+        value = function_class(name, node.body_node, arg_names, node.should_auto_return, node.pure, None, node.frame_layout, node.escapes is not None)
+        value.set_pos(node.pos_start, node.pos_end)
+        value.code = self.compile_function(value.name, arg_names, node.body_node, node.should_auto_return)
+        code.emit(MAKE_FUNCTION, code.constant_index(value), node)
+
+        if name is not None:
+            if code.arg_names is None:
+                code.emit(STORE_NAME, code.name_index(name), node)
+            else:
+                code.emit(STORE_LOCAL, code.layout[name], node)
+
+    # Compiles a call: the function, then its arguments
+    def compile_CallNode(self, node, code):
+        self.compile(node.node_to_call, code)
+        for arg_node in node.arg_nodes:
+            self.compile(arg_node, code)
+        index = code.emit(CALL, len(node.arg_nodes), node)
+        if any(type(arg_node) is LambdaDefNode for arg_node in node.arg_nodes):
+            code.lambda_calls.add(index)
+
+    # Compiles a return, which ends the program outside of a function
+    def compile_ReturnNode(self, node, code):
+        if node.node_to_return:
+            self.compile(node.node_to_return, code)
+        else:
+            code.emit(LOAD_CONST, code.constant_index(0), node)
+        code.emit(STOP if code.arg_names is None else RETURN, None, node)
+
+
+# Compiles a program for the virtual machine. A program that may call run() looks every name it
+# does not bind itself up, since the scripts it runs can define functions binding any name.
+def compile_program(ast):
+    frame_names = collect_frame_names(ast)
+    release_stale_functions(frame_names)
+    return Compiler(None if reads_name(ast, 'run') else frame_names).compile_program(ast)
+
+
+# Compiles the body of a function the program did not define, like one defined by the script of a
+# run() call. Its names are looked up unless they are its own.
+def compile_function(function):
+    return Compiler().compile_function(function.name, function.arg_names, function.body_node, function.should_auto_return)
+
+
+# Drops the compiled bodies of the global functions that read one of the names a new program's
+# frames bind as a global. The program may call them from those frames, so they are compiled again
+# the next time they are called, looking their names up.
+def release_stale_functions(frame_names):
+    for value in global_symbol_table.symbols.values():
+        for attribute in ('code', 'closure', 'transpiled'):
+            compiled = getattr(value, attribute, None)
+            if compiled is not None and not compiled.global_names.isdisjoint(frame_names):
+                setattr(value, attribute, None)
+
+
+# Returns whether a compiler has a method named prefix + the type name of every node of a program
+# and of the functions in the global symbol table it reads, and those read, which the program may
+# call. Lists of statements are compiled by the program or function body that holds them.
+def can_compile(ast, compiler_class, prefix='compile_'):
+    symbols = global_symbol_table.symbols
+    seen_names = set()
+    nodes = [ast]
+    while nodes:
+        node = nodes.pop()
+        node_type = type(node)
+        if node_type is not ListNode and not hasattr(compiler_class, prefix + node_type.__name__):
+            return False
+        if node_type is VarAccessNode and node.tok.value not in seen_names:
+            name = node.tok.value
+            seen_names.add(name)
+            body_node = getattr(symbols.get(name), 'body_node', None)
+            if body_node is not None:
+                nodes.append(body_node)
+        nodes.extend(children(node))
+    return True
+
+
+# Returns the names of the built-in functions that no definition of a program rebinds.
+def builtin_names(ast):
+    names = {name for name, value in global_symbol_table.symbols.items() if isinstance(value, BuiltInFunction)}
+    nodes = [ast]
+    while nodes:
+        node = nodes.pop()
+        if type(node) in FUNCTION_NODES and node.var_name_tok:
+            names.discard(node.var_name_tok.value)
+        nodes.extend(children(node))
+    return names
+
+
+# Returns whether an expression in tail position ends with a call of a function: it is a call,
+# or an 'and' or 'or' whose right operand ends with one. Calls of the built-in functions named in
+# builtins are not counted, since they make no further calls.
+def ends_with_call(node, builtins):
+    while type(node) is BinOpNode and node.op_tok.type in (TT_AND, TT_OR):
+        node = node.right_node
+    if type(node) is not CallNode:
+        return False
+    callee = node.node_to_call
+    return type(callee) is not VarAccessNode or callee.tok.value not in builtins
+
+
+# Returns whether a function body makes calls in tail position, which the tree-walking interpreter
+# makes without using Python's stack.
+def makes_tail_calls(body_node, should_auto_return, builtins):
+    if should_auto_return:
+        return ends_with_call(body_node, builtins)
+    if type(body_node) is ListNode:
+        return any(type(statement) is ReturnNode and statement.node_to_return and ends_with_call(statement.node_to_return, builtins)
+                   for statement in body_node.element_nodes)
+    return False
+
+
+# Returns whether a program, or a function of the global symbol table whose name it or such a
+# function reads, makes calls in tail position. The compiled engines make them on Python's stack,
+# or on a call stack of their own, so a loop of them that runs long enough fails where the
+# tree-walking interpreter does not.
+def program_makes_tail_calls(ast):
+    builtins = builtin_names(ast)
+    symbols = global_symbol_table.symbols
+    seen_names = set()
+    nodes = [ast]
+    while nodes:
+        node = nodes.pop()
+        node_type = type(node)
+        if node_type in FUNCTION_NODES and makes_tail_calls(node.body_node, node.should_auto_return, builtins):
+            return True
+        if node_type is VarAccessNode and node.tok.value not in seen_names:
+            name = node.tok.value
+            seen_names.add(name)
+            body_node = getattr(symbols.get(name), 'body_node', None)
+            if body_node is not None:
+                if makes_tail_calls(body_node, symbols[name].should_auto_return, builtins):
+                    return True
+                nodes.append(body_node)
+        nodes.extend(children(node))
+    return False
+
+
+# Returns whether a name is read anywhere under a node.
+def reads_name(node, name):
+    nodes = [node]
+    while nodes:
+        node = nodes.pop()
+        if type(node) is VarAccessNode and node.var_name_tok.value == name:
+            return True
+        nodes.extend(children(node))
+    return False
@@ -0,0 +1,149 @@
+from COMPILER.compiler import is_contextless, is_short_circuit
+from INTERPRETER.Interpreter import *
+
+
+# Values shared by the compiled engines. Numbers and strings are kept as plain Python ints, floats
+# and strs, and are only turned back into the interpreter's values where the interpreter's own
+# methods decide the result: for operands that are not both numbers, for built-in functions, and
+# for errors.
+
+# Python types numbers and strings are kept as.
+NUMBER_TYPES = (int, float)
+PLAIN_TYPES = (int, float, str)
+
+# Method of Number, String and Value every binary operator falls back on.
+BINARY_METHODS = {
+    TT_PLUS: 'added_to',
+    TT_MINUS: 'subbed_by',
+    TT_MUL: 'multed_by',
+    TT_DIV: 'dived_by',
+    TT_MODULO: 'moduloed_by',
+    TT_EQ: 'get_comparison_eq',
+    TT_NE: 'get_comparison_ne',
+    TT_LT: 'get_comparison_lt',
+    TT_GT: 'get_comparison_gt',
+    TT_LTE: 'get_comparison_lte',
+    TT_GTE: 'get_comparison_gte',
+    TT_AND: 'anded_by',
+    TT_OR: 'ored_by',
+}
+
+
+# Returns the value compiled code keeps for a value of the interpreter. A lambda read or returned
+# is copied into a Function, as the interpreter does.
+def unwrap(value):
+    value_type = type(value)
+    if value_type is Number or value_type is String:
+        return value.value
+    if value_type is Lambda:
+        return value.copy()
+    return value
+
+
+# Returns the interpreter's value for a value kept by compiled code.
+def wrap(value):
+    value_type = type(value)
+    if value_type is int or value_type is float:
+        return Number(value)
+    if value_type is str:
+        return String(value)
+    return value
+
+
+# Frame of a call run by compiled code. It is the context of the call, for tracebacks and for the
+# built-in functions it calls, and its own symbol table, keeping the values of its names in the
+# slots of its function's layout. Where the call was made is only turned into a position when a
+# traceback asks for it.
+class CompiledFrame(Context):
+    def __init__(self, display_name, parent, entry, layout, values):
+        self.display_name = display_name
+        self.parent = parent
+        self.entry = entry  # CallNode the frame was entered from, or the function value a tree-walking call placed there.
+        self.symbol_table = self
+        self.layout = layout    # Name -> slot.
+        self.values = values
+
+    @property
+    def parent_entry_pos(self):
+        return self.entry.pos_start
+
+    # Looks a name up in the frame and then in its callers', without recursing through the frames
+    # the virtual machine nests.
+    def get(self, name):
+        table = self
+        while type(table) is CompiledFrame:
+            slot = table.layout.get(name)
+            value = None if slot is None else table.values[slot]
+            if value is not None:
+                return value
+            table = table.parent.symbol_table
+        return table.get(name)
+
+    def set(self, name, value):
+        self.values[self.layout[name]] = value
+
+    def remove(self, name):
+        self.values[self.layout[name]] = None
+
+
+# Raised by compiled code that calls Python functions for its calls to stop at an error.
+class CompiledError(Exception):
+    def __init__(self, error):
+        self.error = error  # The RTError.
+
+
+# Returns the error of a name that is not defined.
+def undefined(name, node, frame):
+    return RTError(node.pos_start, node.pos_end, f"'{name}' is not defined", frame)
+
+
+# Returns the interpreter's value of an operand, placed where the interpreter would have placed it
+# and in its context. shorted tells which of the 'and' and 'or' nodes an operand's place depends on
+# short-circuited.
+def operand(value, node, frame, shorted):
+    origin = node
+    while is_short_circuit(origin) and shorted.get(origin):
+        origin = origin.left_node
+    value = wrap(value)
+    if type(value) is not Number and type(value) is not String:
+        value = value.copy()
+    value.set_pos(origin.pos_start, origin.pos_end)
+    return value.set_context(None if is_contextless(node) else frame)
+
+
+# Runs a binary operator on operands that are not both numbers through the methods of their values.
+# Returns the result and the error.
+def binary_operation(node, left, right, frame, shorted):
+    left = operand(left, node.left_node, frame, shorted)
+    right = operand(right, node.right_node, frame, shorted)
+    result, error = getattr(left, BINARY_METHODS[node.op_tok.type])(right)
+    if error:
+        return None, error
+    return unwrap(result), None
+
+
+# Runs a unary operator on an operand that is not a number through the methods of its value.
+def unary_operation(node, value, frame, shorted):
+    value = operand(value, node.node, frame, shorted)
+    if node.op_tok.type == TT_MINUS:
+        result, error = value.multed_by(Number(-1))
+    else:
+        result, error = value.notted()
+    if error:
+        return None, error
+    return unwrap(result), None
+
+
+# Returns the error of a call passing the wrong number of arguments.
+def wrong_arg_count(function, args, node, frame):
+    function = function.copy().set_pos(node.pos_start, node.pos_end).set_context(frame)
+    return function.check_args(function.arg_names, args).error
+
+
+# Calls a value that is not a compiled function: a built-in function, or a value that cannot be called.
+def call_value(function, args, node, frame, shorted):
+    value = operand(function, node.node_to_call, frame, shorted).set_pos(node.pos_start, node.pos_end)
+    res = value.execute([wrap(arg) for arg in args])
+    if res.error:
+        return None, res.error
+    return unwrap(res.value.copy()), None
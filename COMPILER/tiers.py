@@ -0,0 +1,42 @@
+from COMPILER.closures import ClosureCompiler
+from COMPILER.compiler import builtin_names, can_compile, collect_frame_names, makes_tail_calls, reads_name
+
+
+# Calls of a function after which its body is compiled.
+TIER_THRESHOLD = 100
+
+
+# TIERS
+# Tiered execution of a program run by the tree-walking interpreter. Every function starts cold
+# and is walked, with its calls counted; once the calls of a body reach the threshold, the body is
+# compiled to closures and every later call of it runs the closures instead. Counts and compiled
+# bodies are kept per body node, since reading a function copies its value and a nested definition
+# makes a new value every time it runs. Bodies are compiled for the names the program's frames
+# bind, so a later program binding one of the names they read as globals drops them again, and
+# their functions go back to being walked. A program with nodes closures cannot be made for, like
+# those the 'inline' pass adds, is only walked. Functions making tail calls stay walked, since their
+# compiled bodies would make the calls on Python's stack, and a loop of them would run out of it.
+class Tiers:
+    def __init__(self, ast, threshold=TIER_THRESHOLD):
+        frame_names = None if reads_name(ast, 'run') else collect_frame_names(ast)
+        self.compiler = ClosureCompiler(frame_names)
+        # A threshold no count reaches keeps every body walked
+        self.threshold = threshold if can_compile(ast, ClosureCompiler) else float('inf')
+        self.builtins = builtin_names(ast)  # Names of the built-in functions the program calls as they are.
+        self.calls = {}     # Body node -> calls counted while it was walked.
+        self.bodies = {}    # Body node -> its CompiledBody, or None if it is always walked.
+
+    # Counts a call of a function, and returns the compiled body the call should run, or None to
+    # walk its body.
+    def hot_body(self, function):
+        body_node = function.body_node
+        if body_node in self.bodies:
+            return self.bodies[body_node]
+        calls = self.calls.get(body_node, 0) + 1
+        self.calls[body_node] = calls
+        if calls < self.threshold:
+            return None
+
+        body = None if makes_tail_calls(function.body_node, function.should_auto_return, self.builtins) else self.compiler.compile_function(function)
+        self.bodies[body_node] = body
+        return body
@@ -0,0 +1,534 @@
+from COMPILER.compiler import can_compile, program_makes_tail_calls, collect_frame_names, reads_name, release_stale_functions, is_short_circuit
+from COMPILER.runtime import *
+from OPTIMIZER.nodes import *
+from OPTIMIZER.resolver import body_layout
+import linecache
+import math
+
+
+FUNCTION_NODES = (FuncDefNode, LambdaDefNode)
+
+# Python expression computing every binary operator on two numbers a and b.
+NUMBER_EXPRESSIONS = {
+    TT_PLUS: '{a} + {b}',
+    TT_MINUS: '{a} - {b}',
+    TT_MUL: '{a} * {b}',
+    TT_DIV: '{a} / {b}',
+    TT_MODULO: '{a} % {b}',
+    TT_EQ: '1 if {a} == {b} else 0',
+    TT_NE: '1 if {a} != {b} else 0',
+    TT_LT: '1 if {a} < {b} else 0',
+    TT_GT: '1 if {a} > {b} else 0',
+    TT_LTE: '1 if {a} <= {b} else 0',
+    TT_GTE: '1 if {a} >= {b} else 0',
+    TT_AND: 'int({a} and {b})',
+    TT_OR: 'int({a} or {b})',
+}
+
+# Built-in function -> Python expression computing its call on one argument a, when the argument
+# is all it reads.
+BUILTIN_EXPRESSIONS = {
+    BuiltInFunction.is_number: '1 if type({a}) in NUMBER_TYPES else 0',
+    BuiltInFunction.is_function: '1 if isinstance({a}, BaseFunction) else 0',
+}
+
+
+# Runs a binary operator on operands that are not both numbers, raising its error.
+def binary(node, left, right, frame, shorted):
+    value, error = binary_operation(node, left, right, frame, shorted)
+    if error:
+        raise CompiledError(error)
+    return value
+
+
+# Runs a unary operator on an operand that is not a number, raising its error.
+def unary(node, value, frame, shorted):
+    value, error = unary_operation(node, value, frame, shorted)
+    if error:
+        raise CompiledError(error)
+    return value
+
+
+# Calls a value that is not a function of the program, raising its error.
+def call(function, args, node, frame, shorted):
+    value, error = call_value(function, args, node, frame, shorted)
+    if error:
+        raise CompiledError(error)
+    return value
+
+
+# Prints a value like the 'print' built-in function does, and gives what it returns.
+def print_value(value):
+    print(str(wrap(value)))
+    return 0
+
+
+# Returns whether a node is a number or string written in the script, or folded into one.
+def is_literal(node):
+    return type(node) in (NumberNode, StringNode, ConstantNode)
+
+
+# Returns the value of a literal node.
+def literal_value(node):
+    return node.value if type(node) is ConstantNode else node.tok.value
+
+
+# Returns the names the definitions in a function's body bind, outside of the functions defined in it.
+def defined_names(body_node):
+    names = set()
+    nodes = [body_node]
+    while nodes:
+        node = nodes.pop()
+        if type(node) in FUNCTION_NODES:
+            if node.var_name_tok:
+                names.add(node.var_name_tok.value)
+            continue
+        nodes.extend(children(node))
+    return names
+
+
+# Python source a program or function was transpiled to, with its source map.
+class Transpiled:
+    def __init__(self, filename, lines, line_nodes, nodes, constants):
+        self.filename = filename    # Name the source is compiled and shown in Python tracebacks under.
+        self.source = '\n'.join(lines) + '\n'
+        self.line_nodes = line_nodes    # Line of the source - 1 -> the node it was transpiled from, or None.
+        self.nodes = nodes  # Index -> node, as the source names the nodes its errors are reported at.
+        self.constants = constants
+
+    # Returns the position in the BENMIT script of a line of the Python source, or None.
+    def original_position(self, lineno):
+        if not 0 < lineno <= len(self.line_nodes):
+            return None
+        node = self.line_nodes[lineno - 1]
+        return node.pos_start if node is not None else None
+
+    # Compiles and runs the source, and returns the names it defines.
+    def load(self, shorted):
+        # Python tracebacks through the source show its lines, which end with their BENMIT position
+        linecache.cache[self.filename] = (len(self.source), None, self.source.splitlines(True), self.filename)
+        namespace = dict(RUNTIME_NAMES)
+        namespace.update(_n=self.nodes, _k=self.constants, _shorted=shorted, _globals_get=global_symbol_table.symbols.get)
+        exec(compile(self.source, self.filename, 'exec'), namespace)
+        return namespace
+
+
+# TRANSPILER
+# Turns an AST into Python source, which is compiled once and then runs as native Python code.
+# Every definition becomes a Python function taking the frame it is called from, the CallNode it
+# is called at and its arguments; arguments are Python locals, and every call still gets a
+# CompiledFrame holding them, which is where callers' names are looked up, since scoping is
+# dynamic, and which tracebacks are made from. Names are read like the bytecode compiler reads
+# them. Expressions become statements on temporaries, so numbers are computed inline and every
+# other operand goes through the interpreter's own methods, raising the error the interpreter
+# would give. Errors name the node they are reported at by its index in the source map, and every
+# line of the source ends with the line and column in the script it came from.
+class Transpiler:
+    def __init__(self, fn, frame_names=None):
+        self.fn = fn
+        self.frame_names = frame_names  # Names bound in some frame, or None to look every name up.
+        self.noted = set()  # ids of the 'and' and 'or' nodes whose place may be reported in an error.
+        self.global_names = set()   # Names the functions transpiled read as globals, shared by them.
+        self.nodes = []     # Source map: index -> node.
+        self.node_indexes = {}  # id of a node -> index.
+        self.constants = []     # Values the source reads, that have no Python literal.
+        self.definitions = {}   # Python name of a body -> (its argument count, constant indexes of the values it is the body of).
+        self.functions = []     # Source lines and nodes of every Python function but the current one.
+        self.lines = None   # (line, node) pairs of the Python function being written.
+        self.saved = []     # State of the Python functions whose writing was interrupted by a definition in them.
+        self.indent = 0
+        self.temp_count = 0
+        self.layout = None  # Frame layout of the function being written, or None at the top level.
+        self.arg_locals = {}    # Argument name -> Python expression reading it.
+
+    # Transpiles a program into a Python function '_program' taking the context to run it in, and
+    # giving the list of its statements' values, or None if it returned.
+    def transpile_program(self, ast):
+        self.begin('def _program(frame):', ast, None, {})
+        self.write('results = []', ast)
+        for element_node in ast.element_nodes:
+            self.write(f'results.append({self.expression(element_node)})', element_node)
+        self.write('return results', ast)
+        self.end()
+        return self.finish()
+
+    # Transpiles the body of a function into a Python function and returns its name.
+    def transpile_function(self, name, arg_names, body_node, should_auto_return):
+        python_name = f'_f{len(self.definitions)}'
+        self.definitions[python_name] = (len(arg_names), [])
+        layout = body_layout(arg_names, body_node)
+        defined = defined_names(body_node)
+
+        arg_locals = {}
+        if len(set(arg_names)) == len(arg_names):
+            params = [f'v_{arg_name}' for arg_name in arg_names]
+            for arg_name, param in zip(arg_names, params):
+                if arg_name not in defined:
+                    arg_locals[arg_name] = param
+            if len(layout) == len(arg_names):
+                values = f"[{', '.join(params)}]"
+            else:
+                values = f"[{', '.join(params + ['None'] * (len(layout) - len(params)))}]"
+        else:
+            # The last argument bound to a name repeated in the arguments is the one its slot keeps
+            params = [f'a{index}' for index in range(len(arg_names))]
+            slots = ['None'] * len(layout)
+            for arg_name, param in zip(arg_names, params):
+                slots[layout[arg_name]] = param
+            for arg_name in arg_names:
+                if arg_name not in defined:
+                    arg_locals[arg_name] = f'values[{layout[arg_name]}]'
+            values = f"[{', '.join(slots)}]"
+
+        self.begin(f"def {python_name}(caller, entry{''.join(', ' + param for param in params)}):", body_node, layout, arg_locals)
+        self.write(f'values = {values}', body_node)
+        self.write(f'frame = CompiledFrame({name!r}, caller, entry, {self.constant(layout)}, values)', body_node)
+        if should_auto_return:
+            self.write_return(body_node)
+        else:
+            for element_node in body_node.element_nodes:
+                if type(element_node) is ReturnNode:
+                    self.write_return(element_node.node_to_return, element_node)
+                    break
+                self.expression(element_node)
+            else:
+                self.write('return 0', body_node)
+        self.end()
+        return python_name
+
+    # Writes the return of the value of a node from a function; a node of None returns 0.
+    def write_return(self, node, return_node=None):
+        if node is None:
+            self.write('return 0', return_node)
+            return
+        value = self.expression(node)
+        # A lambda returned is copied into a function, as the interpreter does
+        self.write(f'return {value}.copy()' if type(node) is LambdaDefNode else f'return {value}', node)
+
+    # Starts writing a Python function, keeping the state of the one it is written while.
+    def begin(self, header, node, layout, arg_locals):
+        self.saved.append((self.lines, self.indent, self.layout, self.arg_locals))
+        self.lines = []
+        self.indent = 0
+        self.layout = layout
+        self.arg_locals = arg_locals
+        self.write(header, node)
+        self.indent = 1
+
+    # Ends the Python function being written and goes back to the one it was written while.
+    def end(self):
+        self.functions.append(self.lines)
+        self.lines, self.indent, self.layout, self.arg_locals = self.saved.pop()
+
+    # Adds a line to the Python function being written.
+    def write(self, line, node):
+        self.lines.append(('    ' * self.indent + line, node))
+
+    # Returns the name of a new temporary.
+    def temp(self):
+        self.temp_count += 1
+        return f't{self.temp_count}'
+
+    # Returns the source naming a node in the source map.
+    def node(self, node):
+        if id(node) not in self.node_indexes:
+            self.node_indexes[id(node)] = len(self.nodes)
+            self.nodes.append(node)
+        return f'_n[{self.node_indexes[id(node)]}]'
+
+    # Returns the source of a constant, as a Python literal if it has one.
+    def constant(self, value):
+        if type(value) is int:
+            return repr(value) if value >= 0 else f'({value!r})'
+        if type(value) is str or (type(value) is float and math.isfinite(value)):
+            return repr(value) if type(value) is str or value >= 0 else f'({value!r})'
+        self.constants.append(value)
+        return f'_k[{len(self.constants) - 1}]'
+
+    # Puts the lines together, with the position in the script of every line coming from a new node.
+    def finish(self):
+        lines = []
+        line_nodes = []
+        for function in self.functions:
+            last_node = None
+            for line, node in function:
+                if node is not None and node is not last_node:
+                    line = f'{line}  # {node.pos_start.ln + 1}:{node.pos_start.col + 1}'
+                last_node = node
+                lines.append(line)
+                line_nodes.append(node)
+            lines.append('')
+            line_nodes.append(None)
+        return Transpiled(f'<transpiled {self.fn}>', lines, line_nodes, self.nodes, self.constants)
+
+    # Writes the statements computing a node's value, and returns a Python expression giving it that
+    # can be read again without running anything.
+    def expression(self, node):
+        method_name = f'transpile_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_transpile_method)
+        return method(node)
+
+    # Default method for node types that cannot be transpiled
+    def no_transpile_method(self, node):
+        raise Exception(f'No transpile_{type(node).__name__} method defined')
+
+    ###################################
+    # Transpiles a number to its literal
+    def transpile_NumberNode(self, node):
+        return self.constant(node.tok.value)
+
+    # Transpiles a string to its literal
+    def transpile_StringNode(self, node):
+        return self.constant(node.tok.value)
+
+    # Transpiles a folded constant to its literal
+    def transpile_ConstantNode(self, node):
+        return self.constant(node.value)
+
+    # Transpiles 'true' and 'false' to reads of the global symbol table
+    def transpile_BoolAccessNode(self, node):
+        return self.load_global(node.bool_name_tok.value, node)
+
+    # Transpiles a variable access to a Python local, a slot, a global or a lookup through the frames of the callers
+    def transpile_VarAccessNode(self, node):
+        name = node.var_name_tok.value
+        if self.layout is not None and name in self.layout:
+            if name in self.arg_locals:
+                return self.arg_locals[name]
+            value = self.temp()
+            self.write(f'{value} = values[{self.layout[name]}]', node)
+            # A function defined in the body is only bound once its definition ran
+            self.write(f'if {value} is None:', node)
+            self.write(f'    {value} = frame.parent.symbol_table.get({name!r})', node)
+            self.write(f'    if {value} is None: raise CompiledError(undefined({name!r}, {self.node(node)}, frame))', node)
+            self.write(f'    {value} = unwrap({value})', node)
+            return value
+
+        if self.layout is None:
+            return self.load_global(name, node)
+        if self.frame_names is not None and name not in self.frame_names:
+            self.global_names.add(name)
+            return self.load_global(name, node)
+
+        value = self.temp()
+        self.write(f'{value} = frame.symbol_table.get({name!r})', node)
+        self.write(f'if {value} is None: raise CompiledError(undefined({name!r}, {self.node(node)}, frame))', node)
+        self.write(f'{value} = unwrap({value})', node)
+        return value
+
+    # Writes a read of a name from the global symbol table.
+    def load_global(self, name, node):
+        value = self.temp()
+        self.write(f'{value} = _globals_get({name!r})', node)
+        self.write(f'if type({value}) is not Function:', node)
+        self.write(f'    if {value} is None: raise CompiledError(undefined({name!r}, {self.node(node)}, frame))', node)
+        self.write(f'    {value} = unwrap({value})', node)
+        return value
+
+    # Transpiles a binary operation. Numbers are computed inline; operands known to be numbers are not checked.
+    def transpile_BinOpNode(self, node):
+        # A short-circuited 'and' or 'or' takes the place of its left operand, which errors about
+        # the right operand point at
+        right_node = node.right_node
+        while is_short_circuit(right_node):
+            self.noted.add(id(right_node))
+            right_node = right_node.left_node
+
+        if is_short_circuit(node):
+            return self.short_circuit(node)
+        left = self.expression(node.left_node)
+        right = self.expression(node.right_node)
+        value = self.temp()
+        self.write(f'{value} = {self.operation(node, left, right)}', node)
+        return value
+
+    # Returns the expression of a binary operator on the values of two expressions.
+    def operation(self, node, left, right):
+        checks = [f'type({operand}) in NUMBER_TYPES' for operand, operand_node in ((left, node.left_node), (right, node.right_node))
+                  if not is_literal(operand_node) or type(literal_value(operand_node)) is str]
+        if node.op_tok.type == TT_DIV and not (is_literal(node.right_node) and literal_value(node.right_node) != 0):
+            checks.append(f'{right} != 0')
+        number_expression = NUMBER_EXPRESSIONS[node.op_tok.type].format(a=left, b=right)
+        fallback = f'binary({self.node(node)}, {left}, {right}, frame, _shorted)'
+        if not checks:
+            return number_expression
+        return f"({number_expression}) if {' and '.join(checks)} else {fallback}"
+
+    # Writes an 'and' or an 'or', which gives back the left operand without running the right one
+    # when it is 0 or 1.
+    def short_circuit(self, node):
+        noted = id(node) in self.noted
+        left = self.expression(node.left_node)
+        value = self.temp()
+        self.write(f"if {left} == {1 if node.op_tok.type == TT_OR else 0}:", node)
+        if noted:
+            self.write(f'    _shorted[{self.node(node)}] = True', node)
+        self.write(f'    {value} = {left}', node)
+        self.write('else:', node)
+        self.indent += 1
+        if not is_literal(node.left_node):
+            self.write(f'if type({left}) not in PLAIN_TYPES: {left}.value', node)  # Fails like the interpreter does for a function
+        if noted:
+            self.write(f'_shorted[{self.node(node)}] = False', node)
+        right = self.expression(node.right_node)
+        self.write(f'{value} = {self.operation(node, left, right)}', node)
+        self.indent -= 1
+        return value
+
+    # Transpiles a unary operation; '+' gives its operand as it is
+    def transpile_UnaryOpNode(self, node):
+        operand = self.expression(node.node)
+        op = node.op_tok.type
+        if op != TT_MINUS and op != TT_NOT:
+            return operand
+        number_expression = f'{operand} * -1' if op == TT_MINUS else f'1 if {operand} == 0 else 0'
+        value = self.temp()
+        self.write(f'{value} = ({number_expression}) if type({operand}) in NUMBER_TYPES else unary({self.node(node)}, {operand}, frame, _shorted)', node)
+        return value
+
+    # Transpiles a function definition to its value, bound to its name
+    def transpile_FuncDefNode(self, node):
+        return self.transpile_definition(node, Function)
+
+    # Transpiles a lambda definition to its value, bound to its name
+    def transpile_LambdaDefNode(self, node):
+        return self.transpile_definition(node, Lambda)
+
+    # Transpiles a definition's body to a Python function, and makes the value it gives.
+    def transpile_definition(self, node, function_class):
+        name = node.var_name_tok.value if node.var_name_tok else None
+        arg_names = [arg_name.value for arg_name in node.arg_name_toks]
+        value = function_class(name, node.body_node, arg_names, node.should_auto_return, node.pure, None, node.frame_layout, node.escapes is not None)
+        value.set_pos(node.pos_start, node.pos_end)
+        python_name = self.transpile_function(value.name, arg_names, node.body_node, node.should_auto_return)
+        self.constants.append(value)
+        indexes = [len(self.constants) - 1]
+        if name is not None:
+            # Names bound to a lambda are read as a function
+            self.constants.append(value.copy() if function_class is Lambda else value)
+            indexes.append(len(self.constants) - 1)
+            if self.layout is None:
+                self.write(f'frame.symbol_table.set({name!r}, _k[{indexes[1]}])', node)
+            else:
+                self.write(f'values[{self.layout[name]}] = _k[{indexes[1]}]', node)
+        self.definitions[python_name][1].extend(indexes)
+        return f'_k[{indexes[0]}]'
+
+    # Transpiles a call: the function, then its arguments, then the call of its Python function or of the value
+    def transpile_CallNode(self, node):
+        function = self.expression(node.node_to_call)
+        if is_literal(node.node_to_call):
+            # A literal is not called, but its attributes are read
+            function_value = self.temp()
+            self.write(f'{function_value} = {function}', node)
+            function = function_value
+        args = [self.expression(arg_node) for arg_node in node.arg_nodes]
+        # Lambdas written in the arguments are bound as functions
+        bound_args = [f'unwrap({arg})' if type(arg_node) is LambdaDefNode else arg for arg, arg_node in zip(args, node.arg_nodes)]
+        call_node = self.node(node)
+        value = self.temp()
+
+        if type(node.node_to_call) is VarAccessNode and len(args) == 1:
+            builtin_name = node.node_to_call.var_name_tok.value
+            builtin = global_symbol_table.symbols.get(builtin_name)
+            if builtin is BuiltInFunction.print:
+                self.write(f'if {function} is {self.constant(builtin)}:', node)
+                self.write(f'    {value} = print_value({args[0]})', node)
+                self.write_call(function, args, bound_args, call_node, value, node, 'elif')
+                return value
+            if builtin in BUILTIN_EXPRESSIONS:
+                self.write(f'if {function} is {self.constant(builtin)}:', node)
+                self.write(f'    {value} = {BUILTIN_EXPRESSIONS[builtin].format(a=args[0])}', node)
+                self.write_call(function, args, bound_args, call_node, value, node, 'elif')
+                return value
+
+        self.write_call(function, args, bound_args, call_node, value, node, 'if')
+        return value
+
+    # Writes the call of a function value, which starts with the keyword given.
+    def write_call(self, function, args, bound_args, call_node, value, node, keyword):
+        self.write(f'{keyword} type({function}) is Function or type({function}) is Lambda:', node)
+        self.write(f'    body = {function}.transpiled', node)
+        self.write('    if body is None:', node)
+        self.write(f'        body = {function}.transpiled = transpile_function({function})', node)
+        self.write(f'    if body.arg_count != {len(args)}: raise CompiledError(wrong_arg_count({function}, [{", ".join(args)}], {call_node}, frame))', node)
+        self.write(f"    {value} = body(frame, {call_node}{''.join(', ' + arg for arg in bound_args)})", node)
+        self.write('else:', node)
+        self.write(f"    {value} = call({function}, [{', '.join(args)}], {call_node}, frame, _shorted)", node)
+
+    # Transpiles a return, which can only end the program here, since functions return from their body
+    def transpile_ReturnNode(self, node):
+        if node.node_to_return:
+            self.expression(node.node_to_return)
+        self.write('return None', node)
+        return '0'
+
+    # Compiles the source and gives every definition's values its Python function.
+    def load(self, transpiled):
+        namespace = transpiled.load({})
+        for python_name, (arg_count, indexes) in self.definitions.items():
+            function = namespace[python_name]
+            function.arg_count = arg_count
+            function.global_names = self.global_names
+            for index in indexes:
+                self.constants[index].transpiled = function
+        return namespace
+
+
+# Names the transpiled source reads besides its own.
+RUNTIME_NAMES = {
+    'CompiledError': CompiledError,
+    'CompiledFrame': CompiledFrame,
+    'Function': Function,
+    'Lambda': Lambda,
+    'BaseFunction': BaseFunction,
+    'NUMBER_TYPES': NUMBER_TYPES,
+    'PLAIN_TYPES': PLAIN_TYPES,
+    'unwrap': unwrap,
+    'undefined': undefined,
+    'wrong_arg_count': wrong_arg_count,
+    'binary': binary,
+    'unary': unary,
+    'call': call,
+    'print_value': print_value,
+}
+
+
+# Transpiles the body of a function the program did not define and returns its Python function.
+# Its names are looked up unless they are its own.
+def transpile_function(function):
+    transpiler = Transpiler(function.name)
+    python_name = transpiler.transpile_function(function.name, function.arg_names, function.body_node, function.should_auto_return)
+    return transpiler.load(transpiler.finish())[python_name]
+
+
+RUNTIME_NAMES['transpile_function'] = transpile_function
+
+
+# Transpiles a program to Python source. A program that may call run() looks every name it does not
+# bind itself up, since the scripts it runs can define functions binding any name.
+def transpile(fn, ast):
+    frame_names = collect_frame_names(ast)
+    release_stale_functions(frame_names)
+    transpiler = Transpiler(fn, None if reads_name(ast, 'run') else frame_names)
+    return transpiler, transpiler.transpile_program(ast)
+
+
+# Returns whether a program and every function it may call can be transpiled, and then run like the
+# tree-walking interpreter would.
+def can_run_transpiled(ast):
+    return can_compile(ast, Transpiler, 'transpile_') and not program_makes_tail_calls(ast)
+
+
+# Transpiles a program, compiles it and runs it in the context run() made for it. Returns the list
+# of the statements' values, or None if the program returned, and the error it stopped with.
+def run_transpiled(fn, ast, context):
+    transpiler, transpiled = transpile(fn, ast)
+    program = transpiler.load(transpiled)['_program']
+    try:
+        results = program(context)
+    except CompiledError as e:
+        return None, e.error
+    if results is None:
+        return None, None
+    return List([wrap(value) for value in results]).set_context(context).set_pos(ast.pos_start, ast.pos_end), None
@@ -0,0 +1,286 @@
+from COMPILER.bytecode import *
+from COMPILER.compiler import Compiler, can_compile, compile_program, compile_function, program_makes_tail_calls
+from COMPILER.runtime import *
+
+
+# Most calls of the program's functions the virtual machine nests, or None to nest them as deep as
+# memory allows.
+MAX_CALL_DEPTH = None
+
+
+# VIRTUAL MACHINE
+# Runs compiled bytecode with one loop, without allocating a result for every node or an
+# interpreter for every call. Calls of the program's functions push a frame on the call stack of
+# the loop instead of recursing in Python, so their depth is only limited by max_depth. The
+# operators compute numbers directly, and hand anything else to the methods of Number, String and
+# Value, so every error is made by the same code the interpreter uses, from the places and
+# contexts the interpreter would have given the operands.
+class VirtualMachine:
+    def __init__(self, max_depth=None):
+        self.shorted = {}   # Noted 'and' or 'or' node -> whether it short-circuited the last time it ran.
+        self.max_depth = float('inf') if max_depth is None else max_depth  # Most calls nested at once.
+
+    # Runs a compiled program in a context. Returns the list of its results, or None if it
+    # returned, and the error it stopped with.
+    def run(self, code, context):
+        (LOAD_CONST, LOAD_LOCAL, LOAD_GLOBAL, LOAD_NAME, STORE_LOCAL, STORE_NAME, MAKE_FUNCTION,
+         ADD, SUB, MUL, DIV, MOD, EQ, NE, LT, GT, LTE, GTE, AND, OR, NEGATE, NOT,
+         JUMP_IF_TRUE, JUMP_IF_FALSE, JUMP_IF_TRUE_NOTED, JUMP_IF_FALSE_NOTED,
+         CALL, RETURN, POP, ADD_RESULT, STOP, HALT) = OPCODES     # Locals are much faster to read than globals
+        globals_get = global_symbol_table.symbols.get
+        shorted = self.shorted
+        max_depth = self.max_depth
+        results = []
+        calls = []  # Saved (code, index of the next instruction, stack, frame, slots) of every caller.
+
+        instructions = code.instructions
+        constants = code.constants
+        pc = 0
+        stack = []
+        frame = context
+        values = None
+
+        while True:
+            op, arg = instructions[pc]
+            pc += 1
+
+            if op == LOAD_LOCAL:
+                value = values[arg]
+                if value is None:
+                    # A function defined in the body is only bound once its definition ran
+                    value = frame.parent.symbol_table.get(code.local_names[arg])
+                    if value is None:
+                        return None, undefined(code.local_names[arg], code.nodes[pc - 1], frame)
+                    value = unwrap(value)
+                stack.append(value)
+
+            elif op == LOAD_CONST:
+                stack.append(constants[arg])
+
+            elif op == LOAD_GLOBAL:
+                value = globals_get(code.names[arg])
+                if type(value) is not Function:
+                    if value is None:
+                        return None, undefined(code.names[arg], code.nodes[pc - 1], frame)
+                    value = unwrap(value)
+                stack.append(value)
+
+            elif op == CALL:
+                function = stack[-arg - 1]
+                function_type = type(function)
+                if function_type is Function or function_type is Lambda:
+                    function_code = function.code
+                    if function_code is None:
+                        function_code = function.code = compile_function(function)
+                    if arg != function_code.arg_count:
+                        return None, wrong_arg_count(function, stack[len(stack) - arg:], code.nodes[pc - 1], frame)
+                    if len(calls) >= max_depth:
+                        # run() reports it like running out of Python's stack
+                        raise RecursionError('maximum call depth exceeded')
+
+                    args = stack[-arg:] if arg else []
+                    del stack[-arg - 1:]
+                    if code.lambda_calls and pc - 1 in code.lambda_calls:
+                        args = [unwrap(value) for value in args]
+                    slot_count = len(function_code.layout)
+                    if function_code.simple_args:
+                        if slot_count > arg:
+                            args.extend([None] * (slot_count - arg))
+                    else:
+                        slots = [None] * slot_count
+                        for slot, value in zip(function_code.arg_slots, args):
+                            slots[slot] = value
+                        args = slots
+
+                    calls.append((code, pc, stack, frame, values))
+                    frame = CompiledFrame(function.name, frame, code.nodes[pc - 1], function_code.layout, args)
+                    values = args
+                    code = function_code
+                    instructions = code.instructions
+                    constants = code.constants
+                    pc = 0
+                    stack = []
+                else:
+                    args = stack[-arg:] if arg else []
+                    del stack[-arg - 1:]
+                    value, error = call_value(function, args, code.nodes[pc - 1], frame, shorted)
+                    if error:
+                        return None, error
+                    stack.append(value)
+
+            elif op == RETURN:
+                value = stack[-1]
+                if type(value) is Lambda:
+                    value = value.copy()
+                code, pc, stack, frame, values = calls.pop()
+                instructions = code.instructions
+                constants = code.constants
+                stack.append(value)
+
+            elif op == JUMP_IF_TRUE:
+                value = stack[-1]
+                if value == 1:
+                    pc = arg
+                elif type(value) not in PLAIN_TYPES:
+                    value.value     # Fails like the interpreter does for a function
+
+            elif op == JUMP_IF_FALSE:
+                value = stack[-1]
+                if value == 0:
+                    pc = arg
+                elif type(value) not in PLAIN_TYPES:
+                    value.value
+
+            elif op == EQ:
+                right = stack.pop()
+                left = stack[-1]
+                if type(left) in NUMBER_TYPES and type(right) in NUMBER_TYPES:
+                    stack[-1] = 1 if left == right else 0
+                else:
+                    stack[-1], error = binary_operation(code.nodes[pc - 1], left, right, frame, shorted)
+                    if error:
+                        return None, error
+
+            elif op == SUB:
+                right = stack.pop()
+                left = stack[-1]
+                if type(left) in NUMBER_TYPES and type(right) in NUMBER_TYPES:
+                    stack[-1] = left - right
+                else:
+                    stack[-1], error = binary_operation(code.nodes[pc - 1], left, right, frame, shorted)
+                    if error:
+                        return None, error
+
+            elif op == ADD:
+                right = stack.pop()
+                left = stack[-1]
+                if type(left) in NUMBER_TYPES and type(right) in NUMBER_TYPES:
+                    stack[-1] = left + right
+                elif type(left) is str and type(right) is str:
+                    stack[-1] = left + right
+                else:
+                    stack[-1], error = binary_operation(code.nodes[pc - 1], left, right, frame, shorted)
+                    if error:
+                        return None, error
+
+            elif op == MUL:
+                right = stack.pop()
+                left = stack[-1]
+                if type(left) in NUMBER_TYPES and type(right) in NUMBER_TYPES:
+                    stack[-1] = left * right
+                else:
+                    stack[-1], error = binary_operation(code.nodes[pc - 1], left, right, frame, shorted)
+                    if error:
+                        return None, error
+
+            elif op == OR:
+                right = stack.pop()
+                left = stack[-1]
+                if type(left) in NUMBER_TYPES and type(right) in NUMBER_TYPES:
+                    stack[-1] = int(left or right)
+                else:
+                    stack[-1], error = binary_operation(code.nodes[pc - 1], left, right, frame, shorted)
+                    if error:
+                        return None, error
+
+            elif op == AND:
+                right = stack.pop()
+                left = stack[-1]
+                if type(left) in NUMBER_TYPES and type(right) in NUMBER_TYPES:
+                    stack[-1] = int(left and right)
+                else:
+                    stack[-1], error = binary_operation(code.nodes[pc - 1], left, right, frame, shorted)
+                    if error:
+                        return None, error
+
+            elif op == LT or op == GT or op == LTE or op == GTE or op == NE:
+                right = stack.pop()
+                left = stack[-1]
+                if type(left) in NUMBER_TYPES and type(right) in NUMBER_TYPES:
+                    if op == LT:
+                        result = left < right
+                    elif op == GT:
+                        result = left > right
+                    elif op == LTE:
+                        result = left <= right
+                    elif op == GTE:
+                        result = left >= right
+                    else:
+                        result = left != right
+                    stack[-1] = 1 if result else 0
+                else:
+                    stack[-1], error = binary_operation(code.nodes[pc - 1], left, right, frame, shorted)
+                    if error:
+                        return None, error
+
+            elif op == DIV or op == MOD:
+                right = stack.pop()
+                left = stack[-1]
+                if type(left) in NUMBER_TYPES and type(right) in NUMBER_TYPES and (op == MOD or right != 0):
+                    stack[-1] = left / right if op == DIV else left % right
+                else:
+                    stack[-1], error = binary_operation(code.nodes[pc - 1], left, right, frame, shorted)
+                    if error:
+                        return None, error
+
+            elif op == NEGATE or op == NOT:
+                value = stack[-1]
+                if type(value) in NUMBER_TYPES:
+                    stack[-1] = value * -1 if op == NEGATE else (1 if value == 0 else 0)
+                else:
+                    stack[-1], error = unary_operation(code.nodes[pc - 1], value, frame, shorted)
+                    if error:
+                        return None, error
+
+            elif op == POP:
+                stack.pop()
+
+            elif op == MAKE_FUNCTION:
+                stack.append(constants[arg])
+
+            elif op == STORE_LOCAL:
+                value = stack[-1]
+                values[arg] = value.copy() if type(value) is Lambda else value
+
+            elif op == LOAD_NAME:
+                value = frame.symbol_table.get(code.names[arg])
+                if value is None:
+                    return None, undefined(code.names[arg], code.nodes[pc - 1], frame)
+                stack.append(unwrap(value))
+
+            elif op == JUMP_IF_TRUE_NOTED or op == JUMP_IF_FALSE_NOTED:
+                value = stack[-1]
+                node = code.nodes[pc - 1]
+                if value == (1 if op == JUMP_IF_TRUE_NOTED else 0):
+                    shorted[node] = True
+                    pc = arg
+                else:
+                    if type(value) not in PLAIN_TYPES:
+                        value.value
+                    shorted[node] = False
+
+            elif op == STORE_NAME:
+                value = stack[-1]
+                frame.symbol_table.set(code.names[arg], value.copy() if type(value) is Lambda else value)
+
+            elif op == ADD_RESULT:
+                results.append(stack.pop())
+
+            elif op == STOP:
+                return None, None
+
+            elif op == HALT:
+                node = code.nodes[pc - 1]
+                elements = [wrap(value) for value in results]
+                return List(elements).set_context(context).set_pos(node.pos_start, node.pos_end), None
+
+# Returns whether the virtual machine can run a program and every function it may call, like the
+# tree-walking interpreter would.
+def can_run_compiled(ast):
+    return can_compile(ast, Compiler) and not program_makes_tail_calls(ast)
+
+
+# Compiles and runs a program on the virtual machine, in the context run() made for it, nesting at
+# most MAX_CALL_DEPTH calls.
+def run_compiled(ast, context):
+    return VirtualMachine(MAX_CALL_DEPTH).run(compile_program(ast), context)
@@ -1,4 +1,7 @@
 from string_with_arrows import *
+from bisect import bisect_right
+import mmap
+import os
 
 
 class Error:
@@ -35,6 +38,12 @@ class InvalidSyntaxError(Error):
         super().__init__(pos_start, pos_end, 'Invalid Syntax', details)
 
 
+class StaticTypeError(Error):
+    def __init__(self, pos_start, pos_end, details=''):
+        # Initializes the StaticTypeError for an operation found to fail before the program runs.
+        super().__init__(pos_start, pos_end, 'Type Error', details)
+
+
 class RTError(Error):
     def __init__(self, pos_start, pos_end, details, context):
         # Initializes the RTError with a specific error name, details, and execution context.
@@ -65,12 +74,13 @@ class RTError(Error):
 
 # POSITION ######
 class Position:
-    def __init__(self, idx, ln, col, fn, ftxt):
+    def __init__(self, idx, ln, col, fn, ftxt, src=None):
         self.idx = idx    # Character index in the file
         self.ln = ln    # Line number in the file
         self.col = col   # Column number in the line
         self.fn = fn    # File name
         self.ftxt = ftxt     # File text (source code)
+        self.src = src  # SourceText with the shared line index, if known
 
     # Advances the position by one character, updating line and column numbers as needed.
     def advance(self, current_char=None):
@@ -85,4 +95,122 @@ class Position:
 
     # Creates a copy of the current position.
     def copy(self):
-        return Position(self.idx, self.ln, self.col, self.fn, self.ftxt)
+        return Position(self.idx, self.ln, self.col, self.fn, self.ftxt, self.src)
+
+
+# OFFSET POSITION ######
+# A position kept as a character offset into a source, which is a SourceText or anything else with
+# fn, text and locate(). The full Position, with its line and column, is only built when they are read.
+class OffsetPosition:
+    __slots__ = ('source', 'offset', 'extra')
+
+    def __init__(self, source, offset, extra=0):
+        self.source = source    # Source the offset refers to
+        self.offset = offset    # Character offset in the source
+        self.extra = extra  # Columns advanced past the offset on the same line
+
+    # Builds the full Position of the offset.
+    def locate(self):
+        return self.source.locate(self.offset)
+
+    @property
+    def idx(self):
+        return self.locate().idx + self.extra
+
+    @property
+    def ln(self):
+        return self.locate().ln
+
+    @property
+    def col(self):
+        return self.locate().col + self.extra
+
+    @property
+    def fn(self):
+        return self.source.fn
+
+    @property
+    def ftxt(self):
+        return self.source.text
+
+    @property
+    def src(self):
+        return self.locate().src
+
+    # Advances the position by one column on the same line.
+    def advance(self, current_char=None):
+        self.extra += 1
+        return self
+
+    # Creates a copy of the current position.
+    def copy(self):
+        return OffsetPosition(self.source, self.offset, self.extra)
+
+
+# SOURCE TEXT ######
+# The text of one source, as a str or a bytes-like object such as a memory-mapped file,
+# together with the line-offset index shared by every Position, error and traceback made from it.
+class SourceText:
+    def __init__(self, fn, text):
+        self.fn = fn    # File name
+        self.text = text    # File text (source code)
+        self.newline = '\n' if isinstance(text, str) else b'\n'
+        self.line_starts = None     # Offset of the first character of every line, built on first use
+
+    # Builds the line-start index with a single scan over the text.
+    def build_line_starts(self):
+        line_starts = [0]
+        find = self.text.find
+        newline = self.newline
+        idx = find(newline)
+        while idx >= 0:
+            line_starts.append(idx + 1)
+            idx = find(newline, idx + 1)
+        self.line_starts = line_starts
+        return line_starts
+
+    # Creates a position for a character offset. Its line and column are only looked up when read.
+    def position(self, idx):
+        return OffsetPosition(self, idx)
+
+    # Creates the Position for a character offset, looking the line up with a binary search.
+    def locate(self, idx):
+        line_starts = self.line_starts or self.build_line_starts()
+        ln = bisect_right(line_starts, idx) - 1
+        col = idx - line_starts[ln]
+        if col and not isinstance(self.text, str):
+            # Columns count characters, not bytes
+            prefix = self.text[line_starts[ln]:idx]
+            if not prefix.isascii():
+                col = len(prefix.decode('utf-8', 'replace'))
+        return Position(idx, ln, col, self.fn, self.text, self)
+
+    # Returns line ln as printed under an error: without its own line break, but with the one
+    # ending the previous line in front of it. Lines past the end are empty.
+    def line_text(self, ln):
+        line_starts = self.line_starts or self.build_line_starts()
+        if ln >= len(line_starts):
+            return ''
+        start = line_starts[ln] - 1 if ln > 0 else 0
+        end = line_starts[ln + 1] - 1 if ln + 1 < len(line_starts) else len(self.text)
+        line = self.text[start:end]
+        return line if isinstance(line, str) else bytes(line).decode('utf-8', 'replace')
+
+    # Unmaps the text of a memory-mapped file. Nothing made from this source may be read afterwards.
+    def close(self):
+        if isinstance(self.text, mmap.mmap):
+            self.text.close()
+
+
+# Size in bytes from which source files are memory-mapped instead of read into memory.
+MMAP_THRESHOLD = 1 << 20
+
+
+# Loads a source file. Big scripts are memory-mapped, so they are not copied into memory; the map
+# stays open until the source is closed or no longer referenced.
+def open_source(fn):
+    with open(fn, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+            return SourceText(fn, f.read())
+        text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return SourceText(fn, text)
@@ -1,4 +1,16 @@
 from PARSER.parser import *
+from PARSER.pratt_parser import PrattParser
+from PARSER.stack_parser import StackParser
+from PARSER.cache import parse_cached
+from OPTIMIZER.hash_consing import hash_cons
+from OPTIMIZER.constant_folding import fold_constants, NUMBER_OPERATIONS
+from OPTIMIZER.inlining import inline_functions
+from OPTIMIZER.purity import analyze_purity
+from OPTIMIZER.type_inference import infer_types
+from OPTIMIZER.dead_code import eliminate_dead_code
+from OPTIMIZER.profile_guided import apply_profile, Profile, store_profile
+from OPTIMIZER.resolver import resolve_names, GLOBAL_ADDRESS
+from OPTIMIZER.escape_analysis import analyze_escapes
 import math
 import os
 
@@ -316,7 +328,32 @@ class List(Value):
         return f'[{", ".join([repr(x) for x in self.elements])}]'
 
 
+# Most results a memoized function remembers.
+MAX_MEMO_SIZE = 10000
+
+
+# Most callers of tail calls in a row that tracebacks show.
+MAX_TAIL_TRACEBACK = 1000
+
+
+# Returns the key memoized functions remember the result for a list of values under, or None if
+# a value is not a number or string.
+def memo_key(values):
+    key = []
+    for value in values:
+        if type(value) is not Number and type(value) is not String:
+            return None
+        key.append((type(value.value), value.value))
+    return tuple(key)
+
+
 class BaseFunction(Value):
+    frame_layout = None     # Name -> slot in the frames of its calls, or None to give them a SymbolTable.
+    detached_args = False   # Whether its calls bind their arguments without making the new frame their context.
+    code = None     # Bytecode of its body, once the virtual machine compiled it.
+    closure = None  # Body compiled to closures, which execute() runs instead of walking the body.
+    transpiled = None   # Python function its body was transpiled to.
+
     def __init__(self, name):
         super().__init__()
         self.name = name or "<anonymous>"
@@ -324,9 +361,43 @@ class BaseFunction(Value):
     # Generates a new context for function execution
     def generate_new_context(self):
         new_context = Context(self.name, self.context, self.pos_start)
-        new_context.symbol_table = SymbolTable(new_context.parent.symbol_table)
+        if self.frame_layout is None:
+            new_context.symbol_table = SymbolTable(new_context.parent.symbol_table)
+        else:
+            new_context.symbol_table = Frame(self.frame_layout, new_context.parent.symbol_table)
+        return new_context
+
+    # Generates the context of a call made in tail position of the body running in context caller.
+    # When the call binds every name the caller's frame holds, nothing can be looked up in that frame
+    # any more, so the new frame looks names up in the caller's parents instead. Tracebacks still
+    # show the caller, until MAX_TAIL_TRACEBACK tail calls in a row did so; from then on the new
+    # context takes the caller's place in them too, so a loop of tail calls keeps few contexts alive.
+    def generate_tail_context(self, caller):
+        new_context = self.generate_new_context()
+        if self.context is caller and all(name in self.arg_names for name in caller.symbol_table.names()):
+            new_context.symbol_table.parent = caller.symbol_table.parent
+            if caller.tail_depth < MAX_TAIL_TRACEBACK:
+                new_context.tail_depth = caller.tail_depth + 1
+            else:
+                new_context.parent = caller.parent
+                new_context.parent_entry_pos = caller.parent_entry_pos
+                new_context.tail_depth = caller.tail_depth
         return new_context
 
+    # Returns the compiled body a call runs instead of walking the body, or None to walk it
+    def compiled_body(self):
+        if self.closure is not None:
+            return self.closure
+        if Interpreter.tiers is not None and self.memo is None:
+            return Interpreter.tiers.hot_body(self)
+        return None
+
+    # Remembers the result of a memoized call if it is a number or string and there is room for it
+    def remember(self, key, value):
+        if len(self.memo) < MAX_MEMO_SIZE and memo_key((value,)) is not None:
+            # The copy is given a context by the calls it is returned to, so it keeps no frame alive
+            self.memo[key] = value.copy().set_context(None)
+
     # Generates an error if the correct number of arguments is not provided
     def check_args(self, arg_names, args):
         res = RTResult()
@@ -344,7 +415,8 @@ class BaseFunction(Value):
         for i in range(len(args)):
             arg_name = arg_names[i]
             arg_value = args[i]
-            arg_value.set_context(exec_ctx)
+            if not self.detached_args:
+                arg_value.set_context(exec_ctx)
             exec_ctx.symbol_table.set(arg_name, arg_value)
 
     # Generates a new context for executing the function
@@ -358,32 +430,49 @@ class BaseFunction(Value):
 
 
 class Function(BaseFunction):
-    def __init__(self, name, body_node, arg_names, should_auto_return):
+    def __init__(self, name, body_node, arg_names, should_auto_return, pure=None, memo=None, frame_layout=None, detached_args=False):
         super().__init__(name)
         self.body_node = body_node
         self.arg_names = arg_names
         self.should_auto_return = should_auto_return
+        self.pure = pure    # Whether calling it has no effects, or None if the purity pass did not run.
+        self.memo = memo    # Arguments key -> result remembered, shared by its copies, or None if it is not memoized.
+        self.frame_layout = frame_layout
+        self.detached_args = detached_args
 
     # Executes the function with the provided arguments
     def execute(self, args):
+        body = self.compiled_body()
+        if body is not None:
+            return body.execute(self, args)
         res = RTResult()
+        key = memo_key(args) if self.memo is not None else None
+        if key is not None and key in self.memo:
+            return res.success(self.memo[key].copy())
         interpreter = Interpreter()
         exec_ctx = self.generate_new_context()
 
         res.register(self.check_and_populate_args(self.arg_names, args, exec_ctx))
         if res.should_return():
             return res
+        if key is None:
+            return interpreter.trampoline(self, exec_ctx)
 
         value = res.register(interpreter.visit(self.body_node, exec_ctx))
         if res.should_return() and res.func_return_value is None:
             return res
 
         ret_value = (value if self.should_auto_return else None) or res.func_return_value or Number.null
+        if key is not None:
+            self.remember(key, ret_value)
         return res.success(ret_value)
 
     # Creates a copy of the function
     def copy(self):
-        copy = Function(self.name, self.body_node, self.arg_names, self.should_auto_return)
+        copy = Function(self.name, self.body_node, self.arg_names, self.should_auto_return, self.pure, self.memo, self.frame_layout, self.detached_args)
+        copy.code = self.code
+        copy.closure = self.closure
+        copy.transpiled = self.transpiled
         copy.set_context(self.context)
         copy.set_pos(self.pos_start, self.pos_end)
         return copy
@@ -394,32 +483,49 @@ class Function(BaseFunction):
 
 
 class Lambda(BaseFunction):
-    def __init__(self, name, body_node, arg_names, should_auto_return):
+    def __init__(self, name, body_node, arg_names, should_auto_return, pure=None, memo=None, frame_layout=None, detached_args=False):
         super().__init__(name)
         self.body_node = body_node
         self.arg_names = arg_names
         self.should_auto_return = should_auto_return
+        self.pure = pure    # Whether calling it has no effects, or None if the purity pass did not run.
+        self.memo = memo    # Arguments key -> result remembered, shared by its copies, or None if it is not memoized.
+        self.frame_layout = frame_layout
+        self.detached_args = detached_args
 
     # Executes the lambda function with the provided arguments
     def execute(self, args):
+        body = self.compiled_body()
+        if body is not None:
+            return body.execute(self, args)
         res = RTResult()
+        key = memo_key(args) if self.memo is not None else None
+        if key is not None and key in self.memo:
+            return res.success(self.memo[key].copy())
         interpreter = Interpreter()
         exec_ctx = self.generate_new_context()
 
         res.register(self.check_and_populate_args(self.arg_names, args, exec_ctx))
         if res.should_return():
             return res
+        if key is None:
+            return interpreter.trampoline(self, exec_ctx)
 
         value = res.register(interpreter.visit(self.body_node, exec_ctx))
         if res.should_return() and res.func_return_value is None:
             return res
 
         ret_value = (value if self.should_auto_return else None) or res.func_return_value or Number.null
+        if key is not None:
+            self.remember(key, ret_value)
         return res.success(ret_value)
 
     # Creates a copy of the lambda function
     def copy(self):
-        copy = Function(self.name, self.body_node, self.arg_names, self.should_auto_return)
+        copy = Function(self.name, self.body_node, self.arg_names, self.should_auto_return, self.pure, self.memo, self.frame_layout, self.detached_args)
+        copy.code = self.code
+        copy.closure = self.closure
+        copy.transpiled = self.transpiled
         copy.set_context(self.context)
         copy.set_pos(self.pos_start, self.pos_end)
         return copy
@@ -430,8 +536,12 @@ class Lambda(BaseFunction):
 
 
 class BuiltInFunction(BaseFunction):
+    # Built-in functions that read input, write output or run other scripts.
+    effectful_names = {'print', 'input', 'input_int', 'clear', 'run'}
+
     def __init__(self, name):
         super().__init__(name)
+        self.pure = name not in BuiltInFunction.effectful_names  # Whether calling it has no effects.
 
     # Executes the built-in function with the provided arguments
     def execute(self, args):
@@ -517,15 +627,19 @@ class BuiltInFunction(BaseFunction):
             fn = fn.value
 
             try:
-                with open(fn, "r") as f:
-                    script = f.read()
+                script = open_source(fn)
             except Exception as e:
                 return RTResult().failure(RTError(self.pos_start, self.pos_end, f"Failed to load script \"{fn}\"\n" + str(e), exec_ctx))
 
             _, error = run(fn, script)
+            if error:
+                error = error.as_string()
+            if not any(getattr(value, 'body_node', None) is not None and value.body_node.src is script for value in global_symbol_table.symbols.values()):
+                # Only the functions the script defined can keep its nodes, and their positions, alive
+                script.close()
 
             if error:
-                return RTResult().failure(RTError(self.pos_start, self.pos_end, f"Failed to finish executing script \"{fn}\"\n" + error.as_string(), exec_ctx))
+                return RTResult().failure(RTError(self.pos_start, self.pos_end, f"Failed to finish executing script \"{fn}\"\n" + error, exec_ctx))
 
             return RTResult().success(Number.null)
 
@@ -544,6 +658,11 @@ BuiltInFunction.run = BuiltInFunction("run")
 
 
 class Interpreter:
+    reuse_values = None     # Values of the reused subexpressions of the scope being run.
+    arg_values = None   # Arguments of the inlined function body being run.
+    profile = None  # Profile being recorded, while run() profiles a program.
+    tiers = None    # Tiers counting the calls of the functions, while run() runs a program tiered.
+
     # Dispatches node to the appropriate visit method based on its type
     def visit(self, node, context):
         method_name = f'visit_{type(node).__name__}'
@@ -573,6 +692,8 @@ class Interpreter:
 
     # Handles variable access by retrieving its value from the symbol table
     def visit_VarAccessNode(self, node, context):
+        if node.address is not None:
+            return self.visit_resolved_VarAccessNode(node, context)
         res = RTResult()
         var_name = node.var_name_tok.value
         value = context.symbol_table.get(var_name)
@@ -583,6 +704,23 @@ class Interpreter:
         value = value.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
         return res.success(value)
 
+    # Handles a variable access the resolver gave an address, reading the slot of the current frame
+    # or the global symbol table without walking the frames of the callers
+    def visit_resolved_VarAccessNode(self, node, context):
+        var_name = node.var_name_tok.value
+        if node.address == GLOBAL_ADDRESS:
+            value = global_symbol_table.symbols.get(var_name)
+        else:
+            frame = context.symbol_table
+            value = frame.values[node.address]
+            # A function defined in the body is only bound once its definition ran
+            if value is None and frame.parent:
+                value = frame.parent.get(var_name)
+
+        if not value:
+            return RTResult().failure(RTError(node.pos_start, node.pos_end, f"'{var_name}' is not defined", context))
+        return RTResult().success(value.copy().set_pos(node.pos_start, node.pos_end).set_context(context))
+
     # Handles boolean access by retrieving its value from the symbol table
     def visit_BoolAccessNode(self, node, context):
         res = RTResult()
@@ -595,56 +733,143 @@ class Interpreter:
         value = value.copy().set_pos(node.pos_start, node.pos_end)
         return res.success(value)
 
-    # Handles binary operations (e.g., +, -, *, /) by evaluating both sides and performing the operation
+    # Handles binary operations (e.g., +, -, *, /) by evaluating both sides and performing the operation.
+    # Outside profiled runs, the node is specialized to the operand types of its first evaluation
     def visit_BinOpNode(self, node, context):
+        if node.numeric:
+            return self.visit_number_BinOpNode(node, context)
+        if node.quick is not None and self.profile is None:
+            return node.quick(self, node, context)
+        return self.visit_generic_BinOpNode(node, context, self.profile is None)
+
+    # Handles a binary operation on operands of any type, specializing the node afterwards if quicken is set
+    def visit_generic_BinOpNode(self, node, context, quicken=False):
         res = RTResult()
         left = res.register(self.visit(node.left_node, context))
         if res.should_return():
             return res
-        if node.op_tok.matches(TT_KEYWORD, 'or'):
-            if left.value == 1:
-                return res.success(left)
-        elif node.op_tok.matches(TT_KEYWORD, 'and'):
-            if left.value == 0:
+        if node.op_tok.type == TT_OR or node.op_tok.type == TT_AND:
+            # 'or' gives back a true left operand and 'and' a false one without evaluating the right one
+            short_circuits = left.value == (1 if node.op_tok.type == TT_OR else 0)
+            if self.profile is not None:
+                self.profile.record_branch(node, short_circuits)
+            if short_circuits:
+                if quicken:
+                    quicken_BinOpNode(node, left, None)
                 return res.success(left)
         right = res.register(self.visit(node.right_node, context))
         if res.should_return():
             return res
 
-        if node.op_tok.type == TT_PLUS:
-            result, error = left.added_to(right)
-        elif node.op_tok.type == TT_MINUS:
-            result, error = left.subbed_by(right)
-        elif node.op_tok.type == TT_MUL:
-            result, error = left.multed_by(right)
-        elif node.op_tok.type == TT_DIV:
-            result, error = left.dived_by(right)
-        elif node.op_tok.type == TT_MODULO:
-            result, error = left.moduloed_by(right)
-        elif node.op_tok.type == TT_EQ:
-            result, error = left.get_comparison_eq(right)
-        elif node.op_tok.type == TT_NE:
-            result, error = left.get_comparison_ne(right)
-        elif node.op_tok.type == TT_LT:
-            result, error = left.get_comparison_lt(right)
-        elif node.op_tok.type == TT_GT:
-            result, error = left.get_comparison_gt(right)
-        elif node.op_tok.type == TT_LTE:
-            result, error = left.get_comparison_lte(right)
-        elif node.op_tok.type == TT_GTE:
-            result, error = left.get_comparison_gte(right)
-        elif node.op_tok.matches(TT_KEYWORD, 'and'):
-            result, error = left.anded_by(right)
-        elif node.op_tok.matches(TT_KEYWORD, 'or'):
-            result, error = left.ored_by(right)
-
+        if self.profile is not None:
+            self.profile.record_operands(node, type(left) is Number and type(right) is Number)
+        if quicken:
+            quicken_BinOpNode(node, left, right)
+        if node.speculative and type(left) is Number and type(right) is Number:
+            return self.number_operation(node, left, right)
+        return self.operation(node, left, right)
+
+    # Performs a binary operation through the methods of the left operand
+    def operation(self, node, left, right):
+        result, error = getattr(left, OPERATION_METHODS[node.op_tok.type])(right)
         if error:
-            return res.failure(error)
+            return RTResult().failure(error)
         else:
-            return res.success(result.set_pos(node.pos_start, node.pos_end))
+            return RTResult().success(result.set_pos(node.pos_start, node.pos_end))
+
+    # Finishes a specialized binary operation whose operands failed its guard, and makes the node generic
+    def deoptimize(self, node, left, right):
+        node.quick = Interpreter.visit_generic_BinOpNode
+        return self.operation(node, left, right)
+
+    # Handles a binary operation specialized to number operands, computing it directly
+    def visit_quick_number_BinOpNode(self, node, context):
+        res = RTResult()
+        left = res.register(self.visit(node.left_node, context))
+        if res.should_return():
+            return res
+        right = res.register(self.visit(node.right_node, context))
+        if res.should_return():
+            return res
+        if type(left) is not Number or type(right) is not Number:
+            return self.deoptimize(node, left, right)
+        value = NUMBER_OPERATIONS[node.op_tok.type](left.value, right.value)
+        return res.success(Number(value).set_context(left.context).set_pos(node.pos_start, node.pos_end))
+
+    # Handles a binary operation specialized to a number and a number literal, computing it with the
+    # literal's value instead of creating a value for it
+    def visit_quick_constant_BinOpNode(self, node, context):
+        res = RTResult()
+        left = res.register(self.visit(node.left_node, context))
+        if res.should_return():
+            return res
+        if type(left) is not Number:
+            return self.deoptimize(node, left, self.visit(node.right_node, context).value)
+        value = NUMBER_OPERATIONS[node.op_tok.type](left.value, node.right_node.tok.value)
+        return res.success(Number(value).set_context(left.context).set_pos(node.pos_start, node.pos_end))
+
+    # Handles a division specialized to number operands
+    def visit_quick_divide_BinOpNode(self, node, context):
+        res = RTResult()
+        left = res.register(self.visit(node.left_node, context))
+        if res.should_return():
+            return res
+        right = res.register(self.visit(node.right_node, context))
+        if res.should_return():
+            return res
+        if type(left) is not Number or type(right) is not Number:
+            return self.deoptimize(node, left, right)
+        if right.value == 0:
+            return res.failure(RTError(right.pos_start, right.pos_end, 'Division by zero', left.context))
+        return res.success(Number(left.value / right.value).set_context(left.context).set_pos(node.pos_start, node.pos_end))
+
+    # Handles an 'and' or 'or' specialized to number operands, which only evaluates the right operand
+    # if the left one does not decide the result
+    def visit_quick_logic_BinOpNode(self, node, context):
+        res = RTResult()
+        left = res.register(self.visit(node.left_node, context))
+        if res.should_return():
+            return res
+        if type(left) is not Number:
+            node.quick = Interpreter.visit_generic_BinOpNode
+            return self.finish_short_circuit(node, left, context)
+        if left.value == (1 if node.op_tok.type == TT_OR else 0):
+            return res.success(left)
+        right = res.register(self.visit(node.right_node, context))
+        if res.should_return():
+            return res
+        if type(right) is not Number:
+            return self.deoptimize(node, left, right)
+        value = NUMBER_OPERATIONS[node.op_tok.type](left.value, right.value)
+        return res.success(Number(value).set_context(left.context).set_pos(node.pos_start, node.pos_end))
+
+    # Finishes an 'and' or 'or' on an evaluated left operand as the generic operation does
+    def finish_short_circuit(self, node, left, context):
+        res = RTResult()
+        if left.value == (1 if node.op_tok.type == TT_OR else 0):
+            return res.success(left)
+        right = res.register(self.visit(node.right_node, context))
+        if res.should_return():
+            return res
+        return self.operation(node, left, right)
+
+    # Handles a '+' specialized to string operands
+    def visit_quick_concat_BinOpNode(self, node, context):
+        res = RTResult()
+        left = res.register(self.visit(node.left_node, context))
+        if res.should_return():
+            return res
+        right = res.register(self.visit(node.right_node, context))
+        if res.should_return():
+            return res
+        if type(left) is not String or type(right) is not String:
+            return self.deoptimize(node, left, right)
+        return res.success(String(left.value + right.value).set_context(left.context).set_pos(node.pos_start, node.pos_end))
 
     # Handles unary operations (e.g., -x, not x) by applying the operation to a single operand
     def visit_UnaryOpNode(self, node, context):
+        if node.numeric:
+            return self.visit_number_UnaryOpNode(node, context)
         res = RTResult()
         number = res.register(self.visit(node.node, context))
         if res.should_return():
@@ -654,7 +879,7 @@ class Interpreter:
         # Apply the appropriate unary operation based on the operator token
         if node.op_tok.type == TT_MINUS:
             number, error = number.multed_by(Number(-1))
-        elif node.op_tok.matches(TT_KEYWORD, 'not'):
+        elif node.op_tok.type == TT_NOT:
             number, error = number.notted()
 
         if error:
@@ -662,18 +887,61 @@ class Interpreter:
         else:
             return res.success(number.set_pos(node.pos_start, node.pos_end))
 
+    # Handles a binary operation whose operands type inference proved to be numbers, computing it
+    # directly instead of through the checked methods of Number
+    def visit_number_BinOpNode(self, node, context):
+        res = RTResult()
+        left = res.register(self.visit(node.left_node, context))
+        if res.should_return():
+            return res
+        op = node.op_tok.type
+        if op == TT_OR:
+            if left.value == 1:
+                return res.success(left)
+        elif op == TT_AND:
+            if left.value == 0:
+                return res.success(left)
+        right = res.register(self.visit(node.right_node, context))
+        if res.should_return():
+            return res
+        return self.number_operation(node, left, right)
+
+    # Computes a binary operation on two numbers directly, as the methods of Number do
+    def number_operation(self, node, left, right):
+        op = node.op_tok.type
+        if op == TT_DIV and right.value == 0:
+            return RTResult().failure(RTError(right.pos_start, right.pos_end, 'Division by zero', left.context))
+        result = Number(NUMBER_OPERATIONS[op](left.value, right.value)).set_context(left.context)
+        return RTResult().success(result.set_pos(node.pos_start, node.pos_end))
+
+    # Handles a unary operation whose operand type inference proved to be a number
+    def visit_number_UnaryOpNode(self, node, context):
+        res = RTResult()
+        number = res.register(self.visit(node.node, context))
+        if res.should_return():
+            return res
+
+        op = node.op_tok.type
+        if op == TT_MINUS:
+            number = Number(number.value * -1).set_context(number.context)
+        elif op == TT_NOT:
+            number = Number(1 if number.value == 0 else 0).set_context(number.context)
+        return res.success(number.set_pos(node.pos_start, node.pos_end))
+
     # Handles string nodes by returning their value
     def visit_StringNode(self, node, context):
         return RTResult().success(String(node.tok.value).set_context(context).set_pos(node.pos_start, node.pos_end))
 
     # Handles function definitions by creating a function object and adding it to the symbol table
     def visit_FuncDefNode(self, node, context):
+        if node.escapes is False:
+            return self.visit_shared_FunctionNode(node, context, Function)
         res = RTResult()
 
         func_name = node.var_name_tok.value if node.var_name_tok else None
         body_node = node.body_node
         arg_names = [arg_name.value for arg_name in node.arg_name_toks]
-        func_value = Function(func_name, body_node, arg_names, node.should_auto_return).set_context(context).set_pos(node.pos_start, node.pos_end)
+        func_value = Function(func_name, body_node, arg_names, node.should_auto_return, node.pure, {} if node.memoize else None, node.frame_layout, node.escapes is not None).set_context(context).set_pos(node.pos_start, node.pos_end)
 
         if node.var_name_tok:
             context.symbol_table.set(func_name, func_value)
@@ -682,20 +950,37 @@ class Interpreter:
 
     # Handles lambda definitions similarly to functions, but for anonymous functions.
     def visit_LambdaDefNode(self, node, context):
+        if node.escapes is False:
+            return self.visit_shared_FunctionNode(node, context, Lambda)
         res = RTResult()
 
         lambda_name = node.var_name_tok.value if node.var_name_tok else None
         body_node = node.body_node
         arg_names = [arg_name.value for arg_name in node.arg_name_toks]
-        lambda_value = Lambda(lambda_name, body_node, arg_names, node.should_auto_return).set_context(context).set_pos(node.pos_start, node.pos_end)
+        lambda_value = Lambda(lambda_name, body_node, arg_names, node.should_auto_return, node.pure, {} if node.memoize else None, node.frame_layout, node.escapes is not None).set_context(context).set_pos(node.pos_start, node.pos_end)
 
         if node.var_name_tok:
             context.symbol_table.set(lambda_name, lambda_value)
 
         return res.success(lambda_value)
 
+    # Handles a definition whose value does not escape by binding and giving the value created the
+    # first time it ran. The value has no context, which every use of it replaces
+    def visit_shared_FunctionNode(self, node, context, function_class):
+        value = node.prototype
+        if value is None:
+            name = node.var_name_tok.value if node.var_name_tok else None
+            arg_names = [arg_name.value for arg_name in node.arg_name_toks]
+            value = function_class(name, node.body_node, arg_names, node.should_auto_return, node.pure, {} if node.memoize else None, node.frame_layout, True)
+            node.prototype = value.set_pos(node.pos_start, node.pos_end)
+
+        if node.var_name_tok:
+            context.symbol_table.set(value.name, value)
+        return RTResult().success(value)
+
     # Handles function calls by evaluating the function and its arguments, then executing it.
-    def visit_CallNode(self, node, context):
+    # With tail set, a call of a walked function is given back as a TailCall instead.
+    def visit_CallNode(self, node, context, tail=False):
         res = RTResult()
         args = []
 
@@ -703,11 +988,18 @@ class Interpreter:
         if res.should_return():
             return res
         value_to_call = value_to_call.copy().set_pos(node.pos_start, node.pos_end)
+        if value_to_call.context is None and type(node.node_to_call) in (FuncDefNode, LambdaDefNode):
+            # A definition called where it stands is shared by its evaluations and runs in the caller's context
+            value_to_call.set_context(context)
 
         for arg_node in node.arg_nodes:
             args.append(res.register(self.visit(arg_node, context)))
             if res.should_return():
                 return res
+        if self.profile is not None:
+            self.profile.record_call(node, getattr(value_to_call, 'body_node', None), memo_key(args))
+        if tail and (type(value_to_call) is Function or type(value_to_call) is Lambda) and value_to_call.memo is None:
+            return TailCall(value_to_call, args, node, context)
         # Execute the function with the evaluated arguments.
         return_value = res.register(value_to_call.execute(args))
         if res.should_return():
@@ -715,6 +1007,126 @@ class Interpreter:
         return_value = return_value.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
         return res.success(return_value)
 
+    # Runs the body of a function in the new context of its call. A call in tail position of the
+    # body is given back to this loop as a TailCall instead of being made, and the loop runs the
+    # function called in place of the body, so tail calls take no Python stack. The 'and' and 'or'
+    # operations the calls were the right operands of are kept on pending, and finished on the value
+    # the last function returns.
+    def trampoline(self, function, exec_ctx):
+        pending = []    # (operator node, left operand, call node or None, its context) to finish, the last one first.
+        while True:
+            # The body is dispatched here rather than through a method of its own, as every frame
+            # live while the body runs is one less level of recursion the program can make
+            body_node = function.body_node
+            if function.should_auto_return:
+                result = self.visit_tail(body_node, exec_ctx)
+            elif type(body_node) is ListNode:
+                result = self.visit_tail_statements(body_node, exec_ctx)
+            else:
+                result = self.visit(body_node, exec_ctx)
+            if type(result) is not TailCall:
+                result = self.body_result(function, result)
+                break
+            call = result
+            for i in range(len(call.pending) - 1, -1, -1):
+                node, left = call.pending[i]
+                # The value of the call is given its position before the innermost operation finishes
+                entry = (node, left, call.node, call.context) if i == 0 else (node, left, None, None)
+                if pending and is_coercion(pending[-1]):
+                    # An 'and' or 'or' that only turns a number result of another one into a number changes nothing
+                    pending[-1] = entry
+                else:
+                    pending.append(entry)
+
+            function = call.function
+            body = function.compiled_body()
+            if body is not None:
+                result = body.execute(function, call.args)
+                break
+            exec_ctx = function.generate_tail_context(exec_ctx)
+            result = function.check_and_populate_args(function.arg_names, call.args, exec_ctx)
+            if result.should_return():
+                break
+
+        if result.error:
+            return result
+        value = result.value
+        while pending:
+            node, left, call_node, context = pending.pop()
+            if call_node is not None:
+                value = value.copy().set_pos(call_node.pos_start, call_node.pos_end).set_context(context)
+            result = self.finish_logic(node, left, value)
+            if result.error:
+                return result
+            value = result.value
+        return RTResult().success(value)
+
+    # Gives the result of a call from the result of walking the body of the function called
+    def body_result(self, function, res):
+        if res.should_return() and res.func_return_value is None:
+            return res
+        return RTResult().success((res.value if function.should_auto_return else None) or res.func_return_value or Number.null)
+
+    # Evaluates an expression in tail position, giving back the TailCall of the call it ends with.
+    # The right operand of an 'and' or 'or' in tail position is in tail position too; a chain of them
+    # is followed in a loop, and the operations are finished on the value it ends with.
+    def visit_tail(self, node, context):
+        logic = []  # (operator node, left operand) of the 'and' and 'or' operations followed, the innermost last.
+        while type(node) is BinOpNode and (node.op_tok.type == TT_OR or node.op_tok.type == TT_AND):
+            result = self.visit(node.left_node, context)
+            if result.should_return():
+                return result
+            left = result.value
+            short_circuits = left.value == (1 if node.op_tok.type == TT_OR else 0)
+            if self.profile is not None and not node.numeric:
+                self.profile.record_branch(node, short_circuits)
+            if short_circuits:
+                break
+            logic.append((node, left))
+            node = node.right_node
+        else:
+            if type(node) is CallNode:
+                result = self.visit_CallNode(node, context, True)
+            else:
+                # Dispatched like visit does, without its frame
+                result = getattr(self, f'visit_{type(node).__name__}', self.no_visit_method)(node, context)
+            if type(result) is TailCall:
+                logic.reverse()
+                result.pending = logic
+                return result
+
+        while logic:
+            if result.should_return():
+                return result
+            node, left = logic.pop()
+            result = self.finish_logic(node, left, result.value)
+        return result
+
+    # Runs the statements of a block body, whose returned expressions are in tail position
+    def visit_tail_statements(self, node, context):
+        res = RTResult()
+        for statement in node.element_nodes:
+            if type(statement) is ReturnNode and statement.node_to_return:
+                result = self.visit_tail(statement.node_to_return, context)
+                if type(result) is TailCall:
+                    return result
+                value = res.register(result)
+                if res.should_return():
+                    return res
+                return res.success_return(value)
+            res.register(self.visit(statement, context))
+            if res.should_return():
+                return res
+        return res.success(None)
+
+    # Finishes an 'and' or 'or' whose left operand did not decide it, as visit_BinOpNode does
+    def finish_logic(self, node, left, right):
+        if self.profile is not None and not node.numeric:
+            self.profile.record_operands(node, type(left) is Number and type(right) is Number)
+        if type(left) is Number and type(right) is Number:
+            return self.number_operation(node, left, right)
+        return self.operation(node, left, right)
+
     # Handles return statements by returning the value from the function
     def visit_ReturnNode(self, node, context):
         res = RTResult()
@@ -728,6 +1140,116 @@ class Interpreter:
 
         return res.success_return(value)
 
+    # Handles an occurrence of a shared subtree by running the subtree and moving its value or error to the occurrence
+    def visit_SharedNode(self, node, context):
+        res = self.visit(node.node, context)
+        if res.error:
+            node.move_error(res.error, context)
+        elif res.value is not None:
+            res.value.set_pos(node.pos_start, node.pos_end)
+        return res
+
+    # Handles a repeated subexpression by evaluating it the first time and reusing its value after that
+    def visit_ReuseNode(self, node, context):
+        value = self.reuse_values[node.slot]
+        if value is None:
+            res = self.visit(node.node, context)
+            if not res.error:
+                self.reuse_values[node.slot] = res.value
+            return res
+        return RTResult().success(value.copy().set_pos(node.pos_start, node.pos_end).set_context(context))
+
+    # Handles a scope by giving it fresh slots for its reused values
+    def visit_ScopeNode(self, node, context):
+        outer_values = self.reuse_values
+        self.reuse_values = [None] * node.slot_count
+        res = self.visit(node.node, context)
+        self.reuse_values = outer_values
+        return res
+
+    # Handles a constant folded before the program ran by creating its value
+    def visit_ConstantNode(self, node, context):
+        value = String(node.value) if type(node.value) is str else Number(node.value)
+        if node.contextual:
+            value.set_context(context)
+        return RTResult().success(value.set_pos(node.pos_start, node.pos_end))
+
+    # Handles a call to an inlined function by running its body in the caller's context, or by
+    # calling the function in the usual way if its name no longer refers to it
+    def visit_InlineCallNode(self, node, context):
+        function = node.function
+        value = context.symbol_table.get(function.var_name_tok.value)
+        if getattr(value, 'body_node', None) is not function.body_node:
+            return self.visit_CallNode(node, context)
+
+        res = RTResult()
+        args = []
+        for arg_node in node.arg_nodes:
+            args.append(res.register(self.visit(arg_node, context)))
+            if res.should_return():
+                return res
+
+        outer_args = self.arg_values
+        self.arg_values = args
+        res = self.visit(node.body, context)
+        self.arg_values = outer_args
+        if res.error:
+            # Errors of the body are reported from the frame the call would have run in
+            if res.error.context is context:
+                res.error.context = Context(value.name, context, node.pos_start)
+            return res
+        return res.success(res.value.copy().set_pos(node.pos_start, node.pos_end).set_context(context))
+
+    # Handles an argument read in an inlined function body
+    def visit_ArgNode(self, node, context):
+        value = self.arg_values[node.index]
+        return RTResult().success(value.copy().set_pos(node.pos_start, node.pos_end).set_context(context))
+
+
+# Method of the left operand every binary operator calls with the right operand.
+OPERATION_METHODS = {
+    TT_PLUS: 'added_to',
+    TT_MINUS: 'subbed_by',
+    TT_MUL: 'multed_by',
+    TT_DIV: 'dived_by',
+    TT_MODULO: 'moduloed_by',
+    TT_EQ: 'get_comparison_eq',
+    TT_NE: 'get_comparison_ne',
+    TT_LT: 'get_comparison_lt',
+    TT_GT: 'get_comparison_gt',
+    TT_LTE: 'get_comparison_lte',
+    TT_GTE: 'get_comparison_gte',
+    TT_AND: 'anded_by',
+    TT_OR: 'ored_by',
+}
+
+
+# Specializes a binary operation node to the types of the operands of its first evaluation, or makes
+# it generic if no specialization fits them. right is None if an 'and' or 'or' short-circuited.
+def quicken_BinOpNode(node, left, right):
+    op = node.op_tok.type
+    if op == TT_AND or op == TT_OR:
+        fits = type(left) is Number and (right is None or type(right) is Number)
+        node.quick = Interpreter.visit_quick_logic_BinOpNode if fits else Interpreter.visit_generic_BinOpNode
+    elif type(left) is Number and type(right) is Number:
+        if type(node.right_node) is NumberNode and not (right.value == 0 and (op == TT_DIV or op == TT_MODULO)):
+            node.quick = Interpreter.visit_quick_constant_BinOpNode
+        elif op == TT_DIV:
+            node.quick = Interpreter.visit_quick_divide_BinOpNode
+        else:
+            node.quick = Interpreter.visit_quick_number_BinOpNode
+    elif op == TT_PLUS and type(left) is String and type(right) is String:
+        node.quick = Interpreter.visit_quick_concat_BinOpNode
+    else:
+        node.quick = Interpreter.visit_generic_BinOpNode
+
+
+# Returns whether a pending 'and' or 'or' of a tail call gives back the number it finishes with as
+# it is: an 'and' whose left operand was a true number, or an 'or' whose left operand was 0.
+def is_coercion(entry):
+    node, left, _, _ = entry
+    return type(left) is Number and (node.op_tok.type == TT_AND or not left.value)
+
 
 # RUNTIME RESULT #######
 class RTResult:
@@ -765,6 +1287,17 @@ class RTResult:
         return self.error or self.func_return_value
 
 
+# A call in tail position of a function body, which the body gives back to Interpreter.trampoline
+# instead of making it.
+class TailCall:
+    def __init__(self, function, args, node, context):
+        self.function = function
+        self.args = args
+        self.node = node    # The call node.
+        self.context = context  # Context the call was made in.
+        self.pending = []   # (operator node, left operand) of the 'and' and 'or' operations left to finish with its value, the innermost first.
+
+
 # CONTEXT #########
 class Context:
     def __init__(self, display_name, parent=None, parent_entry_pos=None):
@@ -772,6 +1305,7 @@ class Context:
         self.parent = parent
         self.parent_entry_pos = parent_entry_pos
         self.symbol_table = None
+        self.tail_depth = 0     # Callers of tail calls in a row that tracebacks show under this context.
 
 
 # SYMBOL TABLE
@@ -789,10 +1323,39 @@ class SymbolTable:
     def set(self, name, value):
         self.symbols[name] = value
 
+    # Returns the names bound in the table itself.
+    def names(self):
+        return self.symbols.keys()
+
     def remove(self, name):
         del self.symbols[name]
 
 
+# Symbol table of a call to a resolved function. Its names are the slots of the function's frame layout.
+class Frame:
+    def __init__(self, layout, parent=None):
+        self.layout = layout    # Name -> slot, shared by every frame of the function.
+        self.values = [None] * len(layout)
+        self.parent = parent
+
+    def get(self, name):
+        slot = self.layout.get(name)
+        value = None if slot is None else self.values[slot]
+        if value is None and self.parent:
+            return self.parent.get(name)
+        return value
+
+    def set(self, name, value):
+        self.values[self.layout[name]] = value
+
+    # Returns the names bound in the frame itself.
+    def names(self):
+        return [name for name, slot in self.layout.items() if self.values[slot] is not None]
+
+    def remove(self, name):
+        self.values[self.layout[name]] = None
+
+
 # Initialize global symbol table with built-in functions and constants
 global_symbol_table = SymbolTable()
 global_symbol_table.set("null", Number.null)
@@ -808,25 +1371,98 @@ global_symbol_table.set("isNum", BuiltInFunction.is_number)
 global_symbol_table.set("isFunc", BuiltInFunction.is_function)
 global_symbol_table.set("run", BuiltInFunction.run)
 
-# Runs the program by generating tokens, parsing them, and interpreting the AST
-def run(fn, text):
-    # Generate tokens
-    lexer = Lexer(fn, text)
-    tokens, error = lexer.make_tokens()
+# Parsers run() can build the AST with; they produce the same AST and errors.
+PARSERS = {
+    'recursive': Parser,
+    'pratt': PrattParser,
+    'stack': StackParser,
+}
+
+# Optional passes run() can apply to the AST, by name. Each returns the new AST and a report.
+OPTIMIZATIONS = {
+    'hash-cons': hash_cons,
+    'constant-fold': fold_constants,
+    'inline': inline_functions,
+    'purity': analyze_purity,
+    'types': infer_types,
+    'dead-code': eliminate_dead_code,
+    'pgo': apply_profile,
+    'resolve': resolve_names,
+    'escape': analyze_escapes,
+}
+
+# Runs the program by streaming tokens into the selected parser and interpreting the AST.
+# Scripts read from files go through the on-disk AST cache unless use_cache is False.
+# optimize names the passes to apply in order; their reports are appended to reports if it is a list.
+# With profile=True the run is profiled, and the profile is stored next to the script for the 'pgo' pass.
+# engine='vm' compiles the AST to bytecode and runs it on the virtual machine instead,
+# engine='closure' compiles every node to a Python closure, and engine='python' transpiles the
+# program to Python source; profiling always walks the tree. engine='tiered' walks the tree and
+# compiles the body of a function to closures once it was called tier_threshold times.
+def run(fn, text, parser='recursive', use_cache=True, optimize=(), reports=None, profile=False, engine='tree', tier_threshold=None):
+    # Generate AST
+    if use_cache:
+        ast, error = parse_cached(fn, text, PARSERS[parser])
+    else:
+        ast, error = parse_program(fn, text, PARSERS[parser])
     if error:
         return None, error
 
-    # Generate AST
-    parser = Parser(tokens)
-    ast = parser.parse()
-    if ast.error:
-        return None, ast.error
-
-    # Run program
-    interpreter = Interpreter()
+    # Parsing with parser='stack' is not limited by Python's stack, but the passes and the engines are
     context = Context('<program>')
     context.symbol_table = global_symbol_table
-    result = interpreter.visit(ast.node, context)
+    try:
+        return evaluate(fn, ast, context, optimize, reports, profile, engine, tier_threshold)
+    except RecursionError:
+        return None, RTError(ast.pos_start, ast.pos_end, 'Maximum nesting depth exceeded', context)
+
+# Optimizes a parsed program and runs it in context with the engine run() was given.
+def evaluate(fn, ast, context, optimize, reports, profile, engine, tier_threshold):
+    # Optimize AST
+    for name in optimize:
+        ast, report = OPTIMIZATIONS[name](ast)
+        if reports is not None:
+            reports.append(report)
 
+    # Run program
+    interpreter = Interpreter()
+    # A program with nodes a compiled engine has no code for, like those some passes add, or with
+    # calls in tail position, which only the tree-walking interpreter makes without a stack, is walked
+    if engine == 'vm' and not profile:
+        # The compiled engines import the interpreter's values, so they are only imported once they exist
+        from COMPILER.vm import can_run_compiled, run_compiled
+        if can_run_compiled(ast):
+            return run_compiled(ast, context)
+    if engine == 'closure' and not profile:
+        from COMPILER.closures import can_run_closures, run_closures
+        if can_run_closures(ast):
+            return run_closures(ast, context)
+    if engine == 'python' and not profile:
+        from COMPILER.transpiler import can_run_transpiled, run_transpiled
+        if can_run_transpiled(ast):
+            return run_transpiled(fn, ast, context)
+    if any(getattr(value, 'code', None) or getattr(value, 'closure', None) for value in global_symbol_table.symbols.values()):
+        # The compiled functions the program may call can read names its frames bind as globals
+        from COMPILER.compiler import collect_frame_names, release_stale_functions
+        release_stale_functions(collect_frame_names(ast))
+    if engine == 'tiered' and not profile:
+        from COMPILER.tiers import Tiers, TIER_THRESHOLD
+        outer_tiers = Interpreter.tiers
+        Interpreter.tiers = Tiers(ast, TIER_THRESHOLD if tier_threshold is None else tier_threshold)
+        try:
+            result = interpreter.visit(ast, context)
+        finally:
+            Interpreter.tiers = outer_tiers
+        return result.value, result.error
+    if not profile:
+        result = interpreter.visit(ast, context)
+        return result.value, result.error
+
+    outer_profile = Interpreter.profile
+    Interpreter.profile = Profile(ast.src)
+    try:
+        result = interpreter.visit(ast, context)
+        store_profile(Interpreter.profile)
+    finally:
+        Interpreter.profile = outer_profile
     return result.value, result.error
-
@@ -1,33 +1,61 @@
 from ERRORS.errors import *
 import string
-
-
-TT_INT = 'INT'
-TT_STRING = 'STRING'
-TT_PLUS = 'PLUS'
-TT_BOOL = "bool"
-TT_MINUS = 'MINUS'
-TT_MUL = 'MUL'
-TT_DIV = 'DIV'
-TT_LPAREN = 'LPAREN'
-TT_RPAREN = 'RPAREN'
-TT_MODULO = 'MODULO'
-TT_EQ = 'EE'
-TT_NE = 'NE'
-TT_LT = 'LT'
-TT_GT = 'GT'
-TT_LTE = 'LTE'
-TT_GTE = 'GTE'
-TT_EOF = 'EOF'
-TT_COMMA = 'COMMA'
-TT_ARROW = 'ARROW'
-TT_KEYWORD = 'KEYWORD'
-TT_STR = 'STR'
-TT_COLON = 'COLON'
-TT_NEWLINE = 'NEWLINE'
-
-
-KEYWORDS = ['and', 'or', 'not', 'func', 'lambda', 'end', 'return']
+import re
+import sys
+
+
+# Token kinds are small integers, so the parser compares ints instead of strings.
+TT_INT = 0
+TT_STRING = 1
+TT_PLUS = 2
+TT_BOOL = 3
+TT_MINUS = 4
+TT_MUL = 5
+TT_DIV = 6
+TT_LPAREN = 7
+TT_RPAREN = 8
+TT_MODULO = 9
+TT_EQ = 10
+TT_NE = 11
+TT_LT = 12
+TT_GT = 13
+TT_LTE = 14
+TT_GTE = 15
+TT_EOF = 16
+TT_COMMA = 17
+TT_ARROW = 18
+TT_STR = 19
+TT_COLON = 20
+TT_NEWLINE = 21
+# Every keyword has its own kind
+TT_AND = 22
+TT_OR = 23
+TT_NOT = 24
+TT_FUNC = 25
+TT_LAMBDA = 26
+TT_END = 27
+TT_RETURN = 28
+
+# Display names of the token kinds, used when printing tokens.
+TOKEN_NAMES = {
+    TT_INT: 'INT', TT_STRING: 'STRING', TT_PLUS: 'PLUS', TT_BOOL: 'bool', TT_MINUS: 'MINUS',
+    TT_MUL: 'MUL', TT_DIV: 'DIV', TT_LPAREN: 'LPAREN', TT_RPAREN: 'RPAREN', TT_MODULO: 'MODULO',
+    TT_EQ: 'EE', TT_NE: 'NE', TT_LT: 'LT', TT_GT: 'GT', TT_LTE: 'LTE', TT_GTE: 'GTE', TT_EOF: 'EOF',
+    TT_COMMA: 'COMMA', TT_ARROW: 'ARROW', TT_STR: 'STR', TT_COLON: 'COLON', TT_NEWLINE: 'NEWLINE',
+    TT_AND: 'KEYWORD', TT_OR: 'KEYWORD', TT_NOT: 'KEYWORD', TT_FUNC: 'KEYWORD', TT_LAMBDA: 'KEYWORD',
+    TT_END: 'KEYWORD', TT_RETURN: 'KEYWORD',
+}
+
+
+KEYWORDS = {
+    'and': TT_AND,
+    'or': TT_OR,
+    'not': TT_NOT,
+    'func': TT_FUNC,
+    'lambda': TT_LAMBDA,
+    'end': TT_END,
+    'return': TT_RETURN,
+}
 
 # CONSTANTS ######
 
@@ -36,19 +64,31 @@ LETTERS = string.ascii_letters
 
 
 class Token:
-    # Initialize a new Token object.
-    def __init__(self, type_, value=None, pos_start=None, pos_end=None):
+    __slots__ = ('type', 'value', 'start', 'end', 'src')
 
+    # Initialize a new Token object. Only the character offsets are stored; positions are built on demand.
+    def __init__(self, type_, value=None, start=0, end=0, src=None):
         self.type = type_
         self.value = value
-
-        if pos_start:
-            self.pos_start = pos_start.copy()
-            self.pos_end = pos_start.copy()
-            self.pos_end.advance()
-
-        if pos_end:
-            self.pos_end = pos_end
+        self.start = start  # Offset of the first character of the token
+        self.end = end  # Offset just past the last character of the token
+        self.src = src  # SourceText the offsets refer to
+
+    # Position of the first character of the token.
+    @property
+    def pos_start(self):
+        return self.src.position(self.start)
+
+    # Position just past the token. One-character tokens stay on their own line, even for a newline.
+    @property
+    def pos_end(self):
+        if self.end - self.start == 1:
+            return self.src.position(self.start).advance()
+        return self.src.position(self.end)
+
+    # Pickles the token as its constructor arguments.
+    def __reduce__(self):
+        return Token, (self.type, self.value, self.start, self.end, self.src)
 
     # Check if this token matches the given type and value.
     def matches(self, type_, value):
@@ -56,201 +96,133 @@ class Token:
 
     # Return a string representation of the token.
     def __repr__(self):
-        if self.value: return f'{self.type}:{self.value}'
-        return f'{self.type}'
+        if self.value: return f'{TOKEN_NAMES[self.type]}:{self.value}'
+        return f'{TOKEN_NAMES[self.type]}'
+
+
+# LEXER TABLES ######
+# Every token shape is one named group of the master pattern, tried in order.
+# Blanks in front of a token are swallowed by the pattern itself.
+TOKEN_PATTERNS = [
+    ('COMMENT', r'#[^\n]*\n?'),
+    ('NEWLINE', r'[;\n]'),
+    ('INT', r'[0-9]+'),
+    ('WORD', r'[A-Za-z]+'),
+    ('STRING', r'"[^"]*"?'),
+    ('OP', r'->|<=|>=|==|!=|[-+*/%(),:<>]'),
+    ('BANG', r'!'),
+    ('EQUALS', r'='),
+    ('ILLEGAL', r'[^ \t]'),
+]
+MASTER_PATTERN = re.compile(r'[ \t]*(?:' + '|'.join(f'(?P<{name}>{pattern})' for name, pattern in TOKEN_PATTERNS) + ')')
+# The same pattern for sources held as bytes, such as memory-mapped files.
+BYTES_MASTER_PATTERN = re.compile(MASTER_PATTERN.pattern.encode())
+
+# Maps the text of an operator to its token type.
+OPERATORS = {
+    '+': TT_PLUS,
+    '-': TT_MINUS,
+    '*': TT_MUL,
+    '/': TT_DIV,
+    '%': TT_MODULO,
+    '(': TT_LPAREN,
+    ')': TT_RPAREN,
+    ',': TT_COMMA,
+    ':': TT_COLON,
+    '<': TT_LT,
+    '>': TT_GT,
+    '->': TT_ARROW,
+    '<=': TT_LTE,
+    '>=': TT_GTE,
+    '==': TT_EQ,
+    '!=': TT_NE,
+}
+
+BYTES_OPERATORS = {op.encode(): tok_type for op, tok_type in OPERATORS.items()}
+
+# Maps a word to its token type; anything missing is an identifier.
+WORD_TYPES = {'true': TT_BOOL, 'false': TT_BOOL}
+WORD_TYPES.update(KEYWORDS)
 
 
 class Lexer:
-    # Initialize the Lexer with the source filename and text.
+    # Initialize the Lexer with the source filename and text. The text may also be a SourceText,
+    # whose text can be a str or a bytes-like object such as a memory-mapped file.
     def __init__(self, fn, text):
         self.fn = fn
-        self.text = text
-        self.pos = Position(-1, 0, -1, fn, text)
-        self.current_char = None
-        self.advance()
-
-    def advance(self):
-        # Advance the current character position in the source text.
-        self.pos.advance(self.current_char)
-        self.current_char = self.text[self.pos.idx] if self.pos.idx < len(self.text) else None
+        self.src = text if isinstance(text, SourceText) else SourceText(fn, text)
+        self.text = self.src.text
+        self.error = None   # Error hit by the last tokenization, if any
 
     # Tokenize the input text into a list of tokens.
     def make_tokens(self):
-        tokens = []
-
-        while self.current_char is not None:
-            if self.current_char in ' \t':
-                self.advance()
-            elif self.current_char == '#':
-                self.skip_comment()
-            elif self.current_char in ';\n':
-                tokens.append(Token(TT_NEWLINE, pos_start=self.pos))
-                self.advance()
-            elif self.current_char in DIGITS:
-                tokens.append(self.make_number())
-            elif self.current_char in LETTERS:
-                tokens.append(self.make_bool_string())
-            elif self.current_char == '"':
-                tokens.append(self.make_string())
-            elif self.current_char == '+':
-                tokens.append(Token(TT_PLUS, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == '-':
-                tokens.append(self.make_minus_or_arrow())
-            elif self.current_char == '*':
-                tokens.append(Token(TT_MUL, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == '/':
-                tokens.append(Token(TT_DIV, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == '%':
-                tokens.append(Token(TT_MODULO, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == '(':
-                tokens.append(Token(TT_LPAREN, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == ')':
-                tokens.append(Token(TT_RPAREN, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == '!':
-                tok, error = self.make_not_equals()
-                if error:
-                    return [], error
-                tokens.append(tok)
-            elif self.current_char == '<':
-                tokens.append(self.make_less_than())
-            elif self.current_char == '>':
-                tokens.append(self.make_greater_than())
-            elif self.current_char == ',':
-                tokens.append(Token(TT_COMMA, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == ':':
-                tokens.append(Token(TT_COLON, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == '=':
-                tok, error = self.make_equals()
-                if error:
-                    return [], error
-                tokens.append(tok)
-
-            else:
-                pos_start = self.pos.copy()
-                char = self.current_char
-                self.advance()
-                return [], IllegalCharError(pos_start, self.pos, "'" + char + "'")
-
-        tokens.append(Token(TT_EOF, pos_start=self.pos))
+        tokens = list(self.iter_tokens())
+        if self.error:
+            return [], self.error
         return tokens, None
 
-    def make_string(self):
-        string = ''
-        pos_start = self.pos.copy()
-        escape_character = False
-        self.advance()
-
-        escape_characters = {
-            'n': '\n',
-            't': '\t'
-        }
-
-        while self.current_char is not None and (self.current_char != '"' or escape_character):
-            if escape_character:
-                string += escape_characters.get(self.current_char, self.current_char)
+    # Lazily yield the tokens of the text, from the given offset on, with a single pass of the master pattern.
+    # On an illegal character the error is kept in self.error and the stream ends with EOF at that point.
+    def iter_tokens(self, start=0):
+        self.error = None
+        src = self.src
+        eof_idx = len(self.text)
+        word_types = WORD_TYPES
+        intern = sys.intern
+        if isinstance(self.text, str):
+            pattern, operators, decode = MASTER_PATTERN, OPERATORS, None
+        else:
+            pattern, operators, decode = BYTES_MASTER_PATTERN, BYTES_OPERATORS, bytes.decode
+
+        for match in pattern.finditer(self.text, start):
+            kind = match.lastgroup
+            start, end = match.span(kind)
+
+            if kind == 'COMMENT':
+                continue
+            elif kind == 'OP':
+                yield Token(operators[match.group(kind)], None, start, end, src)
+            elif kind == 'WORD':
+                word = match.group(kind)
+                if decode:
+                    word = decode(word)
+                tok_type = word_types.get(word, TT_STR)
+                # Identifiers are interned so symbol table lookups hash each name once
+                yield Token(tok_type, intern(word) if tok_type == TT_STR else word, start, end, src)
+            elif kind == 'INT':
+                yield Token(TT_INT, int(match.group(kind)), start, end, src)
+            elif kind == 'NEWLINE':
+                yield Token(TT_NEWLINE, None, start, end, src)
+            elif kind == 'STRING':
+                yield self.make_string(match)
             else:
-                if self.current_char == '\\':
-                    escape_character = True
-                else:
-                    string += self.current_char
-            self.advance()
-            escape_character = False
-
-        self.advance()
-        return Token(TT_STRING, string, pos_start, self.pos)
-
-    def make_bool_string(self):
-        str_bool = ''
-        pos_start = self.pos.copy()
-
-        while self.current_char is not None and self.current_char in LETTERS:
-            str_bool += self.current_char
-            self.advance()
-
-        if str_bool == 'false' or str_bool == 'true':
-            tok_type = TT_BOOL
+                self.error = self.make_error(kind, start)
+                eof_idx = start
+                break
+
+        yield Token(TT_EOF, None, eof_idx, eof_idx + 1, src)
+
+    # Build a string token. Backslashes are dropped, and an unterminated string runs one past the end.
+    def make_string(self, match):
+        start, end = match.span('STRING')
+        raw = match.group('STRING')
+        if not isinstance(raw, str):
+            raw = raw.decode('utf-8', 'replace')
+        if len(raw) > 1 and raw.endswith('"'):
+            body = raw[1:-1]
         else:
-            tok_type = TT_KEYWORD if str_bool in KEYWORDS else TT_STR
-
-        return Token(tok_type, str_bool, pos_start, self.pos)
-
-    def make_minus_or_arrow(self):
-        tok_type = TT_MINUS
-        pos_start = self.pos.copy()
-        self.advance()
-
-        if self.current_char == '>':
-            self.advance()
-            tok_type = TT_ARROW
-
-        return Token(tok_type, pos_start=pos_start, pos_end=self.pos)
-
-    def make_number(self):
-        num_str = ''
-        pos_start = self.pos.copy()
-
-        while self.current_char is not None and self.current_char in DIGITS:
-            num_str += self.current_char
-            self.advance()
-
-        return Token(TT_INT, int(num_str), pos_start, self.pos)
-
-    def make_not_equals(self):
-        pos_start = self.pos.copy()
-        self.advance()
-
-        if self.current_char == '=':
-            self.advance()
-            return Token(TT_NE, pos_start=pos_start, pos_end=self.pos), None
-
-        self.advance()
-        return None, ExpectedCharError(pos_start, self.pos, "'=' (after '!')")
-
-    def make_equals(self):
-        pos_start = self.pos.copy()
-        self.advance()
-
-        if self.current_char == '=':
-            self.advance()
-            return Token(TT_EQ, pos_start=pos_start, pos_end=self.pos), None
-
-        self.advance()
-        return None, ExpectedCharError(pos_start, self.pos, "'=' (after '=')")
-
-    def make_less_than(self):
-        tok_type = TT_LT
-        pos_start = self.pos.copy()
-        self.advance()
-
-        if self.current_char == '=':
-            self.advance()
-            tok_type = TT_LTE
-
-        return Token(tok_type, pos_start=pos_start, pos_end=self.pos)
-
-    def make_greater_than(self):
-        tok_type = TT_GT
-        pos_start = self.pos.copy()
-        self.advance()
-
-        if self.current_char == '=':
-            self.advance()
-            tok_type = TT_GTE
-
-        return Token(tok_type, pos_start=pos_start, pos_end=self.pos)
-
-    def skip_comment(self):
-        self.advance()
-
-        while self.current_char != '\n':
-            self.advance()
-
-        self.advance()
\ No newline at end of file
+            body = raw[1:]
+            end += 1
+        return Token(TT_STRING, body.replace('\\', ''), start, end, self.src)
+
+    # Build the error for a character that cannot start a token.
+    def make_error(self, kind, start):
+        pos_start = self.src.position(start)
+        if kind == 'BANG':
+            return ExpectedCharError(pos_start, self.src.position(start + 2), "'=' (after '!')")
+        if kind == 'EQUALS':
+            return ExpectedCharError(pos_start, self.src.position(start + 2), "'=' (after '=')")
+        char = self.text[start:start + 4]
+        if not isinstance(char, str):
+            char = char.decode('utf-8', 'replace')
+        return IllegalCharError(pos_start, self.src.position(start + 1), "'" + char[0] + "'")
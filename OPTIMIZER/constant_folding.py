@@ -0,0 +1,158 @@
+from OPTIMIZER.nodes import *
+import operator
+
+
+# Values of the boolean literals, as the global symbol table defines them.
+BOOLEAN_VALUES = {'true': 1, 'false': 0}
+
+# Longest string a fold may build; longer ones are left to be built when the program runs.
+MAX_STRING_LENGTH = 1024
+
+# What every binary operator computes on two numbers, as Number does it. Division by zero is
+# checked by the callers, which report it like Number.dived_by.
+NUMBER_OPERATIONS = {
+    TT_PLUS: operator.add,
+    TT_MINUS: operator.sub,
+    TT_MUL: operator.mul,
+    TT_DIV: operator.truediv,
+    TT_MODULO: operator.mod,
+    TT_EQ: lambda a, b: int(a == b),
+    TT_NE: lambda a, b: int(a != b),
+    TT_LT: lambda a, b: int(a < b),
+    TT_GT: lambda a, b: int(a > b),
+    TT_LTE: lambda a, b: int(a <= b),
+    TT_GTE: lambda a, b: int(a >= b),
+    TT_AND: lambda a, b: int(a and b),
+    TT_OR: lambda a, b: int(a or b),
+}
+
+
+# Returns the value of a literal or folded node and whether it takes the context it is evaluated in,
+# or None if the node is not a constant.
+def constant(node):
+    node_type = type(node)
+    if node_type is NumberNode or node_type is StringNode:
+        return node.tok.value, True
+    if node_type is ConstantNode:
+        return node.value, node.contextual
+    return None
+
+
+# Returns the result of a binary operator on two constants, or None if the operation fails.
+# A failing operation is left to the interpreter, which reports it at the right place.
+def operate(op, left, right):
+    left_is_str = type(left) is str
+    right_is_str = type(right) is str
+    if not left_is_str and not right_is_str:
+        if op == TT_DIV and right == 0:
+            return None
+        try:
+            return NUMBER_OPERATIONS[op](left, right)
+        except ArithmeticError:
+            return None
+    if left_is_str and right_is_str and op == TT_PLUS:
+        if len(left) + len(right) > MAX_STRING_LENGTH:
+            return None
+        return left + right
+    if left_is_str and type(right) is int and op == TT_MUL:
+        if len(left) * right > MAX_STRING_LENGTH:
+            return None
+        return left * right
+    return None
+
+
+# Returns the result of a unary operator on a constant, or None if the operation fails.
+def operate_unary(op, operand):
+    if op == TT_PLUS:
+        return operand
+    if op == TT_MINUS:
+        return operand * -1
+    if op == TT_NOT and type(operand) is not str:
+        return 1 if operand == 0 else 0
+    return None
+
+
+# CONSTANT FOLDING
+# Replaces the operators applied to constants by ConstantNodes and the boolean literals by their values.
+# A folded value keeps the span and context the interpreter would have given it, so errors raised
+# by the operators around it are reported exactly as before. Operators that would fail are kept.
+class ConstantFolder:
+    def __init__(self):
+        self.shared = {}    # id of a subtree shared by SharedNodes -> the subtree after folding.
+        self.folded = 0     # Operators replaced by constants.
+        self.booleans = 0   # Boolean literals replaced by constants.
+
+    # Folds the constants under a node, children first. Returns the node that replaces it.
+    def fold(self, node):
+        node_type = type(node)
+        if node_type is BoolAccessNode:
+            self.booleans += 1
+            return ConstantNode(BOOLEAN_VALUES[node.tok.value], False, node.start, node.end, node.src)
+
+        if node_type is SharedNode:
+            shared = node.node
+            if id(shared) not in self.shared:
+                self.shared[id(shared)] = self.fold(shared)
+            node.node = self.shared[id(shared)]
+            if type(node.node) is ConstantNode:
+                return self.moved(node.node, node.start - shared.start, node.src)
+            return node
+
+        transform_children(node, self.fold)
+        if node_type is ReuseNode and type(node.node) is ConstantNode:
+            return node.node
+        if node_type is BinOpNode:
+            return self.fold_binary(node)
+        if node_type is UnaryOpNode:
+            return self.fold_unary(node)
+        return node
+
+    # Returns a copy of a constant moved by the given distance, for an occurrence of a shared subtree.
+    def moved(self, node, distance, src):
+        return ConstantNode(node.value, node.contextual, node.start + distance, node.end + distance, src)
+
+    # Folds a binary operation whose operands are constants.
+    def fold_binary(self, node):
+        left = constant(node.left_node)
+        if left is None:
+            return node
+        left_value, contextual = left
+        op = node.op_tok.type
+
+        # 'and' and 'or' give back their left operand itself without evaluating the right one
+        if (op == TT_OR and left_value == 1) or (op == TT_AND and left_value == 0):
+            self.folded += 1
+            left_node = node.left_node
+            return ConstantNode(left_value, contextual, left_node.start, left_node.end, left_node.src)
+
+        right = constant(node.right_node)
+        if right is None:
+            return node
+        value = operate(op, left_value, right[0])
+        if value is None:
+            return node
+        self.folded += 1
+        return ConstantNode(value, contextual, node.start, node.end, node.src)
+
+    # Folds a unary operation whose operand is a constant.
+    def fold_unary(self, node):
+        operand = constant(node.node)
+        if operand is None:
+            return node
+        value = operate_unary(node.op_tok.type, operand[0])
+        if value is None:
+            return node
+        self.folded += 1
+        return ConstantNode(value, operand[1], node.start, node.end, node.src)
+
+
+# Folds the constant expressions of a program.
+# Returns the new AST and a report of the operators and boolean literals replaced.
+def fold_constants(ast):
+    folder = ConstantFolder()
+    ast = folder.fold(ast)
+    return ast, {
+        'pass': 'constant-fold',
+        'folded_operations': folder.folded,
+        'resolved_booleans': folder.booleans,
+    }
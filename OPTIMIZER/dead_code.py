@@ -0,0 +1,146 @@
+from OPTIMIZER.nodes import *
+
+
+FUNCTION_NODES = (FuncDefNode, LambdaDefNode)
+# Operators that can fail on two numbers.
+FALLIBLE_OPERATORS = (TT_DIV, TT_MODULO)
+
+
+# Returns the node a statement evaluates, looking through the nodes other passes wrap it in.
+def statement_node(node):
+    while type(node) in (ScopeNode, SharedNode):
+        node = node.node
+    return node
+
+
+# DEAD CODE ELIMINATION
+# Removes the statements of a program and of its block bodies that have no effect: definitions of
+# functions whose names are never read by the code that is kept, and expressions that can neither
+# fail nor do anything else, whose values are dropped. Scoping is dynamic, so a name read anywhere
+# keeps every definition with that name, and a program that may call run() keeps all of them, since
+# the scripts it runs can read its names. The global symbol table is kept between programs, so a
+# later program, or a line of the shell, may read any name the program defines at the top level:
+# those definitions are always kept, and only the definitions of block bodies can be unused. Statements are only removed, never moved, so effectful
+# statements still run in the same order. At the top level, the removed statements no longer give
+# a value in the list run() returns.
+class DeadCodeEliminator:
+    def __init__(self):
+        self.definitions = {}   # Name -> named definitions found as statements of reachable code.
+        self.live = set()   # ids of the named definitions whose names are read.
+        self.reads = []     # Names read by reachable code that were not looked up yet.
+        self.seen_names = set()     # Names looked up already.
+        self.may_run = False    # Whether the program reads the name 'run'.
+        self.params = ()    # Argument names of the function whose body is being cleaned.
+        self.removed = []   # Description of every statement removed.
+        self.removed_definitions = 0    # Named and anonymous definitions removed.
+
+    # Records the names read under a node. Named definitions that are statements are only
+    # recorded, and their bodies are visited once their names are read.
+    def collect(self, node, is_statement=False):
+        node_type = type(node)
+        if is_statement and node_type in FUNCTION_NODES and node.var_name_tok:
+            name = node.var_name_tok.value
+            self.definitions.setdefault(name, []).append(node)
+            if name in self.seen_names:
+                self.live.add(id(node))
+                self.collect(node.body_node)
+            return
+        if node_type is VarAccessNode:
+            name = node.tok.value
+            if name == 'run':
+                self.may_run = True
+            self.reads.append(name)
+        elif node_type is ListNode:
+            for element_node in node.element_nodes:
+                self.collect(statement_node(element_node), True)
+            return
+        for child in children(node):
+            self.collect(child)
+
+    # Marks the definitions whose names are read by reachable code, until no more are found.
+    def mark_live(self, ast):
+        self.collect(ast)
+        program = statement_node(ast)
+        if type(program) is ListNode:
+            for element_node in program.element_nodes:
+                statement = statement_node(element_node)
+                if type(statement) in FUNCTION_NODES and statement.var_name_tok:
+                    self.reads.append(statement.var_name_tok.value)
+        while self.reads:
+            name = self.reads.pop()
+            if name in self.seen_names:
+                continue
+            self.seen_names.add(name)
+            for definition in self.definitions.get(name, ()):
+                self.live.add(id(definition))
+                self.collect(definition.body_node)
+
+    # Returns whether evaluating a node can neither fail nor have an effect.
+    def is_inert(self, node):
+        node_type = type(node)
+        if node_type in (NumberNode, StringNode, BoolAccessNode, ConstantNode):
+            return True
+        if node_type is VarAccessNode:
+            # The arguments of a function are always bound in its body
+            return node.tok.value in self.params
+        if node_type is BinOpNode:
+            return node.numeric and node.op_tok.type not in FALLIBLE_OPERATORS and self.is_inert(node.left_node) and self.is_inert(node.right_node)
+        if node_type is UnaryOpNode:
+            return node.numeric and self.is_inert(node.node)
+        return False
+
+    # Returns why a statement can be removed, or None if it has to stay.
+    def removal_reason(self, node):
+        node_type = type(node)
+        if node_type in FUNCTION_NODES:
+            if not node.var_name_tok:
+                return 'unused anonymous function'
+            if self.may_run or id(node) in self.live:
+                return None
+            return f"unused function '{node.var_name_tok.value}'"
+        if self.is_inert(node):
+            return 'statement without effect'
+        return None
+
+    # Removes the dead statements under a node.
+    def clean(self, node):
+        node_type = type(node)
+        if node_type in FUNCTION_NODES:
+            outer_params = self.params
+            self.params = {tok.value for tok in node.arg_name_toks}
+            self.clean(node.body_node)
+            self.params = outer_params
+            return
+
+        if node_type is ListNode:
+            statements = []
+            for element_node in node.element_nodes:
+                statement = statement_node(element_node)
+                reason = self.removal_reason(statement)
+                if reason is None:
+                    statements.append(element_node)
+                    self.clean(element_node)
+                    continue
+                if type(statement) in FUNCTION_NODES:
+                    self.removed_definitions += 1
+                pos = statement.pos_start
+                self.removed.append(f'{pos.fn}:{pos.ln + 1}: {reason}')
+            node.element_nodes = statements
+            return
+
+        for child in children(node):
+            self.clean(child)
+
+
+# Removes the unused definitions and the statements without effect of a program.
+# Returns the new AST and a report of what was removed.
+def eliminate_dead_code(ast):
+    eliminator = DeadCodeEliminator()
+    eliminator.mark_live(ast)
+    eliminator.clean(ast)
+    return ast, {
+        'pass': 'dead-code',
+        'removed_definitions': eliminator.removed_definitions,
+        'removed_statements': len(eliminator.removed) - eliminator.removed_definitions,
+        'removed': eliminator.removed,
+    }
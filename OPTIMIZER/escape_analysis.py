@@ -0,0 +1,66 @@
+from OPTIMIZER.nodes import *
+from OPTIMIZER.dead_code import statement_node
+
+
+FUNCTION_NODES = (FuncDefNode, LambdaDefNode)
+
+
+# ESCAPE ANALYSIS
+# Finds the function and lambda definitions whose values are never kept with the context they were
+# created in. Scoping is dynamic, so a function captures no variables: the only thing a function
+# value holds on to is that context, and it is replaced whenever the value is read by name, passed,
+# returned or called. Only definitions that are elements of a list or operands of an operator keep
+# it, and escape. The others are created once and shared by every evaluation, without a context, so
+# the frames that bind them are not kept alive by them. The functions of an analyzed program also
+# bind their arguments without pointing them back at the new frame, so a call's frame is freed as
+# soon as it returns instead of waiting for the garbage collector.
+class EscapeAnalyzer:
+    def __init__(self):
+        self.shared = 0     # Definitions whose values are shared by their evaluations.
+        self.escaping = 0   # Definitions whose values keep their context.
+
+    # Marks a definition found in a place that does or does not keep its value's context.
+    def mark(self, node, escapes):
+        node = statement_node(node)
+        if type(node) in FUNCTION_NODES and node.escapes is None:
+            node.escapes = escapes
+            if escapes:
+                self.escaping += 1
+            else:
+                self.shared += 1
+
+    # Marks the definitions under a node. is_body is whether a list node is the program or a block
+    # body, whose statement values are dropped.
+    def analyze(self, node, is_body=False):
+        node_type = type(node)
+        if node_type is ListNode and is_body:
+            for element_node in node.element_nodes:
+                self.mark(element_node, False)
+        elif node_type in CALL_NODES:
+            self.mark(node.node_to_call, False)
+            for arg_node in node.arg_nodes:
+                self.mark(arg_node, False)
+        elif node_type is ReturnNode and node.node_to_return is not None:
+            self.mark(node.node_to_return, False)
+        elif node_type in FUNCTION_NODES:
+            if node.should_auto_return:
+                self.mark(node.body_node, False)
+            else:
+                self.analyze(statement_node(node.body_node), True)
+                return
+
+        for child in children(node):
+            self.mark(child, True)
+            self.analyze(child)
+
+
+# Marks which definitions of a program escape, and lets the functions of the program bind their
+# arguments without tying them to their frames. Returns the AST and a report of the counts.
+def analyze_escapes(ast):
+    analyzer = EscapeAnalyzer()
+    analyzer.analyze(statement_node(ast), True)
+    return ast, {
+        'pass': 'escape',
+        'shared_definitions': analyzer.shared,
+        'escaping_definitions': analyzer.escaping,
+    }
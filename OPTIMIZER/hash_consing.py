@@ -0,0 +1,191 @@
+from OPTIMIZER.nodes import *
+
+
+# Nodes whose value only depends on constants and names, so evaluating the same subexpression
+# of them twice in one run of a scope gives the same value, or the same error.
+PURE_NODES = (NumberNode, StringNode, BoolAccessNode, VarAccessNode, ConstantNode, BinOpNode, UnaryOpNode)
+FUNCTION_NODES = (FuncDefNode, LambdaDefNode)
+
+
+# Structure of a folded constant; the type tells 1 from 1.0, which compare equal.
+def constant_structure(node):
+    return ConstantNode, type(node.value), node.value, node.contextual
+
+
+# What the reuse pass found in one statement or function body.
+class Scope:
+    def __init__(self, local_names):
+        self.local_names = local_names  # Argument names of the enclosing function, or None at the top level.
+        self.occurrences = {}   # id of a pure subexpression -> (key, whether it reads names that are not arguments)
+        self.counts = {}    # Key -> number of occurrences.
+        self.slots = {}     # Key -> slot of the value, for the subexpressions that are reused.
+        self.has_calls = False  # Whether a call in the scope may run code that redefines global names.
+        self.binds_names = False    # Whether the scope defines a named function.
+
+
+# COMMON SUBEXPRESSION ELIMINATION
+# Wraps the occurrences of pure subexpressions repeated within a statement or function body in
+# ReuseNodes, so each one is evaluated once per run of the scope. Names can only change inside a
+# scope through a named function definition, which turns reuse off for that scope, or through a
+# call to run(), so reading a global name is only reused in scopes without calls.
+class SubexpressionReuser:
+    def __init__(self):
+        self.keys = {}  # Structure of a subexpression -> its key.
+        self.reused = 0     # Occurrences that reuse a value instead of evaluating it again.
+
+    # Returns the key of a structure, ignoring where it is in the source.
+    def intern(self, structure):
+        return self.keys.setdefault(structure, len(self.keys))
+
+    # Processes every top-level statement of a program.
+    def program(self, ast):
+        ast.element_nodes = [self.scope(statement, None) for statement in ast.element_nodes]
+        return ast
+
+    # Processes the body of a function or lambda definition; each statement of a block body is a scope.
+    def function(self, node):
+        arg_names = {tok.value for tok in node.arg_name_toks}
+        body_node = node.body_node
+        if isinstance(body_node, ListNode):
+            body_node.element_nodes = [self.scope(statement, arg_names) for statement in body_node.element_nodes]
+        else:
+            node.body_node = self.scope(body_node, arg_names)
+
+    # Reuses the repeated subexpressions of one scope. Returns the node that replaces it.
+    def scope(self, node, local_names):
+        scope = Scope(local_names)
+        self.analyze(node, scope)
+        if scope.binds_names:
+            return node
+
+        node = self.wrap(node, scope)
+        if not scope.slots:
+            return node
+        return ScopeNode(node, len(scope.slots))
+
+    # Records the pure subexpressions under a node. Function bodies are processed as scopes of their own.
+    # Returns the key of the node and whether it reads global names, or None if it is not pure.
+    def analyze(self, node, scope):
+        node_type = type(node)
+        if node_type in FUNCTION_NODES:
+            if node.var_name_tok:
+                scope.binds_names = True
+            self.function(node)
+            return None
+        if node_type in CALL_NODES:
+            scope.has_calls = True
+
+        infos = [self.analyze(child, scope) for child in children(node)]
+        if node_type not in PURE_NODES or None in infos:
+            return None
+
+        if isinstance(node, TokenNode):
+            tok = node.tok
+            reads_globals = node_type is VarAccessNode and (scope.local_names is None or tok.value not in scope.local_names)
+            return self.intern((node_type, tok.type, tok.value)), reads_globals
+        if node_type is ConstantNode:
+            return self.intern(constant_structure(node)), False
+
+        key = self.intern((node_type, node.op_tok.type) + tuple(key for key, _ in infos))
+        reads_globals = any(reads for _, reads in infos)
+        scope.occurrences[id(node)] = (key, reads_globals)
+        scope.counts[key] = scope.counts.get(key, 0) + 1
+        return key, reads_globals
+
+    # Wraps the outermost occurrences of the repeated subexpressions under a node.
+    def wrap(self, node, scope):
+        info = scope.occurrences.get(id(node))
+        if info is not None:
+            key, reads_globals = info
+            if scope.counts[key] > 1 and not (reads_globals and scope.has_calls):
+                if key in scope.slots:
+                    self.reused += 1
+                else:
+                    scope.slots[key] = len(scope.slots)
+                return ReuseNode(node, scope.slots[key])
+
+        if type(node) not in FUNCTION_NODES:
+            transform_children(node, lambda child: self.wrap(child, scope))
+        return node
+
+
+# HASH CONSING
+# Replaces every subtree that repeats the source text of an earlier subtree with the same structure
+# by a SharedNode pointing at the earlier one. Subtrees holding function definitions are never
+# shared, since the functions they create would report errors at the wrong place, and neither are
+# ReuseNodes outside of their scope, whose slots only mean something within it.
+class SubtreeSharer:
+    def __init__(self):
+        self.keys = {}  # Structure of a subtree -> its key.
+        self.first = {}     # (key, source, text) -> first subtree found with them.
+        self.nodes = 0  # Nodes in the program before sharing.
+        self.removed = 0    # Nodes no longer in the program after sharing.
+
+    # Returns the key of a structure.
+    def intern(self, structure):
+        return self.keys.setdefault(structure, len(self.keys))
+
+    # Shares the repeated subtrees under a node, children first. Returns the node that replaces it,
+    # its key, whether it holds a function definition, whether it holds a ReuseNode outside of its
+    # scope, and its size.
+    def share(self, node):
+        self.nodes += 1
+        node_type = type(node)
+        if node_type is ArgNode:
+            return node, self.intern((node_type, node.index)), False, False, 1
+        if node_type is VarAccessNode:
+            return node, self.intern((node_type, node.tok.value, node.address)), False, False, 1
+        if isinstance(node, TokenNode):
+            return node, self.intern((node_type, node.tok.type, node.tok.value)), False, False, 1
+        if node_type is ConstantNode:
+            return node, self.intern(constant_structure(node)), False, False, 1
+
+        infos = []
+
+        def share_child(child):
+            child, *info = self.share(child)
+            infos.append(info)
+            return child
+
+        transform_children(node, share_child)
+        child_keys = tuple(info[0] for info in infos)
+        has_function = node_type in FUNCTION_NODES or any(info[1] for info in infos)
+        has_reuse = node_type is ReuseNode or (node_type is not ScopeNode and any(info[2] for info in infos))
+        size = 1 + sum(info[3] for info in infos)
+
+        if node_type in FUNCTION_NODES:
+            key = self.intern((node_type, id(node)))
+        elif node_type is BinOpNode or node_type is UnaryOpNode:
+            key = self.intern((node_type, node.op_tok.type, node.numeric, child_keys))
+        elif node_type is ReuseNode:
+            key = self.intern((node_type, node.slot, child_keys))
+        elif node_type is CallNode:
+            key = self.intern((node_type, len(node.arg_nodes), child_keys))
+        elif node_type is ReturnNode:
+            key = self.intern((node_type, node.node_to_return is None, child_keys))
+        else:
+            key = self.intern((node_type, child_keys))
+
+        if has_function or has_reuse or size < 2 or not isinstance(node.src, SourceText):
+            return node, key, has_function, has_reuse, size
+
+        first = self.first.setdefault((key, id(node.src), node.src.text[node.start:node.end]), node)
+        if first is node:
+            return node, key, False, False, size
+        self.removed += size - 1
+        return SharedNode(first, node.start, node.end, node.src), key, False, False, 1
+
+
+# Shares repeated subtrees and reuses the values of repeated pure subexpressions.
+# Returns the new AST and a report of the nodes removed and the evaluations saved.
+def hash_cons(ast):
+    reuser = SubexpressionReuser()
+    ast = reuser.program(ast)
+    sharer = SubtreeSharer()
+    ast = sharer.share(ast)[0]
+    return ast, {
+        'pass': 'hash-cons',
+        'nodes': sharer.nodes,
+        'nodes_removed': sharer.removed,
+        'reused_subexpressions': reuser.reused,
+    }
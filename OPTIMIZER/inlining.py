@@ -0,0 +1,123 @@
+from OPTIMIZER.nodes import *
+
+
+# Largest body, in nodes, of a function that is inlined.
+MAX_INLINE_SIZE = 24
+# Largest body inlined at call sites a profile found to be hot.
+MAX_HOT_INLINE_SIZE = 64
+# Times a call site has to run in a profile to be hot.
+HOT_CALLS = 100
+
+# Nodes an inlined body may consist of. Bodies holding calls or function definitions are never
+# inlined: with dynamic scoping, the functions they call or create can read the arguments of the
+# call by name, which needs the call's own context.
+INLINE_NODES = (NumberNode, StringNode, VarAccessNode, BoolAccessNode, ConstantNode, BinOpNode, UnaryOpNode)
+
+
+# Returns the number of nodes in an expression made of INLINE_NODES, or None if it holds another node.
+def inline_size(node):
+    if type(node) not in INLINE_NODES:
+        return None
+    size = 1
+    for child in children(node):
+        child_size = inline_size(child)
+        if child_size is None:
+            return None
+        size += child_size
+    return size
+
+
+# Returns a copy of an inlined body in which the arguments are read through ArgNodes.
+def substitute(node, arg_indexes):
+    node_type = type(node)
+    if node_type is VarAccessNode:
+        # Other names are read from the caller's frame, so they get a node of their own
+        index = arg_indexes.get(node.tok.value)
+        return VarAccessNode(node.tok) if index is None else ArgNode(node.tok, index)
+    if node_type is BinOpNode:
+        return BinOpNode(substitute(node.left_node, arg_indexes), node.op_tok, substitute(node.right_node, arg_indexes))
+    if node_type is UnaryOpNode:
+        return UnaryOpNode(node.op_tok, substitute(node.node, arg_indexes))
+    return node
+
+
+# INLINING
+# Replaces the calls to small named arrow functions by InlineCallNodes running a copy of the body
+# in the caller's context. Only names defined once in the program are inlined; since a name can
+# still be bound to something else when the call runs, the InlineCallNode checks it first.
+# Given the call counts of a profile, call sites that never ran are left alone, and hot ones may
+# inline larger bodies.
+class Inliner:
+    def __init__(self, call_counts=None):
+        self.call_counts = call_counts  # Site key -> times the call ran in a profile, or None without one.
+        self.functions = {}     # Name -> FuncDefNode of the functions that can be inlined.
+        self.arg_indexes = {}   # Name -> index of every argument name of the function.
+        self.sizes = {}     # Name -> size of the body of the function.
+        self.shared = {}    # id of a subtree shared by SharedNodes -> the subtree after inlining.
+        self.inlined = 0    # Calls replaced by InlineCallNodes.
+
+    # Finds the named arrow functions whose bodies can be inlined.
+    def collect(self, ast):
+        definitions = {}
+        nodes = [ast]
+        while nodes:
+            node = nodes.pop()
+            if type(node) in (FuncDefNode, LambdaDefNode) and node.var_name_tok:
+                definitions.setdefault(node.var_name_tok.value, []).append(node)
+            nodes.extend(children(node))
+
+        max_size = MAX_INLINE_SIZE if self.call_counts is None else MAX_HOT_INLINE_SIZE
+        for name, nodes in definitions.items():
+            node = nodes[0]
+            if len(nodes) > 1 or type(node) is not FuncDefNode or not node.should_auto_return:
+                continue
+            size = inline_size(node.body_node)
+            if size is None or size > max_size:
+                continue
+            arg_indexes = {tok.value: index for index, tok in enumerate(node.arg_name_toks)}
+            self.functions[name] = node
+            self.arg_indexes[name] = arg_indexes
+            self.sizes[name] = size
+
+    # Returns whether a call site is worth inlining a body of the given size into.
+    def worth_inlining(self, node, size):
+        if self.call_counts is None:
+            return True
+        calls = self.call_counts.get(site_key(node), 0)
+        return calls > 0 and (size <= MAX_INLINE_SIZE or calls >= HOT_CALLS)
+
+    # Inlines the calls under a node, children first. Returns the node that replaces it.
+    def inline(self, node):
+        node_type = type(node)
+        if node_type is SharedNode:
+            shared = node.node
+            if id(shared) not in self.shared:
+                self.shared[id(shared)] = self.inline(shared)
+            node.node = self.shared[id(shared)]
+            return node
+
+        transform_children(node, self.inline)
+        if node_type is not CallNode or type(node.node_to_call) is not VarAccessNode:
+            return node
+        name = node.node_to_call.tok.value
+        if name not in self.functions:
+            return node
+        function = self.functions[name]
+        if len(node.arg_nodes) != len(function.arg_name_toks) or not self.worth_inlining(node, self.sizes[name]):
+            return node
+        # Every call site gets its own copy, which later passes may rewrite for that site alone
+        self.inlined += 1
+        return InlineCallNode(node, function, substitute(function.body_node, self.arg_indexes[name]))
+
+
+# Inlines the calls to small arrow functions of a program.
+# Returns the new AST and a report of the functions and calls inlined.
+def inline_functions(ast):
+    inliner = Inliner()
+    inliner.collect(ast)
+    ast = inliner.inline(ast)
+    return ast, {
+        'pass': 'inline',
+        'inlined_functions': len(inliner.functions),
+        'inlined_calls': inliner.inlined,
+    }
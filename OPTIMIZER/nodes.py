@@ -0,0 +1,149 @@
+from PARSER.parser import *
+
+
+# Nodes added to the AST by the optimizer passes. Like the parser's nodes they keep offsets
+# and build positions on demand.
+
+# Node for one occurrence of a subtree that is shared with other occurrences of the same source text.
+# The shared subtree keeps the offsets of the place it was first found at. Since every occurrence has
+# the same text, a position inside the subtree moves to this occurrence by a fixed distance.
+class SharedNode(SpanNode):
+    __slots__ = ('node',)
+
+    def __init__(self, node, start, end, src):
+        self.node = node    # The shared subtree.
+        self.start = start  # Offset of this occurrence.
+        self.end = end  # Offset just past this occurrence.
+        self.src = src
+
+    # Moves a position inside the shared subtree to the same place in this occurrence.
+    def move(self, pos):
+        node = self.node
+        if isinstance(pos, OffsetPosition) and pos.source is node.src and node.start <= pos.offset <= node.end:
+            return OffsetPosition(self.src, pos.offset + self.start - node.start, pos.extra)
+        return pos
+
+    # Moves an error raised inside the shared subtree to this occurrence, together with the
+    # call sites of its traceback down to the context the occurrence is evaluated in.
+    def move_error(self, error, context):
+        error.pos_start = self.move(error.pos_start)
+        error.pos_end = self.move(error.pos_end)
+        ctx = getattr(error, 'context', None)
+        while ctx is not None and ctx is not context:
+            ctx.parent_entry_pos = self.move(ctx.parent_entry_pos)
+            ctx = ctx.parent
+
+
+# Node for an occurrence of a pure subexpression that is repeated in its scope. The first occurrence
+# evaluated stores its value in the slot, and the others reuse that value.
+class ReuseNode(SpanNode):
+    __slots__ = ('node', 'slot')
+
+    def __init__(self, node, slot):
+        self.node = node    # The subexpression.
+        self.slot = slot    # Index of the value in the slots of the scope.
+        self.start = node.start
+        self.end = node.end
+        self.src = node.src
+
+
+# Node for a statement or function body whose repeated pure subexpressions are evaluated once
+# each time it runs.
+class ScopeNode(SpanNode):
+    __slots__ = ('node', 'slot_count')
+
+    def __init__(self, node, slot_count):
+        self.node = node    # The statement or body.
+        self.slot_count = slot_count    # Number of values reused in the scope.
+        self.start = node.start
+        self.end = node.end
+        self.src = node.src
+
+
+# Node for an expression folded into a constant before the program runs. The value is the Python
+# int, float or str of the Number or String the expression evaluates to.
+class ConstantNode(SpanNode):
+    __slots__ = ('value', 'contextual')
+
+    def __init__(self, value, contextual, start, end, src):
+        self.value = value  # Python value of the constant.
+        self.contextual = contextual    # Whether the value takes the context it is evaluated in; values derived from 'true' and 'false' have none.
+        self.start = start  # Offset of the place the value reports errors at.
+        self.end = end  # Offset just past that place.
+        self.src = src
+
+
+# Node for a call to a named arrow function whose body was inlined. The call runs the inlined body
+# when the name still refers to that function, and makes an ordinary call otherwise.
+class InlineCallNode(SpanNode):
+    __slots__ = ('node_to_call', 'arg_nodes', 'function', 'body')
+
+    def __init__(self, call, function, body):
+        self.node_to_call = call.node_to_call   # The name of the function.
+        self.arg_nodes = call.arg_nodes
+        self.function = function    # The FuncDefNode that was inlined.
+        self.body = body    # Copy of its body, reading the arguments through ArgNodes.
+        self.start = call.start
+        self.end = call.end
+        self.src = call.src
+
+
+# Node for an argument read in an inlined function body.
+class ArgNode(TokenNode):
+    __slots__ = ('index',)
+
+    def __init__(self, tok, index):
+        self.tok = tok  # The name of the argument in the body.
+        self.index = index  # Index of the argument in the call.
+
+
+# Child fields of every node kind, as (attribute, holds a list) pairs.
+CHILD_FIELDS = {
+    NumberNode: (),
+    StringNode: (),
+    VarAccessNode: (),
+    BoolAccessNode: (),
+    ListNode: (('element_nodes', True),),
+    BinOpNode: (('left_node', False), ('right_node', False)),
+    UnaryOpNode: (('node', False),),
+    ReturnNode: (('node_to_return', False),),
+    FuncDefNode: (('body_node', False),),
+    LambdaDefNode: (('body_node', False),),
+    CallNode: (('node_to_call', False), ('arg_nodes', True)),
+    SharedNode: (('node', False),),
+    ReuseNode: (('node', False),),
+    ScopeNode: (('node', False),),
+    ConstantNode: (),
+    InlineCallNode: (('node_to_call', False), ('arg_nodes', True), ('body', False)),
+    ArgNode: (),
+}
+
+# Nodes that call a function value.
+CALL_NODES = (CallNode, InlineCallNode)
+
+
+# Returns the child nodes of a node, in evaluation order.
+def children(node):
+    result = []
+    for field, is_list in CHILD_FIELDS[type(node)]:
+        value = getattr(node, field)
+        if is_list:
+            result.extend(value)
+        elif value is not None:
+            result.append(value)
+    return result
+
+
+# Replaces every child of a node with transform(child), in evaluation order.
+def transform_children(node, transform):
+    for field, is_list in CHILD_FIELDS[type(node)]:
+        value = getattr(node, field)
+        if is_list:
+            setattr(node, field, [transform(child) for child in value])
+        elif value is not None:
+            setattr(node, field, transform(value))
+
+
+# Returns the key of a node's place in its source, as profiles record it.
+def site_key(node):
+    return f'{node.start}:{node.end}'
@@ -0,0 +1,239 @@
+from OPTIMIZER.nodes import *
+from OPTIMIZER.inlining import Inliner, HOT_CALLS
+from OPTIMIZER.purity import PurityAnalyzer
+from OPTIMIZER.dead_code import statement_node
+from PARSER.cache import CACHE_DIR, cache_key
+import json
+import os
+import tempfile
+
+
+# Most distinct argument lists recorded per function; a function called with more is not memoized.
+MAX_TRACKED_ARGUMENTS = 1000
+
+# Global names a memoized function may read besides its arguments and other memoized functions.
+STABLE_GLOBALS = {'null', 'PI', 'isNum', 'isFunc'}
+
+FUNCTION_NODES = (FuncDefNode, LambdaDefNode)
+
+
+# PROFILE
+# Counts what happens at the calls and binary operators of one program while it runs: how often
+# every call site runs, how often every function is called and with how many distinct argument
+# lists, whether the operands of every operator were numbers, and whether every 'and' and 'or'
+# short-circuited. Everything is keyed by the place of the node in the source, and nodes of other
+# sources, like the scripts the program runs, are not recorded.
+class Profile:
+    def __init__(self, src):
+        self.src = src  # SourceText of the program being profiled.
+        self.calls = {}     # Site key of a call -> times it ran.
+        self.functions = {}     # Site key of a function body -> [calls, set of argument keys, or None once untracked].
+        self.operands = {}  # Site key of an operator -> [times both operands were numbers, other times].
+        self.branches = {}  # Site key of an 'and' or 'or' -> [times it short-circuited, times it did not].
+
+    # Records a call. body_node is the body of the function called, or None for a built-in, and
+    # arg_key the key of the arguments, or None if they cannot be remembered.
+    def record_call(self, node, body_node, arg_key):
+        if node.src is not self.src:
+            return
+        key = site_key(node)
+        self.calls[key] = self.calls.get(key, 0) + 1
+        if body_node is None or body_node.src is not self.src:
+            return
+
+        key = site_key(body_node)
+        entry = self.functions.get(key)
+        if entry is None:
+            entry = self.functions[key] = [0, set()]
+        entry[0] += 1
+        seen = entry[1]
+        if seen is not None and arg_key not in seen:
+            if arg_key is None or len(seen) >= MAX_TRACKED_ARGUMENTS:
+                entry[1] = None
+            else:
+                seen.add(arg_key)
+
+    # Records whether both operands of a binary operator were numbers.
+    def record_operands(self, node, numbers):
+        if node.src is not self.src:
+            return
+        entry = self.operands.setdefault(site_key(node), [0, 0])
+        entry[0 if numbers else 1] += 1
+
+    # Records whether an 'and' or 'or' gave back its left operand without evaluating the right one.
+    def record_branch(self, node, short_circuits):
+        if node.src is not self.src:
+            return
+        entry = self.branches.setdefault(site_key(node), [0, 0])
+        entry[0 if short_circuits else 1] += 1
+
+    # Returns the profile as the JSON data stored in its file. Argument lists are stored as counts.
+    def to_json(self):
+        return {
+            'key': list(cache_key(self.src)),
+            'calls': self.calls,
+            'functions': {key: [calls, None if seen is None else len(seen)] for key, (calls, seen) in self.functions.items()},
+            'operands': self.operands,
+            'branches': self.branches,
+        }
+
+
+# Returns the profile file of a script, kept with its cached AST.
+def profile_path(fn):
+    directory, name = os.path.split(os.path.abspath(fn))
+    return os.path.join(directory, CACHE_DIR, f'{name}.profile.json')
+
+
+# Loads the profile recorded for a source, or returns None if there is none for its current text.
+def load_profile(src):
+    try:
+        with open(profile_path(src.fn), encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('key') != list(cache_key(src)):
+        return None
+    return data
+
+
+# Stores a profile next to its script, replacing the one recorded before. Like the AST cache the
+# file is moved into place once written, and sources that are not files get no profile.
+def store_profile(profile):
+    if not os.path.isfile(profile.src.fn):
+        return
+    path = profile_path(profile.src.fn)
+    tmp_path = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(profile.to_json(), f)
+        os.replace(tmp_path, path)
+    except OSError:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# PROFILE-GUIDED OPTIMIZATION
+# Uses a recorded profile to choose what to optimize: small functions are inlined at the call
+# sites that ran, and larger ones at hot sites; operators that only saw numbers check for numbers
+# first and compute them directly; and hot functions that keep being called with the same
+# arguments remember their results. A function is only memoized when its result depends on nothing
+# but its arguments: it is pure, and every name it reads is an argument, a stable built-in, or
+# another such function defined once at the top level that no argument anywhere shadows.
+class ProfileGuidedOptimizer:
+    def __init__(self, profile):
+        self.profile = profile  # Data of the profile file.
+        self.definitions = {}   # Name -> definitions binding it.
+        self.arg_names = set()  # Names bound as arguments somewhere.
+        self.top_level = set()  # ids of the named definitions that are statements of the program.
+        self.specialized = 0    # Operators that check for numbers first.
+        self.memoized = 0   # Definitions whose functions remember their results.
+
+    # Marks the operators whose operands were numbers every time they ran.
+    def specialize(self, ast):
+        seen = set()
+        nodes = [ast]
+        while nodes:
+            node = nodes.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            if type(node) is BinOpNode and not node.numeric:
+                numbers, others = self.profile['operands'].get(site_key(node), (0, 0))
+                if numbers and not others:
+                    node.speculative = True
+                    self.specialized += 1
+            nodes.extend(children(node))
+
+    # Records the definitions and argument names under a node.
+    def collect(self, node):
+        if type(node) in FUNCTION_NODES:
+            if node.var_name_tok:
+                self.definitions.setdefault(node.var_name_tok.value, []).append(node)
+            self.arg_names.update(tok.value for tok in node.arg_name_toks)
+        for child in children(node):
+            self.collect(child)
+
+    # Adds the names read under a node that are not bound by the definitions around them to names.
+    def free_names(self, node, bound, names):
+        node_type = type(node)
+        if node_type in FUNCTION_NODES:
+            bound = bound | {tok.value for tok in node.arg_name_toks}
+        elif node_type is VarAccessNode and node.tok.value not in bound:
+            names.add(node.tok.value)
+        for child in children(node):
+            self.free_names(child, bound, names)
+
+    # Returns the definition a free name read by a memoized function refers to, STABLE_GLOBALS if
+    # it is a stable built-in, or None if it may refer to anything else.
+    def resolve(self, name):
+        if name in self.arg_names:
+            return None
+        definitions = self.definitions.get(name, ())
+        if not definitions:
+            return STABLE_GLOBALS if name in STABLE_GLOBALS else None
+        if len(definitions) > 1 or id(definitions[0]) not in self.top_level:
+            return None
+        return definitions[0]
+
+    # Returns whether the profile found a function hot and called with repeated arguments.
+    def is_repetitive(self, function):
+        calls, distinct = self.profile['functions'].get(site_key(function.body_node), (0, None))
+        return calls >= HOT_CALLS and distinct is not None and distinct * 2 <= calls
+
+    # Marks the definitions worth memoizing whose results depend only on their arguments. Every
+    # candidate is assumed to qualify until it reads a name that may refer to something else.
+    def memoize(self, ast):
+        purity = PurityAnalyzer()
+        purity.analyze(ast)
+        if purity.may_run:
+            return
+        self.collect(ast)
+        if type(ast) is ListNode:
+            self.top_level = {id(statement_node(element_node)) for element_node in ast.element_nodes}
+
+        reads = {}
+        for function in purity.functions:
+            if function.pure:
+                names = set()
+                self.free_names(function, set(), names)
+                reads[id(function)] = [self.resolve(name) for name in names]
+        closed = set(reads)
+        changed = True
+        while changed:
+            changed = False
+            for function_id in list(closed):
+                for target in reads[function_id]:
+                    if target is None or (target is not STABLE_GLOBALS and id(target) not in closed):
+                        closed.discard(function_id)
+                        changed = True
+                        break
+
+        for function in purity.functions:
+            if id(function) in closed and self.is_repetitive(function):
+                function.memoize = True
+                self.memoized += 1
+
+
+# Optimizes a program with the profile recorded for its source by a run with profile=True.
+# Returns the new AST and a report of what the profile changed; without a profile for the current
+# text of the source, the AST is returned as it is.
+def apply_profile(ast):
+    profile = load_profile(ast.src)
+    if profile is None:
+        return ast, {'pass': 'pgo', 'profile': False, 'inlined_calls': 0, 'specialized_operations': 0, 'memoized_functions': 0}
+
+    inliner = Inliner(profile['calls'])
+    inliner.collect(ast)
+    ast = inliner.inline(ast)
+    optimizer = ProfileGuidedOptimizer(profile)
+    optimizer.specialize(ast)
+    optimizer.memoize(ast)
+    return ast, {
+        'pass': 'pgo',
+        'profile': True,
+        'inlined_calls': inliner.inlined,
+        'specialized_operations': optimizer.specialized,
+        'memoized_functions': optimizer.memoized,
+    }
@@ -0,0 +1,101 @@
+from OPTIMIZER.nodes import *
+
+
+# Global names of the built-in functions that read input, write output or run other scripts.
+EFFECTFUL_BUILTINS = {'print', 'INPUT', 'INPUT_INT', 'clear', 'cls', 'run'}
+
+# Global names of the built-in functions that only compute their result.
+PURE_BUILTINS = {'isNum', 'isFunc'}
+
+# Callee whose function cannot be known before the program runs.
+UNKNOWN = None
+
+
+# PURITY ANALYSIS
+# Marks every function and lambda definition as pure or effectful. A function is effectful when
+# a call in its body may reach an effectful built-in, directly or through other functions.
+# Calls are resolved by name over the whole program, since scoping is dynamic: a name may refer to
+# any function defined with it, and a name that is also an argument may refer to anything. Once the
+# program may call run(), the script it runs can rebind any name, so no call by name is resolved.
+# The global symbol table is kept between programs, so a name the program does not define may be
+# bound to any function by an earlier or later one, and is not resolved either.
+class PurityAnalyzer:
+    def __init__(self):
+        self.functions = []     # Every function and lambda definition.
+        self.callees = {}   # id of a definition -> what the calls in its body may call.
+        self.definitions = {}   # Name -> definitions binding it.
+        self.arg_names = set()  # Names bound as arguments somewhere.
+        self.may_run = False    # Whether the program reads the name 'run'.
+
+    # Records the definitions, names and calls under a node. function is the innermost definition
+    # around it, or None at the top level, whose calls do not belong to any function.
+    def collect(self, node, function):
+        node_type = type(node)
+        if node_type is FuncDefNode or node_type is LambdaDefNode:
+            self.functions.append(node)
+            self.callees[id(node)] = []
+            if node.var_name_tok:
+                self.definitions.setdefault(node.var_name_tok.value, []).append(node)
+            self.arg_names.update(tok.value for tok in node.arg_name_toks)
+            self.collect(node.body_node, node)
+            return
+
+        if node_type is VarAccessNode and node.tok.value == 'run':
+            self.may_run = True
+        elif node_type in CALL_NODES and function is not None:
+            self.callees[id(function)].append(node.node_to_call)
+        for child in children(node):
+            self.collect(child, function)
+
+    # Returns what a called node may evaluate to: function definitions, names of built-ins, or UNKNOWN.
+    def resolve(self, node):
+        node_type = type(node)
+        if node_type is FuncDefNode or node_type is LambdaDefNode:
+            return [node]
+        if node_type is not VarAccessNode or self.may_run:
+            return [UNKNOWN]
+
+        name = node.tok.value
+        if name in self.arg_names:
+            return [UNKNOWN]
+        targets = list(self.definitions.get(name, []))
+        if name in EFFECTFUL_BUILTINS:
+            targets.append(name)
+        elif not targets and name not in PURE_BUILTINS:
+            return [UNKNOWN]
+        return targets
+
+    # Marks the definitions of a program. Functions start out pure and become effectful once they
+    # may call something effectful, until nothing changes, so recursion alone keeps a function pure.
+    def analyze(self, ast):
+        self.collect(ast, None)
+        targets = {id(function): [target for callee in self.callees[id(function)] for target in self.resolve(callee)]
+                   for function in self.functions}
+        effectful = set()
+        changed = True
+        while changed:
+            changed = False
+            for function in self.functions:
+                if id(function) in effectful:
+                    continue
+                for target in targets[id(function)]:
+                    if target is UNKNOWN or type(target) is str or id(target) in effectful:
+                        effectful.add(id(function))
+                        changed = True
+                        break
+
+        for function in self.functions:
+            function.pure = id(function) not in effectful
+        return len(effectful)
+
+
+# Marks every function and lambda definition of a program as pure or effectful; the functions
+# created from them carry the mark at run time. Returns the AST and a report of the counts.
+def analyze_purity(ast):
+    analyzer = PurityAnalyzer()
+    effectful = analyzer.analyze(ast)
+    return ast, {
+        'pass': 'purity',
+        'pure_functions': len(analyzer.functions) - effectful,
+        'effectful_functions': effectful,
+    }
@@ -0,0 +1,116 @@
+from OPTIMIZER.nodes import *
+
+
+# Address of a name read from the global symbol table.
+GLOBAL_ADDRESS = -1
+
+FUNCTION_NODES = (FuncDefNode, LambdaDefNode)
+
+# Address of a node read in scopes that give it different addresses.
+CONFLICT = object()
+
+
+# Returns the names a function binds in its frame: its arguments, then the names of the functions
+# defined while its body runs, outside of the functions defined in it.
+def frame_layout(function):
+    return body_layout([tok.value for tok in function.arg_name_toks], function.body_node)
+
+
+# Returns the frame layout of a function given by its argument names and body.
+def body_layout(arg_names, body_node):
+    layout = {}
+    for name in arg_names:
+        layout.setdefault(name, len(layout))
+    nodes = [body_node]
+    while nodes:
+        node = nodes.pop()
+        if type(node) in FUNCTION_NODES:
+            if node.var_name_tok:
+                layout.setdefault(node.var_name_tok.value, len(layout))
+            continue
+        nodes.extend(children(node))
+    return layout
+
+
+# RESOLVER
+# Gives every function a fixed layout for its frame, so its calls keep their names in a list
+# instead of a new SymbolTable, and gives the names read an address. Scoping is dynamic, so the
+# only addresses known before the program runs are those of the frame a name is read in and of
+# the globals: a name bound in the frame of the function reading it is read from its slot, and a
+# name no function of the program binds is read from the global symbol table, however deep the
+# calls go. Other names are still looked up through the frames of the callers. A program that may
+# call run() is left unresolved, since the scripts it runs can bind any name in any frame.
+class Resolver:
+    def __init__(self):
+        self.layouts = {}   # id of a definition -> layout of its frame.
+        self.frame_names = set()    # Names bound in the frame of some function.
+        self.addresses = {}     # id of a name read -> (node, address).
+        self.may_run = False    # Whether the program reads the name 'run'.
+
+    # Lays out the frames of the definitions under a node.
+    def collect(self, node):
+        node_type = type(node)
+        if node_type in FUNCTION_NODES and id(node) not in self.layouts:
+            layout = frame_layout(node)
+            self.layouts[id(node)] = layout
+            self.frame_names.update(layout)
+        elif node_type is VarAccessNode and node.tok.value == 'run':
+            self.may_run = True
+        for child in children(node):
+            self.collect(child)
+
+    # Finds the address of every name read under a node. function is the definition whose frame
+    # the node is evaluated in, or None at the top level, which runs in the global symbol table.
+    # Inlined bodies run in the frame of their caller.
+    def resolve(self, node, function):
+        node_type = type(node)
+        if node_type in FUNCTION_NODES:
+            self.resolve(node.body_node, node)
+            return
+        if node_type is VarAccessNode:
+            name = node.tok.value
+            if function is None or name not in self.frame_names:
+                address = GLOBAL_ADDRESS
+            else:
+                address = self.layouts[id(function)].get(name)
+            # Shared subtrees can be read in several frames, and only keep an address they all agree on
+            previous = self.addresses.get(id(node), (node, address))[1]
+            self.addresses[id(node)] = node, address if previous == address else CONFLICT
+            return
+        for child in children(node):
+            self.resolve(child, function)
+
+    # Resolves a program and sets the layouts and addresses on its nodes.
+    def analyze(self, ast):
+        self.collect(ast)
+        if self.may_run:
+            self.layouts = {}
+            return
+        self.resolve(ast, None)
+        nodes = [ast]
+        seen = set()
+        while nodes:
+            node = nodes.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            if type(node) in FUNCTION_NODES:
+                node.frame_layout = self.layouts[id(node)]
+            nodes.extend(children(node))
+        for node, address in self.addresses.values():
+            node.address = None if address is CONFLICT else address
+
+
+# Lays out the frames of a program's functions and resolves the names it reads to frame slots and
+# globals. Returns the AST and a report of the frames laid out and of the reads resolved.
+def resolve_names(ast):
+    resolver = Resolver()
+    resolver.analyze(ast)
+    addresses = [address for _, address in resolver.addresses.values()]
+    return ast, {
+        'pass': 'resolve',
+        'frames': len(resolver.layouts),
+        'local_reads': sum(1 for address in addresses if address is not CONFLICT and address is not None and address >= 0),
+        'global_reads': addresses.count(GLOBAL_ADDRESS),
+        'dynamic_reads': sum(1 for address in addresses if address is None or address is CONFLICT),
+    }
@@ -0,0 +1,259 @@
+from OPTIMIZER.nodes import *
+
+
+# Kinds of values. The type of an expression is the set of kinds it may evaluate to, as bits;
+# an empty type means the expression never gives a value, because it fails or never runs.
+NUMBER = 1
+STRING = 2
+FUNCTION = 4
+LIST = 8
+ANY = NUMBER | STRING | FUNCTION | LIST
+
+KIND_NAMES = ((NUMBER, 'number'), (STRING, 'string'), (FUNCTION, 'function'), (LIST, 'list'))
+FUNCTION_NODES = (FuncDefNode, LambdaDefNode)
+
+# Types of the global names bound before the program runs.
+GLOBAL_TYPES = {
+    'null': NUMBER, 'PI': NUMBER,
+    'print': FUNCTION, 'INPUT': FUNCTION, 'INPUT_INT': FUNCTION, 'clear': FUNCTION, 'cls': FUNCTION,
+    'isNum': FUNCTION, 'isFunc': FUNCTION, 'run': FUNCTION,
+}
+# Types of the values the built-in functions return, by global name.
+BUILTIN_RESULTS = {
+    'print': NUMBER, 'INPUT': ANY, 'INPUT_INT': NUMBER, 'clear': NUMBER, 'cls': NUMBER,
+    'isNum': NUMBER, 'isFunc': NUMBER, 'run': NUMBER,
+}
+
+
+# Returns the type of a binary operation on operands of the given types, following the methods
+# of Number, String and List.
+def binary_result(op, left, right):
+    if op == TT_AND or op == TT_OR:
+        # A number on the left is given back or combined with a number; any other value fails
+        return NUMBER if left & NUMBER else 0
+
+    result = NUMBER if left & NUMBER and right & NUMBER else 0
+    if left & STRING:
+        if (op == TT_PLUS and right & STRING) or (op == TT_MUL and right & NUMBER):
+            result |= STRING
+    if left & LIST:
+        if op == TT_PLUS and right:
+            result |= LIST
+        elif (op == TT_MINUS and right & NUMBER) or (op == TT_MUL and right & LIST):
+            result |= LIST
+        elif op == TT_DIV and right & NUMBER:
+            result |= ANY
+    return result
+
+
+# Returns the type of a unary operation on an operand of the given type.
+def unary_result(op, operand):
+    if op == TT_PLUS:
+        return operand
+    if op == TT_MINUS:
+        return operand & (NUMBER | STRING)
+    return operand & NUMBER
+
+
+# Returns the name of a type, for error messages.
+def type_name(kinds):
+    return ' or '.join(name for kind, name in KIND_NAMES if kinds & kind)
+
+
+# TYPE INFERENCE
+# Infers the kinds of values every expression may evaluate to, and marks the operators whose
+# operands are always numbers so the interpreter evaluates them without checking their types.
+# The argument types of a function are the types passed to it at its call sites. Scoping is
+# dynamic, so a name that is not an argument of the function reading it may be any argument or
+# function with that name. Functions whose values escape, by being passed, returned or read by
+# name other than to call them, can be called from anywhere and take arguments of any type.
+# The whole program is analyzed at once, against a global symbol table holding only the built-ins:
+# a program that may call run() is left unmarked, since the scripts it runs can call its functions.
+class TypeInferrer:
+    def __init__(self):
+        self.functions = []     # Every function and lambda definition.
+        self.definitions = {}   # Name -> definitions binding it.
+        self.params = {}    # Name -> definitions having an argument with that name.
+        self.arg_indexes = {}   # id of a definition -> index of every argument name.
+        self.escaped_names = set()  # Names read other than to call them.
+        self.escaped = set()    # ids of the definitions whose values escape.
+        self.may_run = False    # Whether the program reads the name 'run'.
+        self.arg_types = {}     # id of a definition -> type of every argument.
+        self.return_types = {}  # id of a definition -> type of its result.
+        self.changed = False    # Whether the last round of inference widened a type.
+        self.marking = False    # Whether the types are final and operators are being marked.
+        self.numeric = {}   # id of an operator -> (operator, whether its operands were numbers on every visit).
+        self.type_errors = {}   # id of an operator -> error for operands that always fail.
+
+    # Records the definitions and names under a node. escapes is whether the value of the node
+    # can reach other code, which it cannot as the callee of a call or as a statement.
+    def collect(self, node, escapes):
+        node_type = type(node)
+        if node_type in FUNCTION_NODES:
+            self.functions.append(node)
+            if escapes:
+                self.escaped.add(id(node))
+            if node.var_name_tok:
+                self.definitions.setdefault(node.var_name_tok.value, []).append(node)
+            self.arg_indexes[id(node)] = {tok.value: index for index, tok in enumerate(node.arg_name_toks)}
+            for tok in node.arg_name_toks:
+                self.params.setdefault(tok.value, []).append(node)
+            self.collect(node.body_node, True)
+        elif node_type is VarAccessNode:
+            if node.tok.value == 'run':
+                self.may_run = True
+            if escapes:
+                self.escaped_names.add(node.tok.value)
+        elif node_type in CALL_NODES:
+            self.collect(node.node_to_call, False)
+            for child in children(node)[1:]:
+                self.collect(child, True)
+        elif node_type is ListNode:
+            for element_node in node.element_nodes:
+                self.collect(element_node, False)
+        else:
+            for child in children(node):
+                self.collect(child, True)
+
+    # Widens the argument types of a definition with the types passed by a call.
+    def add_args(self, function, arg_types):
+        types = self.arg_types[id(function)]
+        for index, arg_type in enumerate(arg_types):
+            if arg_type & ~types[index]:
+                types[index] |= arg_type
+                self.changed = True
+
+    # Widens the result type of a definition.
+    def add_return(self, function, return_type):
+        if return_type & ~self.return_types[id(function)]:
+            self.return_types[id(function)] |= return_type
+            self.changed = True
+
+    # Returns the type of a name read in the given function.
+    def name_type(self, name, function):
+        result = FUNCTION if name in self.definitions else 0
+        if function is not None:
+            index = self.arg_indexes[id(function)].get(name)
+            if index is not None:
+                return result | self.arg_types[id(function)][index]
+
+        for definition in self.params.get(name, ()):
+            result |= self.arg_types[id(definition)][self.arg_indexes[id(definition)][name]]
+        return result | GLOBAL_TYPES.get(name, 0)
+
+    # Returns the type of a call, passing the argument types to every definition it may call.
+    def call_type(self, node, function, arg_types):
+        callee = node.node_to_call
+        callee_type = type(callee)
+        if callee_type in FUNCTION_NODES:
+            self.infer(callee, function, None)
+            targets = [callee]
+            result = 0
+        elif callee_type is VarAccessNode:
+            name = callee.tok.value
+            targets = self.definitions.get(name, ())
+            result = ANY if name in self.params else BUILTIN_RESULTS.get(name, 0)
+        else:
+            self.infer(callee, function, None)
+            return ANY
+
+        for target in targets:
+            if len(target.arg_name_toks) == len(arg_types):
+                self.add_args(target, arg_types)
+                result |= self.return_types[id(target)]
+        return result
+
+    # Records the types of an operator's operands once the types are final.
+    def mark(self, node, operand_types, result, details):
+        previous = self.numeric.get(id(node), (node, True))[1]
+        self.numeric[id(node)] = node, previous and all(operand_type == NUMBER for operand_type in operand_types)
+        if result == 0 and all(operand_types):
+            self.type_errors.setdefault(id(node), StaticTypeError(node.pos_start, node.pos_end, details))
+
+    # Returns the type of a node. function is the definition whose body holds it, and arg_types
+    # the argument types of the inlined call whose body holds it.
+    def infer(self, node, function, arg_types):
+        node_type = type(node)
+        if node_type is NumberNode or node_type is BoolAccessNode:
+            return NUMBER
+        elif node_type is StringNode:
+            return STRING
+        elif node_type is ConstantNode:
+            return STRING if type(node.value) is str else NUMBER
+        elif node_type is VarAccessNode:
+            return self.name_type(node.tok.value, function)
+        elif node_type is ArgNode:
+            return arg_types[node.index]
+
+        elif node_type in FUNCTION_NODES:
+            body_type = self.infer(node.body_node, node, None)
+            # A block body gives null unless it returns a value
+            self.add_return(node, body_type if node.should_auto_return else NUMBER)
+            return FUNCTION
+        elif node_type is ListNode:
+            for element_node in node.element_nodes:
+                self.infer(element_node, function, arg_types)
+            return LIST
+        elif node_type is ReturnNode:
+            return_type = self.infer(node.node_to_return, function, arg_types) if node.node_to_return else NUMBER
+            if function is not None:
+                self.add_return(function, return_type)
+            return 0
+
+        elif node_type is BinOpNode:
+            left = self.infer(node.left_node, function, arg_types)
+            right = self.infer(node.right_node, function, arg_types)
+            result = binary_result(node.op_tok.type, left, right)
+            if self.marking:
+                self.mark(node, (left, right), result, f'Illegal operation between {type_name(left)} and {type_name(right)}')
+            return result
+        elif node_type is UnaryOpNode:
+            operand = self.infer(node.node, function, arg_types)
+            result = unary_result(node.op_tok.type, operand)
+            if self.marking:
+                self.mark(node, (operand,), result, f'Illegal operation on {type_name(operand)}')
+            return result
+
+        elif node_type in CALL_NODES:
+            call_arg_types = [self.infer(arg_node, function, arg_types) for arg_node in node.arg_nodes]
+            result = self.call_type(node, function, call_arg_types)
+            if node_type is InlineCallNode:
+                result |= self.infer(node.body, function, call_arg_types)
+            return result
+        elif node_type is SharedNode or node_type is ReuseNode or node_type is ScopeNode:
+            return self.infer(node.node, function, arg_types)
+
+        for child in children(node):
+            self.infer(child, function, arg_types)
+        return ANY
+
+    # Infers the types of a program until they stop widening, then marks its operators.
+    def analyze(self, ast):
+        self.collect(ast, False)
+        if self.may_run:
+            return
+        for function in self.functions:
+            escaped = id(function) in self.escaped or (function.var_name_tok and function.var_name_tok.value in self.escaped_names)
+            self.arg_types[id(function)] = [ANY if escaped else 0] * len(function.arg_name_toks)
+            self.return_types[id(function)] = 0
+
+        self.changed = True
+        while self.changed:
+            self.changed = False
+            self.infer(ast, None, None)
+        self.marking = True
+        self.infer(ast, None, None)
+        for node, numeric in self.numeric.values():
+            node.numeric = numeric
+
+
+# Marks the operators of a program that only ever take numbers, and finds those whose operands
+# can never be operated on. Returns the AST and a report of the marked operators and type errors.
+def infer_types(ast):
+    inferrer = TypeInferrer()
+    inferrer.analyze(ast)
+    return ast, {
+        'pass': 'types',
+        'numeric_operations': sum(1 for _, numeric in inferrer.numeric.values() if numeric),
+        'type_errors': list(inferrer.type_errors.values()),
+    }
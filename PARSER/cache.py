@@ -0,0 +1,102 @@
+from PARSER.parser import *
+import gc
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+
+
+# Bumped whenever the AST classes or the meaning of a parsed program change, so older cache files are ignored.
+INTERPRETER_VERSION = 'benmit-1'
+CACHE_DIR = '__lambdacache__'
+
+
+# Pickler that leaves the source text out of the cache file. Every token refers to the SourceText
+# of its file, which is replaced by the one being run when the program is loaded again.
+class ProgramPickler(pickle.Pickler):
+    def persistent_id(self, obj):
+        if isinstance(obj, SourceText):
+            return 'src'
+        return None
+
+
+# Unpickler that points the tokens of a cached program at the given source.
+class ProgramUnpickler(pickle.Unpickler):
+    def __init__(self, file, src):
+        super().__init__(file)
+        self.src = src  # SourceText of the program being run
+
+    def persistent_load(self, pid):
+        if pid != 'src':
+            raise pickle.UnpicklingError(f'unknown persistent id {pid!r}')
+        return self.src
+
+
+# Returns the cache file of a script, next to it like __pycache__ is for Python modules.
+def cache_path(fn):
+    directory, name = os.path.split(os.path.abspath(fn))
+    return os.path.join(directory, CACHE_DIR, f'{name}.{sys.implementation.cache_tag}.pickle')
+
+
+# Key of a program: the interpreter version and a hash of the source text.
+def cache_key(src):
+    text = src.text
+    data = text.encode('utf-8') if isinstance(text, str) else text
+    return INTERPRETER_VERSION, hashlib.sha256(data).hexdigest()
+
+
+# Loads the cached AST of a source, or returns None if there is none with the given key.
+def load_program(src, key):
+    # Loading creates nothing but acyclic nodes, so the garbage collector is paused instead of
+    # rescanning every live object while the tree is built
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(cache_path(src.fn), 'rb') as f:
+            unpickler = ProgramUnpickler(f, src)
+            if unpickler.load() != key:
+                return None
+            return unpickler.load()
+    except Exception:
+        # A missing, stale or damaged cache file is only a cache miss
+        return None
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+# Stores the AST of a source. The file is written under a temporary name and moved into place,
+# so other processes never read a partly written file. Failing to write the cache is not an error.
+def store_program(src, node, key):
+    path = cache_path(src.fn)
+    tmp_path = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            pickler = ProgramPickler(f, pickle.HIGHEST_PROTOCOL)
+            pickler.dump(key)
+            pickler.dump(node)
+        os.replace(tmp_path, path)
+    except (OSError, pickle.PicklingError, RecursionError):
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# Parses a script through the cache: a program already parsed with the same text and interpreter
+# version is loaded without lexing or parsing it. Sources that are not files are always parsed.
+def parse_cached(fn, text, parser_class=Parser):
+    src = text if isinstance(text, SourceText) else SourceText(fn, text)
+    if not os.path.isfile(fn):
+        return parse_program(fn, src, parser_class)
+
+    key = cache_key(src)
+    node = load_program(src, key)
+    if node is not None:
+        return node, None
+
+    node, error = parse_program(fn, src, parser_class)
+    if not error:
+        store_program(src, node, key)
+    return node, error
@@ -0,0 +1,199 @@
+from PARSER.parser import *
+from bisect import bisect_left
+
+
+# SEGMENT
+# Source of the tokens of one top-level statement. Tokens keep the offsets they were lexed at,
+# and the segment records how far the statement has moved since, so shifting a reused
+# statement after an edit is a single integer update.
+class Segment:
+    def __init__(self, document):
+        self.document = document    # Document the statement belongs to.
+        self.shift = 0  # Distance the statement moved since it was lexed.
+
+    @property
+    def fn(self):
+        return self.document.fn
+
+    @property
+    def text(self):
+        return self.document.text
+
+    # Creates a position that follows the statement when it moves.
+    def position(self, idx):
+        return OffsetPosition(self, idx)
+
+    # Builds the Position of an offset lexed in this segment, in the current text of the document.
+    def locate(self, idx):
+        return self.document.src.locate(idx + self.shift)
+
+
+# CHUNK
+# One top-level statement of the document, or a run of source that failed to tokenize or parse.
+class Chunk:
+    def __init__(self, segment, start, end, node=None, error=None, first_tok=None, backed_out=False):
+        self.segment = segment  # Segment the tokens of the chunk refer to.
+        self.lex_start = start  # Offset of the first token when it was lexed.
+        self.lex_end = end  # Offset past the last token when it was lexed.
+        self.node = node    # Parsed statement, or None for an error chunk.
+        self.error = error  # Error of an error chunk.
+        self.first_tok = first_tok  # First token of an error chunk.
+        self.backed_out = backed_out    # Whether the full parser would back out of this statement before failing.
+
+    @property
+    def start(self):
+        return self.lex_start + self.segment.shift
+
+    @property
+    def end(self):
+        return self.lex_end + self.segment.shift
+
+
+# INCREMENTAL DOCUMENT
+# Keeps a parsed document up to date through text edits. An edit re-lexes and re-parses only the
+# top-level statements around it, until the token stream lines up again with a statement that
+# starts after the edit. Every other statement, including its FuncDefNode subtrees, is reused.
+class IncrementalDocument:
+    def __init__(self, fn, text):
+        self.fn = fn    # File name
+        self.text = text    # Current text of the document
+        self.src = SourceText(fn, text)
+        self.segment = None     # Segment given to the tokens the parser pulls next.
+        self.chunks, _ = self.parse_window(0, [])
+        self.statements = [chunk.node for chunk in self.chunks]  # Parsed statement of every chunk.
+        self.error_chunks = [chunk for chunk in self.chunks if chunk.error]
+        self.last_window = (0, len(text))   # Range of the text re-parsed by the last update, for diagnostics.
+
+    # Replaces text[start:end] with new_text and re-parses the statements it touches.
+    def edit(self, start, end, new_text):
+        delta = len(new_text) - (end - start)
+        self.text = self.text[:start] + new_text + self.text[end:]
+        self.src = SourceText(self.fn, self.text)
+
+        # The first statement the edit can change. An edit before a statement may also join it with the previous one.
+        chunks = self.chunks
+        first = bisect_left(chunks, start, key=lambda chunk: chunk.end)
+        if first == len(chunks) or start <= chunks[first].start:
+            first -= 1
+        window_start = chunks[first].start if first >= 0 else 0
+        first = max(first, 0)
+
+        # Statements that start after the edit are the places where the new tokens may line up with the old ones.
+        last = bisect_left(chunks, max(end, window_start + 1), lo=first, key=lambda chunk: chunk.start)
+        for chunk in chunks[last:]:
+            chunk.segment.shift += delta
+
+        new_chunks, reused_chunks = self.parse_window(window_start, chunks[last:])
+        reused_from = len(chunks) - len(reused_chunks)
+        self.chunks[first:reused_from] = new_chunks
+        self.statements[first:reused_from] = [chunk.node for chunk in new_chunks]
+
+        reused_start = reused_chunks[0].start if reused_chunks else len(self.text)
+        self.error_chunks = [chunk for chunk in self.chunks if chunk.error]
+        self.last_window = (window_start, reused_start)
+
+    # Lexes and parses statements from window_start until the tokens line up with the start of one of
+    # the candidate chunks. Returns the new chunks and the candidates that are reused as they are.
+    def parse_window(self, window_start, candidates):
+        lexer = Lexer(self.fn, self.text)
+        lexer.src = Segment(self)   # Character errors then move with the text like everything else
+        tokens = lexer.iter_tokens(window_start)
+        window_tokens = []
+        next_candidate = 0
+
+        while True:
+            # Lex up to the next candidate that starts right after a NEWLINE
+            resync_idx = None
+            for tok in tokens:
+                while next_candidate < len(candidates) and candidates[next_candidate].start < tok.start:
+                    next_candidate += 1
+                if (next_candidate < len(candidates) and candidates[next_candidate].start == tok.start
+                        and window_tokens and window_tokens[-1].type == TT_NEWLINE):
+                    resync_idx = tok.start
+                    window_tokens.append(Token(TT_EOF, None, tok.start, tok.start + 1, tok.src))
+                    break
+                window_tokens.append(tok)
+
+            new_chunks, at_window_end = self.parse_statements(window_tokens, lexer)
+            if lexer.error:
+                # Nothing past a character error is lexed; the error chunk owns the text up to the next candidate
+                error_idx = window_tokens[-1].start
+                while next_candidate < len(candidates) and candidates[next_candidate].start <= error_idx:
+                    next_candidate += 1
+                if next_candidate < len(candidates):
+                    new_chunks[-1].lex_end = candidates[next_candidate].start
+                return new_chunks, candidates[next_candidate:]
+            if resync_idx is None:
+                return new_chunks, []
+            if not at_window_end:
+                return new_chunks, candidates[next_candidate:]
+
+            # The last statement ran into the end of the window; take in the next statement and try again
+            window_tokens.pop()
+            window_tokens.append(tok)
+            next_candidate += 1
+
+    # Parses the statements of a window, giving each its own segment.
+    # Returns the chunks, and whether parsing failed because it reached the end of the window.
+    def parse_statements(self, window_tokens, lexer):
+        chunks = []
+        self.segment = Segment(self)
+        parser = Parser(self.pull(window_tokens))
+        while True:
+            while parser.current_tok.type == TT_NEWLINE:
+                parser.advance()
+            if parser.current_tok.type == TT_EOF and not lexer.error:
+                return chunks, False
+
+            segment = lexer.src if lexer.error else Segment(self)
+            self.segment = segment
+            first_tok = parser.current_tok
+            first_tok.src = segment
+            start = first_tok.start
+
+            if lexer.error:
+                res = None
+            else:
+                res = parser.statement()
+
+            if res is None or res.error:
+                window_end = window_tokens[-1].start
+                chunks.append(Chunk(segment, start, window_end, error=lexer.error or res.error, first_tok=first_tok, backed_out=res is not None))
+                return chunks, lexer.error is None and res.error.pos_start.idx >= window_end
+
+            end = window_tokens[parser.tok_idx - 1].end
+            if parser.current_tok.type not in (TT_NEWLINE, TT_EOF):
+                error = InvalidSyntaxError(parser.current_tok.pos_start, parser.current_tok.pos_end, "Expected '+', '-', '*', '/', '%', '==', '!=', '<', '>', <=', '>=', 'and' or 'or'")
+                chunks.append(Chunk(segment, start, window_tokens[-1].start, error=error, first_tok=first_tok))
+                return chunks, False
+
+            chunks.append(Chunk(segment, start, end, node=res.node))
+
+    # Hands the tokens to the parser, pointing each at the segment of the statement being parsed.
+    def pull(self, window_tokens):
+        for tok in window_tokens:
+            tok.src = self.segment
+            yield tok
+
+    # Returns the parse result of the whole document, like Parser.parse does for the full text.
+    def parse(self):
+        res = ParseResult()
+        if not self.chunks:
+            return Parser(Lexer(self.fn, self.text).iter_tokens()).parse()
+
+        # Character errors take precedence over syntax errors, as in run()
+        for chunk in self.error_chunks:
+            if isinstance(chunk.error, (IllegalCharError, ExpectedCharError)):
+                return res.failure(chunk.error)
+
+        if self.error_chunks:
+            chunk = self.error_chunks[0]
+            # The parser only reports the real error of the first statement; later ones are backed out
+            if chunk.backed_out and chunk is not self.chunks[0]:
+                tok = chunk.first_tok
+                return res.failure(InvalidSyntaxError(tok.pos_start, tok.pos_end, "Expected '+', '-', '*', '/', '%', '==', '!=', '<', '>', <=', '>=', 'and' or 'or'"))
+            return res.failure(chunk.error)
+
+        # Positions are resolved lazily, so the line index is only built when something reads one
+        segment = Segment(self)
+        return res.success(ListNode(list(self.statements), 0, len(self.text) + 1, segment))
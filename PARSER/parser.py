@@ -2,134 +2,228 @@ from ERRORS.errors import *
 from LAXER.lexer import *
 
 
-# Node to represent a number in the abstract syntax tree (AST).
-class NumberNode:
+# AST nodes use __slots__ and keep character offsets instead of Position objects. Nodes made from one
+# token read their span from it; the others store the offsets of their first and last character and
+# the source they refer to. pos_start and pos_end build positions from the offsets only when asked.
+
+# Base of the nodes made from a single token.
+class TokenNode:
+    __slots__ = ('tok',)
+
     def __init__(self, tok):
         self.tok = tok
-        self.pos_start = self.tok.pos_start
-        self.pos_end = self.tok.pos_end
+
+    @property
+    def start(self):
+        return self.tok.start
+
+    @property
+    def end(self):
+        return self.tok.end
+
+    @property
+    def src(self):
+        return self.tok.src
+
+    @property
+    def pos_start(self):
+        return self.tok.pos_start
+
+    @property
+    def pos_end(self):
+        return self.tok.pos_end
+
+    # Pickles the node as its constructor arguments, which is much faster to load than its slots.
+    def __reduce__(self):
+        return type(self), (self.tok,)
+
+
+# Node to represent a number in the abstract syntax tree (AST).
+class NumberNode(TokenNode):
+    __slots__ = ()
 
     def __repr__(self):
         return f'{self.tok}'
 
 
 # Node to represent a string in the AST.
-class StringNode:
-    def __init__(self, tok):
-        self.tok = tok
-        self.pos_start = self.tok.pos_start
-        self.pos_end = self.tok.pos_end
+class StringNode(TokenNode):
+    __slots__ = ()
 
     def __repr__(self):
         return f'{self.tok}'
 
 
 # Node to represent a variable access in the AST.
-class VarAccessNode:
-    def __init__(self, var_name_tok):
-        self.var_name_tok = var_name_tok
-        self.pos_start = self.var_name_tok.pos_start
-        self.pos_end = self.var_name_tok.pos_end
+class VarAccessNode(TokenNode):
+    __slots__ = ('address',)
+
+    def __init__(self, tok):
+        self.tok = tok
+        self.address = None     # Slot of the name in the frame it is read in, or GLOBAL_ADDRESS, as the resolver found; None to look it up by name.
+
+    @property
+    def var_name_tok(self):
+        return self.tok
+
+
+# Base of the nodes spanning several tokens.
+class SpanNode:
+    __slots__ = ('start', 'end', 'src')
+
+    # Position of the first character of the node.
+    @property
+    def pos_start(self):
+        return self.src.position(self.start)
+
+    # Position just past the node.
+    @property
+    def pos_end(self):
+        return self.src.position(self.end)
 
 
 # Node to represent a list in the AST.
-class ListNode:
-    def __init__(self, element_nodes, pos_start, pos_end):
+class ListNode(SpanNode):
+    __slots__ = ('element_nodes',)
+
+    def __init__(self, element_nodes, start, end, src):
         self.element_nodes = element_nodes
-        self.pos_start = pos_start
-        self.pos_end = pos_end
+        self.start = start
+        self.end = end
+        self.src = src
+
+    # Pickles the node as its constructor arguments.
+    def __reduce__(self):
+        return type(self), (self.element_nodes, self.start, self.end, self.src)
 
 
 # Node to represent a boolean value in the AST.
-class BoolAccessNode:
-    def __init__(self, bool_name_tok):
-        self.bool_name_tok = bool_name_tok
-        self.pos_start = self.bool_name_tok.pos_start
-        self.pos_end = self.bool_name_tok.pos_end
+class BoolAccessNode(TokenNode):
+    __slots__ = ()
+
+    @property
+    def bool_name_tok(self):
+        return self.tok
 
 
 # Node to represent a binary operation (e.g., addition, subtraction) in the AST.
-class BinOpNode:
+class BinOpNode(SpanNode):
+    __slots__ = ('left_node', 'op_tok', 'right_node', 'numeric', 'speculative', 'quick')
+
     def __init__(self, left_node, op_tok, right_node):
         self.left_node = left_node
         self.op_tok = op_tok
         self.right_node = right_node
-        self.pos_start = self.left_node.pos_start
-        self.pos_end = self.right_node.pos_end
+        self.numeric = False    # Whether type inference proved both operands are numbers.
+        self.speculative = False    # Whether a profile only saw numbers as operands, so they are checked for that first.
+        self.quick = None   # Visit method the interpreter specialized the node to after running it, or None.
+        self.start = left_node.start
+        self.end = right_node.end
+        self.src = left_node.src
 
     # String representation of the binary operation node.
     def __repr__(self):
         return f'({self.left_node}, {self.op_tok}, {self.right_node})'
 
+    # Pickles the node as its constructor arguments.
+    def __reduce__(self):
+        return type(self), (self.left_node, self.op_tok, self.right_node)
+
 
 # Node to represent a unary operation (e.g., negation) in the AST.
-class UnaryOpNode:
+class UnaryOpNode(SpanNode):
+    __slots__ = ('op_tok', 'node', 'numeric')
+
     def __init__(self, op_tok, node):
         self.op_tok = op_tok  # The operator token.
         self.node = node    # The operand node.
-        self.pos_start = self.op_tok.pos_start  # Starting position of the unary operation.
-        self.pos_end = node.pos_end     # Ending position of the unary operation.
+        self.numeric = False    # Whether type inference proved the operand is a number.
+        self.start = op_tok.start   # Offset of the operator.
+        self.end = node.end     # Offset just past the operand.
+        self.src = op_tok.src
 
     # String representation of the unary operation node.
     def __repr__(self):
         return f'({self.op_tok}, {self.node})'
 
+    # Pickles the node as its constructor arguments.
+    def __reduce__(self):
+        return type(self), (self.op_tok, self.node)
+
 
 # Node to represent a return statement in the AST.
-class ReturnNode:
-    def __init__(self, node_to_return, pos_start, pos_end):
+class ReturnNode(SpanNode):
+    __slots__ = ('node_to_return',)
+
+    def __init__(self, node_to_return, start, end, src):
         self.node_to_return = node_to_return      # The node representing the value to return.
-        self.pos_start = pos_start   # Starting position of the return statement.
-        self.pos_end = pos_end   # Ending position of the return statement.
+        self.start = start   # Offset of the 'return' keyword.
+        self.end = end   # Offset where the return statement ends.
+        self.src = src
 
+    # Pickles the node as its constructor arguments.
+    def __reduce__(self):
+        return type(self), (self.node_to_return, self.start, self.end, self.src)
+
+
+# Base of the function and lambda definition nodes.
+class FunctionNode(SpanNode):
+    __slots__ = ('var_name_tok', 'arg_name_toks', 'body_node', 'should_auto_return', 'pure', 'memoize', 'frame_layout', 'escapes', 'prototype')
 
-# Node to represent a function definition in the AST.
-class FuncDefNode:
     def __init__(self, var_name_tok, arg_name_toks, body_node, should_auto_return):
-        self.var_name_tok = var_name_tok    # The token representing the function name.
+        self.var_name_tok = var_name_tok    # The token representing the function name (optional for lambdas).
         self.arg_name_toks = arg_name_toks  # List of tokens representing the argument names.
         self.body_node = body_node  # The body of the function.
-        self.should_auto_return = should_auto_return    # Whether the function should automatically return the result of its last statement.
-        # Determine the start position of the function definition.
+        self.should_auto_return = should_auto_return    # Whether the function should automatically return the result of its body.
+        self.pure = None    # Whether calling the function has no effects, or None until the purity pass ran.
+        self.memoize = False    # Whether the functions created from it remember their results, as a profile chose.
+        self.frame_layout = None    # Name -> slot of every name its calls bind, once resolved; None to bind them in a SymbolTable.
+        self.escapes = None     # Whether its values keep the context they are created in, or None until escape analysis ran.
+        self.prototype = None   # Value shared by the evaluations of a definition that does not escape, once it ran.
+        # Determine the start of the definition.
         if self.var_name_tok:
-            self.pos_start = self.var_name_tok.pos_start
+            self.start = self.var_name_tok.start
         elif len(self.arg_name_toks) > 0:
-            self.pos_start = self.arg_name_toks[0].pos_start
+            self.start = self.arg_name_toks[0].start
         else:
-            self.pos_start = self.body_node.pos_start
+            self.start = self.body_node.start
 
-        self.pos_end = self.body_node.pos_end
+        self.end = self.body_node.end
+        self.src = self.body_node.src
 
+    # Pickles the node as its constructor arguments.
+    def __reduce__(self):
+        return type(self), (self.var_name_tok, self.arg_name_toks, self.body_node, self.should_auto_return)
+
+
+# Node to represent a function definition in the AST.
+class FuncDefNode(FunctionNode):
+    __slots__ = ()
 
-# Node to represent a lambda function definition in the AST.
-class LambdaDefNode:
-    def __init__(self, var_name_tok, arg_name_toks, body_node, should_auto_return):
-        self.var_name_tok = var_name_tok  # The token representing the lambda function name (optional).
-        self.arg_name_toks = arg_name_toks  # List of tokens representing the argument names.
-        self.body_node = body_node  # The body of the lambda function.
-        self.should_auto_return = should_auto_return    # Whether the lambda function should automatically return the result of its body.
-        # Determine the start position of the lambda function definition.
-        if self.var_name_tok:
-            self.pos_start = self.var_name_tok.pos_start
-        elif len(self.arg_name_toks) > 0:
-            self.pos_start = self.arg_name_toks[0].pos_start
-        else:
-            self.pos_start = self.body_node.pos_start
 
-        self.pos_end = self.body_node.pos_end    # Ending position of the lambda function definition.
+# Node to represent a lambda function definition in the AST.
+class LambdaDefNode(FunctionNode):
+    __slots__ = ()
 
 
 # Node to represent a function call in the AST.
-class CallNode:
+class CallNode(SpanNode):
+    __slots__ = ('node_to_call', 'arg_nodes')
+
     def __init__(self, node_to_call, arg_nodes):
         self.node_to_call = node_to_call     # The node representing the function to be called.
         self.arg_nodes = arg_nodes  # List of nodes representing the arguments passed to the function.
-        self.pos_start = self.node_to_call.pos_start    # Starting position of the function call.
-        # Determine the ending position of the function call.
+        self.start = self.node_to_call.start    # Offset of the function call.
+        # Determine the end of the function call.
         if len(self.arg_nodes) > 0:
-            self.pos_end = self.arg_nodes[len(self.arg_nodes) - 1].pos_end
+            self.end = self.arg_nodes[len(self.arg_nodes) - 1].end
         else:
-            self.pos_end = self.node_to_call.pos_end
+            self.end = self.node_to_call.end
+        self.src = self.node_to_call.src
+
+    # Pickles the node as its constructor arguments.
+    def __reduce__(self):
+        return type(self), (self.node_to_call, self.arg_nodes)
 
 
 # PARSE RESULT
@@ -175,11 +269,54 @@ class ParseResult:
         return self
 
 
+# TOKEN STREAM
+# Pulls tokens lazily from any iterable and keeps only a small window of them.
+# Tokens behind the parser are dropped unless a speculative parse has pinned them with mark().
+class TokenStream:
+    TRIM_THRESHOLD = 64     # Number of consumed tokens kept before the buffer is trimmed.
+
+    def __init__(self, tokens):
+        self.source = iter(tokens)   # Where new tokens are pulled from.
+        self.buffer = []    # Tokens pulled but not yet dropped.
+        self.base = 0   # Stream index of buffer[0].
+        self.marks = []     # Stream indexes a caller may still rewind to.
+
+    # Returns the token at the given stream index, pulling more tokens when needed.
+    # Reading past the end keeps returning the last token (EOF).
+    def get(self, idx):
+        buffer = self.buffer
+        offset = idx - self.base
+        while offset >= len(buffer):
+            tok = next(self.source, None)
+            if tok is None:
+                return buffer[-1]
+            buffer.append(tok)
+
+        if offset > self.TRIM_THRESHOLD and not self.marks:
+            del buffer[:offset]
+            self.base = idx
+            offset = 0
+        return buffer[offset]
+
+    # Pins the stream at the given index so the parser can rewind to it.
+    def mark(self, idx):
+        self.marks.append(idx)
+
+    # Releases the most recent pin.
+    def unmark(self):
+        self.marks.pop()
+
+    # Pulls the remaining tokens without keeping them.
+    def drain(self):
+        for _ in self.source:
+            pass
+
+
 # PARSER ########
 # Main class to handle parsing of tokens into an abstract syntax tree (AST).
 class Parser:
     def __init__(self, tokens):
-        self.tokens = tokens     # List of tokens to be parsed.
+        self.tokens = tokens if isinstance(tokens, TokenStream) else TokenStream(tokens)     # Stream of tokens to be parsed.
         self.tok_idx = -1   # Current index of the token being processed.
         self.advance()   # Advance to the first token.
 
@@ -197,8 +334,8 @@ class Parser:
 
     # Update the current token based on the current index.
     def update_current_tok(self):
-        if self.tok_idx >= 0 & self.tok_idx < len(self.tokens):
-            self.current_tok = self.tokens[self.tok_idx]
+        if self.tok_idx >= 0:
+            self.current_tok = self.tokens.get(self.tok_idx)
 
     # Main parsing function to parse the tokens into statements.
     def parse(self):
@@ -212,7 +349,7 @@ class Parser:
     def statements(self):
         res = ParseResult()
         statements = []
-        pos_start = self.current_tok.pos_start.copy()
+        start_tok = self.current_tok
         # Skip newline tokens at the start
         while self.current_tok.type == TT_NEWLINE:
             res.register_advancement()
@@ -237,29 +374,33 @@ class Parser:
 
             if not more_statements:
                 break
-            # Parse additional statements
+            # Parse additional statements, keeping the tokens around in case the attempt is backed out
+            self.tokens.mark(self.tok_idx)
             statement = res.try_register(self.statement())
+            self.tokens.unmark()
             if not statement:
                 self.reverse(res.to_reverse_count)
                 more_statements = False
                 continue
             statements.append(statement)
 
-        return res.success(ListNode(statements, pos_start, self.current_tok.pos_end.copy()))
+        return res.success(ListNode(statements, start_tok.start, self.current_tok.end, start_tok.src))
 
     # Parses a single statement, including return statements and expressions.
     def statement(self):
         res = ParseResult()
-        pos_start = self.current_tok.pos_start.copy()
+        start_tok = self.current_tok
         # Handle 'return' statements
-        if self.current_tok.matches(TT_KEYWORD, 'return'):
+        if self.current_tok.type == TT_RETURN:
             res.register_advancement()
             self.advance()
 
+            self.tokens.mark(self.tok_idx)
             expr = res.try_register(self.expr())
+            self.tokens.unmark()
             if not expr:
                 self.reverse(res.to_reverse_count)
-            return res.success(ReturnNode(expr, pos_start, self.current_tok.pos_start.copy()))
+            return res.success(ReturnNode(expr, start_tok.start, self.current_tok.start, start_tok.src))
         # Parse a general expression statement
         expr = res.register(self.expr())
         if res.error:
@@ -270,7 +411,7 @@ class Parser:
     def func_def(self):
         res = ParseResult()
         # Check if the function definition starts with 'func'
-        if not self.current_tok.matches(TT_KEYWORD, 'func'):
+        if self.current_tok.type != TT_FUNC:
             return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end, f"Expected 'func'"))
 
         res.register_advancement()
@@ -337,7 +478,7 @@ class Parser:
         if res.error:
             return res
 
-        if not self.current_tok.matches(TT_KEYWORD, 'end'):
+        if self.current_tok.type != TT_END:
             return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end, f"Expected 'end'"))
 
         res.register_advancement()
@@ -349,7 +490,7 @@ class Parser:
     def lambda_def(self):
         res = ParseResult()
         # Check if the lambda definition starts with 'lambda'
-        if not self.current_tok.matches(TT_KEYWORD, 'lambda'):
+        if self.current_tok.type != TT_LAMBDA:
             return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end, f"Expected lambda"))
 
         res.register_advancement()
@@ -445,12 +586,12 @@ class Parser:
             else:
                 return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end, "Expected ')'"))
         # Parse function or lambda definitions
-        elif tok.matches(TT_KEYWORD, 'func'):
+        elif tok.type == TT_FUNC:
             func_def = res.register(self.func_def())
             if res.error:
                 return res
             return res.success(func_def)
-        elif tok.matches(TT_KEYWORD, 'lambda'):
+        elif tok.type == TT_LAMBDA:
             lambda_def = res.register(self.lambda_def())
             if res.error:
                 return res
@@ -528,7 +669,7 @@ class Parser:
     def comp_expr(self):
         res = ParseResult()
         # Parse unary 'not' operator
-        if self.current_tok.matches(TT_KEYWORD, 'not'):
+        if self.current_tok.type == TT_NOT:
             op_tok = self.current_tok
             res.register_advancement()
             self.advance()
@@ -548,7 +689,7 @@ class Parser:
     def expr(self):
         res = ParseResult()
         # Parse logical 'and' and 'or' operations
-        node = res.register(self.bin_op(self.comp_expr, ((TT_KEYWORD, 'and'), (TT_KEYWORD, 'or'))))
+        node = res.register(self.bin_op(self.comp_expr, (TT_AND, TT_OR)))
         if res.error:
             return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end, "Expected  int, 'func', '+', '-', '(' or 'not'"))
 
@@ -567,7 +708,7 @@ class Parser:
         if res.error:
             return res
         # Parse binary operations
-        while self.current_tok.type in ops or (self.current_tok.type, self.current_tok.value) in ops:
+        while self.current_tok.type in ops:
             op_tok = self.current_tok
             res.register_advancement()
             self.advance()
@@ -577,3 +718,20 @@ class Parser:
             left = BinOpNode(left, op_tok, right)
 
         return res.success(left)
+
+
+
+# Lexes and parses a program, streaming the tokens into the given parser class. Returns the AST and the error, if any.
+# Character errors anywhere in the text take precedence over syntax errors.
+def parse_program(fn, text, parser_class=Parser):
+    lexer = Lexer(fn, text)
+    parser = parser_class(lexer.iter_tokens())
+    ast = parser.parse()
+
+    if ast.error:
+        parser.tokens.drain()
+    if lexer.error:
+        return None, lexer.error
+    if ast.error:
+        return None, ast.error
+    return ast.node, None
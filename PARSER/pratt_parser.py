@@ -0,0 +1,282 @@
+from PARSER.parser import *
+
+
+# Messages of the recursive-descent Parser for an expression that fails on its first token,
+# keyed by the grammar rule the expression started in.
+STATEMENT_EXPECTED = "Expected 'return', 'func', int, identifier, '+', '-', '(', '[' or 'not'"
+EXPR_EXPECTED = "Expected  int, 'func', '+', '-', '(' or 'not'"
+COMP_EXPECTED = "Expected int, '+', '-', '(' or 'not'"
+ATOM_EXPECTED = "Expected int,'lambda', 'func', '+', '-', '('"
+CALL_EXPECTED = "Expected ')', 'if','func', int, identifier, '+', '-', '(' or 'not'"
+OPERATOR_EXPECTED = "Expected '+', '-', '*', '/', '%', '==', '!=', '<', '>', <=', '>=', 'and' or 'or'"
+
+# Binding power of every binary operator; all of them are left associative.
+PRECEDENCE = {
+    TT_AND: 1, TT_OR: 1,
+    TT_EQ: 2, TT_NE: 2, TT_LT: 2, TT_GT: 2, TT_LTE: 2, TT_GTE: 2,
+    TT_PLUS: 3, TT_MINUS: 3,
+    TT_MUL: 4, TT_DIV: 4, TT_MODULO: 4,
+}
+# Binding power of the 'not' prefix, which takes a whole comparison.
+NOT_PRECEDENCE = 2
+
+# FIRST sets used to predict which rule comes next.
+EXPR_FIRST = {TT_NOT, TT_PLUS, TT_MINUS, TT_INT, TT_STRING, TT_STR, TT_BOOL, TT_LPAREN, TT_FUNC, TT_LAMBDA}
+STATEMENT_FIRST = EXPR_FIRST | {TT_RETURN}
+
+
+# PRATT PARSER ########
+# Predictive parser producing the same AST as Parser. Statements are chosen from FIRST sets and binary
+# operators are parsed by precedence climbing, so it never rewinds and builds no ParseResult per rule.
+# Rules return their node, or None after recording the first error in self.error.
+class PrattParser:
+    def __init__(self, tokens):
+        self.tokens = tokens if isinstance(tokens, TokenStream) else TokenStream(tokens)     # Stream of tokens to be parsed.
+        self.next_token = self.tokens.source.__next__   # Pulls the next token; no lookahead buffer is needed.
+        self.error = None   # First error found.
+        self.current_tok = None
+        self.advance()
+
+    # Advance to the next token. Reading past the end keeps the last token (EOF).
+    def advance(self):
+        try:
+            self.current_tok = self.next_token()
+        except StopIteration:
+            pass
+        return self.current_tok
+
+    # Records a syntax error at the given token and returns None.
+    def fail(self, tok, details):
+        if self.error is None:
+            self.error = InvalidSyntaxError(tok.pos_start, tok.pos_end, details)
+        return None
+
+    # Main parsing function to parse the tokens into statements.
+    def parse(self):
+        res = ParseResult()
+        node = self.statements(OPERATOR_EXPECTED)
+        if node is None:
+            return res.failure(self.error)
+        if self.current_tok.type != TT_EOF:
+            return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end, OPERATOR_EXPECTED))
+        return res.success(node)
+
+    # Parses a sequence of statements separated by newlines.
+    # end_expected is the error the caller reports when a later statement does not parse; Parser
+    # backs out of such a statement and fails on its first token, so the same error is reported here.
+    def statements(self, end_expected):
+        statements = []
+        first_tok = self.current_tok
+        while self.current_tok.type == TT_NEWLINE:
+            self.advance()
+
+        statement = self.statement(end_expected)
+        if statement is None:
+            return None
+        statements.append(statement)
+
+        while self.current_tok.type == TT_NEWLINE:
+            while self.current_tok.type == TT_NEWLINE:
+                self.advance()
+            if self.current_tok.type not in STATEMENT_FIRST:
+                break
+
+            start_tok = self.current_tok
+            statement = self.statement(end_expected)
+            if statement is None:
+                # A return statement has already reported where Parser would stop
+                if start_tok.type != TT_RETURN:
+                    self.error = InvalidSyntaxError(start_tok.pos_start, start_tok.pos_end, end_expected)
+                return None
+            statements.append(statement)
+
+        return ListNode(statements, first_tok.start, self.current_tok.end, first_tok.src)
+
+    # Parses a single statement, including return statements and expressions.
+    def statement(self, end_expected):
+        tok = self.current_tok
+        if tok.type != TT_RETURN:
+            return self.expr(STATEMENT_EXPECTED)
+
+        self.advance()
+        expr = None
+        if self.current_tok.type in EXPR_FIRST:
+            # Parser backs out of a return value that does not parse and fails right after 'return'
+            expr_tok = self.current_tok
+            expr = self.expr(EXPR_EXPECTED)
+            if expr is None:
+                self.error = InvalidSyntaxError(expr_tok.pos_start, expr_tok.pos_end, end_expected)
+                return None
+        return ReturnNode(expr, tok.start, self.current_tok.start, tok.src)
+
+    # Parses an expression; first_expected is the error for a first token that cannot start one.
+    def expr(self, first_expected):
+        return self.binary(1, first_expected)
+
+    # Parses binary operators binding at least as tightly as min_precedence by precedence climbing.
+    def binary(self, min_precedence, first_expected):
+        tok = self.current_tok
+        if tok.type == TT_NOT and min_precedence <= NOT_PRECEDENCE:
+            self.advance()
+            node = self.binary(NOT_PRECEDENCE, COMP_EXPECTED)
+            if node is None:
+                return None
+            left = UnaryOpNode(tok, node)
+        else:
+            left = self.factor(first_expected)
+            if left is None:
+                return None
+
+        while True:
+            op_tok = self.current_tok
+            precedence = PRECEDENCE.get(op_tok.type)
+            if precedence is None or precedence < min_precedence:
+                return left
+            self.advance()
+            right = self.binary(precedence + 1, COMP_EXPECTED if precedence == 1 else ATOM_EXPECTED)
+            if right is None:
+                return None
+            left = BinOpNode(left, op_tok, right)
+
+    # Parses unary '+' and '-' applied to a factor, or a call.
+    def factor(self, first_expected):
+        tok = self.current_tok
+        if tok.type == TT_PLUS or tok.type == TT_MINUS:
+            self.advance()
+            factor = self.factor(ATOM_EXPECTED)
+            if factor is None:
+                return None
+            return UnaryOpNode(tok, factor)
+        return self.call(first_expected)
+
+    # Parses an atom, optionally followed by a parenthesized argument list.
+    def call(self, first_expected):
+        atom = self.atom(first_expected)
+        if atom is None or self.current_tok.type != TT_LPAREN:
+            return atom
+
+        self.advance()
+        arg_nodes = []
+        if self.current_tok.type == TT_RPAREN:
+            self.advance()
+            return CallNode(atom, arg_nodes)
+
+        arg = self.expr(CALL_EXPECTED)
+        if arg is None:
+            return None
+        arg_nodes.append(arg)
+        while self.current_tok.type == TT_COMMA:
+            self.advance()
+            arg = self.expr(EXPR_EXPECTED)
+            if arg is None:
+                return None
+            arg_nodes.append(arg)
+
+        if self.current_tok.type != TT_RPAREN:
+            return self.fail(self.current_tok, "Expected ',' or ')'")
+        self.advance()
+        return CallNode(atom, arg_nodes)
+
+    # Parses literals, variable access, parenthesized expressions and function or lambda definitions.
+    def atom(self, first_expected):
+        tok = self.current_tok
+        tok_type = tok.type
+        if tok_type == TT_INT:
+            self.advance()
+            return NumberNode(tok)
+        elif tok_type == TT_STR:
+            self.advance()
+            return VarAccessNode(tok)
+        elif tok_type == TT_LPAREN:
+            self.advance()
+            expr = self.expr(EXPR_EXPECTED)
+            if expr is None:
+                return None
+            if self.current_tok.type != TT_RPAREN:
+                return self.fail(self.current_tok, "Expected ')'")
+            self.advance()
+            return expr
+        elif tok_type == TT_BOOL:
+            self.advance()
+            return BoolAccessNode(tok)
+        elif tok_type == TT_STRING:
+            self.advance()
+            return StringNode(tok)
+        elif tok_type == TT_FUNC:
+            return self.func_def()
+        elif tok_type == TT_LAMBDA:
+            return self.lambda_def()
+        return self.fail(tok, first_expected)
+
+    # Parses the optional name and the argument names of a function or lambda definition.
+    # Returns (var_name_tok, arg_name_toks), or None on an error.
+    def signature(self):
+        self.advance()
+        var_name_tok = None
+        if self.current_tok.type == TT_STR:
+            var_name_tok = self.current_tok
+            self.advance()
+            if self.current_tok.type != TT_LPAREN:
+                return self.fail(self.current_tok, "Expected '('")
+        elif self.current_tok.type != TT_LPAREN:
+            return self.fail(self.current_tok, "Expected identifier or '('")
+
+        self.advance()
+        arg_name_toks = []
+        if self.current_tok.type == TT_STR:
+            arg_name_toks.append(self.current_tok)
+            self.advance()
+            while self.current_tok.type == TT_COMMA:
+                self.advance()
+                if self.current_tok.type != TT_STR:
+                    return self.fail(self.current_tok, "Expected identifier")
+                arg_name_toks.append(self.current_tok)
+                self.advance()
+            if self.current_tok.type != TT_RPAREN:
+                return self.fail(self.current_tok, "Expected ',' or ')'")
+        elif self.current_tok.type != TT_RPAREN:
+            return self.fail(self.current_tok, "Expected identifier or ')'")
+
+        self.advance()
+        return var_name_tok, arg_name_toks
+
+    # Parses a function definition with an arrow body or a block body ending in 'end'.
+    def func_def(self):
+        signature = self.signature()
+        if signature is None:
+            return None
+        var_name_tok, arg_name_toks = signature
+
+        if self.current_tok.type == TT_ARROW:
+            self.advance()
+            body = self.expr(EXPR_EXPECTED)
+            if body is None:
+                return None
+            return FuncDefNode(var_name_tok, arg_name_toks, body, True)
+
+        if self.current_tok.type != TT_NEWLINE:
+            return self.fail(self.current_tok, "Expected '->' or NEWLINE")
+        self.advance()
+
+        body = self.statements("Expected 'end'")
+        if body is None:
+            return None
+        if self.current_tok.type != TT_END:
+            return self.fail(self.current_tok, "Expected 'end'")
+        self.advance()
+        return FuncDefNode(var_name_tok, arg_name_toks, body, False)
+
+    # Parses a lambda definition with a ':' body.
+    def lambda_def(self):
+        signature = self.signature()
+        if signature is None:
+            return None
+        var_name_tok, arg_name_toks = signature
+
+        if self.current_tok.type != TT_COLON:
+            return self.fail(self.current_tok, "Expected ':'")
+        self.advance()
+        body = self.expr(EXPR_EXPECTED)
+        if body is None:
+            return None
+        return LambdaDefNode(var_name_tok, arg_name_toks, body, True)
@@ -0,0 +1,227 @@
+from PARSER.pratt_parser import *
+
+
+# Kinds of the frames kept on the parser stack. Each frame waits for the node of the rule
+# parsed above it, except BEGIN_STATEMENTS, which asks for a block body to be started.
+BINARY = 0
+NOT = 1
+UNARY = 2
+CALL_CHECK = 3
+CALL_ARGS = 4
+PAREN = 5
+FUNC_ARROW = 6
+FUNC_BLOCK = 7
+LAMBDA = 8
+RETURN = 9
+STATEMENTS = 10
+BEGIN_STATEMENTS = 11
+
+
+# STACK PARSER ########
+# Parser that keeps pending rules on its own stack instead of the Python call stack, so the nesting
+# depth of parentheses, operators, calls and function bodies is only limited by memory.
+# It follows the same rules as PrattParser and produces the same AST and errors.
+class StackParser(PrattParser):
+    def __init__(self, tokens):
+        super().__init__(tokens)
+        self.stack = []     # Frames of the rules waiting for a node.
+
+    # Main parsing function to parse the tokens into statements.
+    def parse(self):
+        res = ParseResult()
+        stack = self.stack
+        node = self.begin_statements(OPERATOR_EXPECTED)
+        while True:
+            if node is None:
+                if self.error:
+                    return res.failure(self.unwind())
+                stack.pop()     # BEGIN_STATEMENTS
+                node = self.begin_statements("Expected 'end'")
+            elif stack:
+                node = self.resume(stack.pop(), node)
+            else:
+                break
+
+        if self.current_tok.type != TT_EOF:
+            return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end, OPERATOR_EXPECTED))
+        return res.success(node)
+
+    # Returns the error to report once a rule failed. Statements and return values that do not
+    # parse are backed out of by the enclosing rules, which then fail with their own error.
+    def unwind(self):
+        for frame in reversed(self.stack):
+            if frame[0] == STATEMENTS:
+                start_tok = frame[4]
+                if frame[2] and start_tok.type != TT_RETURN:
+                    self.error = InvalidSyntaxError(start_tok.pos_start, start_tok.pos_end, frame[1])
+            elif frame[0] == RETURN:
+                expr_tok = frame[2]
+                self.error = InvalidSyntaxError(expr_tok.pos_start, expr_tok.pos_end, frame[3])
+        self.stack.clear()
+        return self.error
+
+    # Starts a sequence of statements separated by newlines.
+    def begin_statements(self, end_expected):
+        start_tok = self.current_tok
+        while self.current_tok.type == TT_NEWLINE:
+            self.advance()
+        self.stack.append([STATEMENTS, end_expected, [], start_tok, self.current_tok])
+        return self.begin_statement(end_expected)
+
+    # Starts a single statement, including return statements and expressions.
+    def begin_statement(self, end_expected):
+        tok = self.current_tok
+        if tok.type != TT_RETURN:
+            return self.begin_expr(1, STATEMENT_EXPECTED)
+
+        self.advance()
+        if self.current_tok.type in EXPR_FIRST:
+            self.stack.append([RETURN, tok, self.current_tok, end_expected])
+            return self.begin_expr(1, EXPR_EXPECTED)
+        return ReturnNode(None, tok.start, self.current_tok.start, tok.src)
+
+    # Starts an expression whose binary operators bind at least as tightly as min_precedence.
+    # Pushes a frame for every prefix and every rule that encloses another expression, and returns
+    # the first atom, or None if the atom failed or a block body has to be started first.
+    def begin_expr(self, min_precedence, first_expected):
+        stack = self.stack
+        while True:
+            stack.append([BINARY, min_precedence, None, None])
+            tok = self.current_tok
+            if tok.type == TT_NOT and min_precedence <= NOT_PRECEDENCE:
+                stack.append([NOT, tok])
+                self.advance()
+                min_precedence, first_expected = NOT_PRECEDENCE, COMP_EXPECTED
+                continue
+
+            while tok.type == TT_PLUS or tok.type == TT_MINUS:
+                stack.append([UNARY, tok])
+                tok = self.advance()
+                first_expected = ATOM_EXPECTED
+
+            tok_type = tok.type
+            if tok_type == TT_INT:
+                self.advance()
+                atom = NumberNode(tok)
+            elif tok_type == TT_STR:
+                self.advance()
+                atom = VarAccessNode(tok)
+            elif tok_type == TT_BOOL:
+                self.advance()
+                atom = BoolAccessNode(tok)
+            elif tok_type == TT_STRING:
+                self.advance()
+                atom = StringNode(tok)
+            elif tok_type == TT_LPAREN:
+                self.advance()
+                stack.append([CALL_CHECK])
+                stack.append([PAREN])
+                min_precedence, first_expected = 1, EXPR_EXPECTED
+                continue
+            elif tok_type == TT_FUNC or tok_type == TT_LAMBDA:
+                signature = self.signature()
+                if signature is None:
+                    return None
+                stack.append([CALL_CHECK])
+                if tok_type == TT_LAMBDA:
+                    if self.current_tok.type != TT_COLON:
+                        return self.fail(self.current_tok, "Expected ':'")
+                    stack.append([LAMBDA, signature])
+                elif self.current_tok.type == TT_ARROW:
+                    stack.append([FUNC_ARROW, signature])
+                elif self.current_tok.type == TT_NEWLINE:
+                    self.advance()
+                    stack.append([FUNC_BLOCK, signature])
+                    stack.append([BEGIN_STATEMENTS])
+                    return None
+                else:
+                    return self.fail(self.current_tok, "Expected '->' or NEWLINE")
+                self.advance()
+                min_precedence, first_expected = 1, EXPR_EXPECTED
+                continue
+            else:
+                return self.fail(tok, first_expected)
+
+            if self.current_tok.type != TT_LPAREN:
+                return atom
+            self.advance()
+            if self.current_tok.type == TT_RPAREN:
+                self.advance()
+                return CallNode(atom, [])
+            stack.append([CALL_ARGS, atom, []])
+            min_precedence, first_expected = 1, CALL_EXPECTED
+
+    # Hands the node of a finished rule to the frame waiting for it.
+    # Returns the node the frame finishes in turn, or None like begin_expr.
+    def resume(self, frame, node):
+        kind = frame[0]
+        if kind == BINARY:
+            left = node if frame[2] is None else BinOpNode(frame[2], frame[3], node)
+            op_tok = self.current_tok
+            precedence = PRECEDENCE.get(op_tok.type)
+            if precedence is None or precedence < frame[1]:
+                return left
+            frame[2] = left
+            frame[3] = op_tok
+            self.stack.append(frame)
+            self.advance()
+            return self.begin_expr(precedence + 1, COMP_EXPECTED if precedence == 1 else ATOM_EXPECTED)
+
+        elif kind == NOT or kind == UNARY:
+            return UnaryOpNode(frame[1], node)
+
+        elif kind == CALL_CHECK:
+            if self.current_tok.type != TT_LPAREN:
+                return node
+            self.advance()
+            if self.current_tok.type == TT_RPAREN:
+                self.advance()
+                return CallNode(node, [])
+            self.stack.append([CALL_ARGS, node, []])
+            return self.begin_expr(1, CALL_EXPECTED)
+
+        elif kind == CALL_ARGS:
+            frame[2].append(node)
+            if self.current_tok.type == TT_COMMA:
+                self.advance()
+                self.stack.append(frame)
+                return self.begin_expr(1, EXPR_EXPECTED)
+            if self.current_tok.type != TT_RPAREN:
+                return self.fail(self.current_tok, "Expected ',' or ')'")
+            self.advance()
+            return CallNode(frame[1], frame[2])
+
+        elif kind == PAREN:
+            if self.current_tok.type != TT_RPAREN:
+                return self.fail(self.current_tok, "Expected ')'")
+            self.advance()
+            return node
+
+        elif kind == FUNC_ARROW:
+            var_name_tok, arg_name_toks = frame[1]
+            return FuncDefNode(var_name_tok, arg_name_toks, node, True)
+
+        elif kind == FUNC_BLOCK:
+            if self.current_tok.type != TT_END:
+                return self.fail(self.current_tok, "Expected 'end'")
+            self.advance()
+            var_name_tok, arg_name_toks = frame[1]
+            return FuncDefNode(var_name_tok, arg_name_toks, node, False)
+
+        elif kind == LAMBDA:
+            var_name_tok, arg_name_toks = frame[1]
+            return LambdaDefNode(var_name_tok, arg_name_toks, node, True)
+
+        elif kind == RETURN:
+            return ReturnNode(node, frame[1].start, self.current_tok.start, frame[1].src)
+
+        # STATEMENTS
+        frame[2].append(node)
+        if self.current_tok.type == TT_NEWLINE:
+            while self.current_tok.type == TT_NEWLINE:
+                self.advance()
+            if self.current_tok.type in STATEMENT_FIRST:
+                frame[4] = self.current_tok
+                self.stack.append(frame)
+                return self.begin_statement(frame[1])
+        return ListNode(frame[2], frame[3].start, self.current_tok.end, frame[3].src)
@@ -0,0 +1,83 @@
+from PARSER.parser import *
+from OPTIMIZER.type_inference import infer_types
+from multiprocessing import Pool
+import json
+import os
+import sys
+
+
+# Returns the report of an error found in a script.
+def error_entry(error):
+    return {
+        'type': type(error).__name__,
+        'name': error.error_name,
+        'details': error.details,
+        'line': error.pos_start.ln + 1,
+        'col': error.pos_start.col + 1,
+        'end_line': error.pos_end.ln + 1,
+        'end_col': error.pos_end.col + 1,
+    }
+
+
+# Checks the syntax of one script without running it, then the operations type inference finds
+# to fail whenever they run. Returns a report entry with the file name and the errors found; 'ok'
+# only depends on the syntax, and the type errors are listed separately.
+def check_file(fn):
+    try:
+        src = open_source(fn)
+    except OSError as e:
+        return {'file': fn, 'ok': False, 'error': {'type': type(e).__name__, 'name': 'Failed to load script', 'details': str(e)}}
+
+    # The report only keeps copies of the positions, so the source is closed once it is made
+    try:
+        ast, error = parse_program(fn, src)
+        if error:
+            return {'file': fn, 'ok': False, 'error': error_entry(error)}
+
+        _, report = infer_types(ast)
+        type_errors = [error_entry(error) for error in report['type_errors']]
+        return {'file': fn, 'ok': True, 'error': None, 'type_errors': type_errors}
+    finally:
+        src.close()
+
+
+# Expands directories into the '.lambda' files they contain, in a stable order.
+def collect_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                files.extend(os.path.join(root, name) for name in sorted(names) if name.endswith('.lambda'))
+        else:
+            files.append(path)
+    return files
+
+
+# Checks every script under the given files and directories across a pool of processes.
+# Returns the report entries in the order of the files.
+def check_paths(paths, processes=None):
+    files = collect_files(paths)
+    if processes == 1 or len(files) < 2:
+        return [check_file(fn) for fn in files]
+
+    with Pool(processes) as pool:
+        chunksize = max(1, len(files) // ((processes or os.cpu_count() or 1) * 8))
+        return pool.map(check_file, files, chunksize)
+
+
+# Usage: python check.py [-j PROCESSES] <file or directory>...
+# Prints a JSON report and exits with status 1 if any script has a syntax error. Type errors
+# are reported, but do not fail the check.
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    processes = None
+    if len(args) >= 2 and args[0] == '-j':
+        processes = int(args[1])
+        args = args[2:]
+
+    results = check_paths(args, processes)
+    failed = sum(1 for result in results if not result['ok'])
+    with_type_errors = sum(1 for result in results if result.get('type_errors'))
+    print(json.dumps({'files': len(results), 'failed': failed, 'with_type_errors': with_type_errors, 'results': results}, indent=2))
+    sys.exit(1 if failed else 0)
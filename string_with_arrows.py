@@ -1,16 +1,17 @@
+# Draws the source lines between two positions with arrows under the marked columns.
+# The lines come from the line index of the positions' source, so nothing is scanned.
 def string_with_arrows(text, pos_start, pos_end):
     result = ''
-
-    # Calculate indices
-    idx_start = max(text.rfind('\n', 0, pos_start.idx), 0)
-    idx_end = text.find('\n', idx_start + 1)
-    if idx_end < 0: idx_end = len(text)
+    src = pos_start.src
+    if src is None:
+        from ERRORS.errors import SourceText
+        src = SourceText(pos_start.fn, text)
 
     # Generate each line
     line_count = pos_end.ln - pos_start.ln + 1
     for i in range(line_count):
         # Calculate line columns
-        line = text[idx_start:idx_end]
+        line = src.line_text(pos_start.ln + i)
         col_start = pos_start.col if i == 0 else 0
         col_end = pos_end.col if i == line_count - 1 else len(line) - 1
 
@@ -18,9 +19,4 @@ def string_with_arrows(text, pos_start, pos_end):
         result += line + '\n'
         result += ' ' * col_start + '^' * (col_end - col_start)
 
-        # Re-calculate indices
-        idx_start = idx_end
-        idx_end = text.find('\n', idx_start + 1)
-        if idx_end < 0: idx_end = len(text)
-
-    return result.replace('\t', '')
\ No newline at end of file
+    return result.replace('\t', '')
@@ -0,0 +1,51 @@
+from INTERPRETER.Interpreter import run
+from LAXER.lexer import Token
+import contextlib
+import io
+
+
+# Returns a structure of nested lists and tuples that is equal for two ASTs exactly when they have
+# the same node classes, tokens and fields. Sources and the caches the interpreter fills are left out.
+def dump(node):
+    if isinstance(node, (list, tuple)):
+        return [dump(element) for element in node]
+    if isinstance(node, Token):
+        return node.type, node.value, node.pos_start.idx, node.pos_end.idx
+    slots = [name for cls in type(node).__mro__ for name in getattr(cls, '__slots__', ())]
+    if not slots:
+        return node
+    fields = [(name, dump(getattr(node, name, None))) for name in slots if name not in IGNORED_SLOTS]
+    return [type(node).__name__, node.pos_start.idx, node.pos_end.idx] + fields
+
+
+# Fields that do not describe the program itself. Offsets are compared through the positions
+# instead, as the nodes of an incrementally parsed document keep the offsets they were lexed at.
+IGNORED_SLOTS = {'src', 'quick', 'start', 'end'}
+
+
+# Programs the engines and passes must run like the tree-walking interpreter, errors included.
+PROGRAMS = [
+    'func add(a, b) -> a + b\nprint(add(4, 10))\nprint(add(add(10, 11), 12))\nadd("p", "q")',
+    'func fact(n) -> (n == 0) or (n * fact(n - 1))\nprint(fact(10))\nfact(5)',
+    'print((lambda(x, y) : x / y)(10, 5))\nprint((lambda(x, y) : x * y)(4, (lambda(x, y) : x + y)(3, 2)))',
+    'print(2 + 4 * 3 - 8 % 7)\nprint(2 == 4)\nprint(2 != 4)\nprint(2 <= 3)\nprint(true and false)\nprint(not true)\n1 > 0 or 5',
+    'func twice(f, x) -> f(f(x))\nfunc inc(x) -> x + 1\nprint(twice(inc, 3))\nprint(isFunc(inc))\nprint(isNum(inc))',
+    'func sum(n)\n  return (n == 0) or (n + sum(n - 1))\nend\nprint(sum(20))\nsum(3)',
+    'func half(x) -> x / 2\nfunc safe(x) -> half(x) + half(x + 1)\nprint(safe(4))\nsafe(1) / 0',
+    'func div(a, b) -> a / b\nfunc outer(a) -> div(a, 0) + 1\nouter(3)',
+    'func cat(a, b) -> a + b\nprint(cat("ab", "cd"))\ncat(1, "x")',
+    'func two(a, b) -> a\ntwo(1)',
+    'func two(a, b) -> a\ntwo(1, 2, 3)',
+    'func f(x) -> x + missing\nf(1)',
+    '"a" * 3\n"a" - 1',
+    'func mk(n) -> lambda(x) : x + n\nprint(isFunc(mk(2)))\n(lambda() : (lambda() : (undefinedname + 3))())()',
+    'func sq(x) -> x * x\nprint(sq(3) + sq(3))\nprint(sq(2) * sq(2) + sq(3) * sq(3))\n0 - sq(4)',
+]
+
+
+# Runs a program and returns what it printed, the repr of its values and its error message.
+def run_program(text, **options):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        value, error = run('<test>', text, use_cache=False, **options)
+    return output.getvalue(), repr(value), error.as_string() if error else None
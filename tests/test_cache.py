@@ -0,0 +1,90 @@
+from multiprocessing import Pool
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from PARSER import cache
+from PARSER.cache import cache_path, parse_cached
+from PARSER.parser import parse_program
+from tests.support import dump
+
+
+TEXT = 'func add(a, b) -> a + b\nprint(add(1, 2))'
+
+
+# Parses a script through the cache in a worker process and returns the dump of its AST.
+def parse_dump(fn):
+    node, error = parse_cached(fn, open(fn).read())
+    return error, dump(node)
+
+
+class CacheTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.fn = os.path.join(directory.name, 'script.lambda')
+        with open(self.fn, 'w') as f:
+            f.write(TEXT)
+
+    # Parses the script through the cache and returns its AST, error and the number of times it was parsed
+    def parse(self, text=TEXT):
+        with mock.patch.object(cache, 'parse_program', wraps=parse_program) as parse:
+            node, error = parse_cached(self.fn, text)
+        return node, error, parse.call_count
+
+    # The first run parses and stores the program; a warm start loads it without parsing
+    def test_hit(self):
+        node, _, parsed = self.parse()
+        self.assertEqual(parsed, 1)
+        self.assertTrue(os.path.isfile(cache_path(self.fn)))
+        cached, error, parsed = self.parse()
+        self.assertEqual((error, parsed), (None, 0))
+        self.assertEqual(dump(cached), dump(node))
+
+    # A loaded program refers to the source being run, so its positions read that text
+    def test_hit_source(self):
+        self.parse()
+        cached, _, _ = self.parse()
+        position = cached.element_nodes[1].pos_start
+        self.assertEqual((position.ln, position.col, position.ftxt), (1, 0, TEXT))
+
+    # Changing the text or the interpreter version misses the cache
+    def test_key(self):
+        self.parse()
+        _, _, parsed = self.parse(TEXT + '\nadd(3, 4)')
+        self.assertEqual(parsed, 1)
+        with mock.patch.object(cache, 'INTERPRETER_VERSION', 'other'):
+            _, _, parsed = self.parse()
+        self.assertEqual(parsed, 1)
+
+    # A damaged cache file is a miss, and is replaced
+    def test_corruption(self):
+        self.parse()
+        path = cache_path(self.fn)
+        for data in (b'', b'not a pickle', open(path, 'rb').read()[:40]):
+            with self.subTest(data=data):
+                with open(path, 'wb') as f:
+                    f.write(data)
+                node, error, parsed = self.parse()
+                self.assertEqual((error, parsed), (None, 1))
+                self.assertEqual(dump(node), dump(parse_program(self.fn, TEXT)[0]))
+                self.assertEqual(self.parse()[2], 0)
+
+    # Programs that fail to parse are not stored
+    def test_error(self):
+        _, error, _ = self.parse('print(1 +)')
+        self.assertIsNotNone(error)
+        self.assertFalse(os.path.exists(cache_path(self.fn)))
+
+    # Processes storing and loading the same script at once all get the program
+    def test_processes(self):
+        expected = (None, dump(parse_program(self.fn, TEXT)[0]))
+        with Pool(4) as pool:
+            for result in pool.map(parse_dump, [self.fn] * 64, 1):
+                self.assertEqual(result, expected)
+        self.assertEqual(os.listdir(os.path.dirname(cache_path(self.fn))), [os.path.basename(cache_path(self.fn))])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from check import check_paths
+
+
+# Scripts of the checked directory, by their path in it.
+SCRIPTS = {
+    'ok.lambda': 'print(1)\n',
+    'illegal.lambda': 'print(1 @ 2)',
+    os.path.join('sub', 'expected.lambda'): 'x ! 3',
+    os.path.join('sub', 'syntax.lambda'): 'print(1\n',
+    'notes.txt': 'print(',
+}
+
+
+class CheckTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        os.mkdir(os.path.join(self.directory, 'sub'))
+        for name, text in SCRIPTS.items():
+            with open(os.path.join(self.directory, name), 'w') as f:
+                f.write(text)
+
+    # Returns the report entry of a script of the directory
+    def entry(self, results, name):
+        return next(result for result in results if result['file'] == os.path.join(self.directory, name))
+
+    # Every '.lambda' file is checked without being run, and its syntax error is reported with its type and location
+    def test_report(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            results = check_paths([self.directory], processes=1)
+        self.assertEqual(output.getvalue(), '')
+        self.assertEqual(len(results), 4)
+        self.assertEqual(self.entry(results, 'ok.lambda'), {'file': os.path.join(self.directory, 'ok.lambda'), 'ok': True, 'error': None, 'type_errors': []})
+        self.assertEqual(self.entry(results, 'illegal.lambda')['error'], {
+            'type': 'IllegalCharError', 'name': 'Illegal Character', 'details': "'@'", 'line': 1, 'col': 9, 'end_line': 1, 'end_col': 10,
+        })
+        self.assertEqual(self.entry(results, os.path.join('sub', 'expected.lambda'))['error']['type'], 'ExpectedCharError')
+        self.assertEqual(self.entry(results, os.path.join('sub', 'syntax.lambda'))['error']['type'], 'InvalidSyntaxError')
+
+    # Files that cannot be loaded are reported as failed
+    def test_missing_file(self):
+        fn = os.path.join(self.directory, 'missing.lambda')
+        [result] = check_paths([fn])
+        self.assertEqual((result['file'], result['ok'], result['error']['type']), (fn, False, 'FileNotFoundError'))
+
+    # A pool of processes gives the same report, in the same order, as a single process
+    def test_pool(self):
+        paths = [self.directory, os.path.join(self.directory, 'missing.lambda')]
+        self.assertEqual(check_paths(paths, processes=2), check_paths(paths, processes=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+
+from tests.support import PROGRAMS, run_program
+
+
+class ClosureCompilerTest(unittest.TestCase):
+    # Every program prints, returns and fails like it does on the tree-walking interpreter
+    def test_matches_tree(self):
+        for text in PROGRAMS:
+            with self.subTest(text=text):
+                self.assertEqual(run_program(text, engine='closure'), run_program(text))
+
+    # The passes closures are compiled after keep the results and errors
+    def test_matches_tree_after_passes(self):
+        for text in PROGRAMS:
+            with self.subTest(text=text):
+                self.assertEqual(run_program(text, engine='closure', optimize=('constant-fold', 'types', 'resolve')), run_program(text))
+
+    # Programs with nodes closures cannot be made for are walked instead
+    def test_passes_adding_nodes(self):
+        for optimize in (('inline',), ('hash-cons',), ('inline', 'hash-cons')):
+            for text in PROGRAMS:
+                with self.subTest(text=text, optimize=optimize):
+                    self.assertEqual(run_program(text, engine='closure', optimize=optimize), run_program(text))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+from OPTIMIZER.constant_folding import fold_constants
+from OPTIMIZER.nodes import ConstantNode
+from PARSER.parser import parse_program
+from tests.support import PROGRAMS, run_program
+
+
+# Programs with constant expressions, including ones that fail.
+CONSTANT_PROGRAMS = [
+    'print(2 + 4)\nprint(10 / 2)\nprint(not (1 < 2) or true and false)\nprint("ab" + "c")',
+    '(1 + 2) / (3 - 3)',
+    'print(1 + 1)\n"a" - (2 * 2)',
+    '1 / 0 or 5',
+    'true or (1 / 0)',
+    '1 - (true + "x")',
+]
+
+
+class ConstantFoldingTest(unittest.TestCase):
+    # Every program prints, returns and fails like it does without the pass
+    def test_matches_tree(self):
+        for text in PROGRAMS + CONSTANT_PROGRAMS:
+            with self.subTest(text=text):
+                self.assertEqual(run_program(text, optimize=('constant-fold',)), run_program(text))
+
+    # Constant operators and boolean literals become constants, and the report counts them
+    def test_folds(self):
+        node, _ = parse_program('<t>', 'print(2 + 4)\n(10 / 2) * 3\ntrue and not false')
+        node, report = fold_constants(node)
+        self.assertIsInstance(node.element_nodes[0].arg_nodes[0], ConstantNode)
+        self.assertEqual([type(element) for element in node.element_nodes[1:]], [ConstantNode, ConstantNode])
+        self.assertEqual((node.element_nodes[1].value, node.element_nodes[2].value), (15.0, 1))
+        self.assertEqual(report, {'pass': 'constant-fold', 'folded_operations': 5, 'resolved_booleans': 2})
+
+    # A division by a folded zero is kept, and its error points at the whole divisor
+    def test_division_by_zero_position(self):
+        self.assertEqual(run_program('(1 + 2) / (3 - 3)', optimize=('constant-fold',)), ('', 'None', (
+            'Traceback (most recent call last):\n'
+            '  File <test>, line 1, in <program>\n'
+            'Runtime Error: Division by zero\n\n'
+            '(1 + 2) / (3 - 3)\n'
+            '           ^^^^^'
+        )))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+
+from INTERPRETER.Interpreter import run
+from tests.support import run_program
+
+
+class DeadCodeTest(unittest.TestCase):
+    # A definition the program does not read stays for the programs run after it
+    def test_definition_read_by_a_later_run(self):
+        _, error = run('<stdin>', 'func sq(a) -> a * a', use_cache=False, optimize=('dead-code',))
+        self.assertIsNone(error)
+        self.assertEqual(run_program('print(sq(3))'), ('9\n', '[0]', None))
+
+    # A library keeps its helpers when it is run directly
+    def test_library(self):
+        with tempfile.TemporaryDirectory() as directory:
+            fn = os.path.join(directory, 'lib.lambda')
+            with open(fn, 'w') as f:
+                f.write('func double(x) -> x * 2\nfunc quad(x) -> double(double(x))')
+            reports = []
+            _, error = run(fn, open(fn).read(), use_cache=False, optimize=('dead-code',), reports=reports)
+        self.assertIsNone(error)
+        self.assertEqual(reports[0]['removed'], [])
+        self.assertEqual(run_program('print(quad(3))'), ('12\n', '[0]', None))
+
+    # Unused definitions of block bodies and statements without effect are removed and reported,
+    # and the effectful statements still run in order
+    def test_removals(self):
+        text = 'func outer(x)\n  func unused(y) -> y\n  x + 1\n  print(x)\n  return x\nend\n3\nprint(outer(5))\nprint("done")'
+        reports = []
+        self.assertEqual(run_program(text, optimize=('types', 'dead-code'), reports=reports), ('5\n5\ndone\n', '[<function outer>, 0, 0]', None))
+        self.assertEqual(reports[1]['removed'], [
+            "<test>:2: unused function 'unused'",
+            '<test>:3: statement without effect',
+            '<test>:7: statement without effect',
+        ])
+        self.assertEqual(reports[1]['removed_definitions'], 1)
+        self.assertEqual(reports[1]['removed_statements'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
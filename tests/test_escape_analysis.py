@@ -0,0 +1,42 @@
+import gc
+import unittest
+from unittest import mock
+
+from INTERPRETER.Interpreter import Context, Lambda
+from tests.support import PROGRAMS, run_program
+
+
+# A program with a lambda that escapes, as the operand of an operator.
+ESCAPING = 'func mk(n) -> lambda(x) : x + n\nprint(isFunc(mk(2)))\nfunc g(f) -> (lambda(x) : x) + f\ng(1)'
+
+
+class EscapeAnalysisTest(unittest.TestCase):
+    # Every program prints, returns and fails like it does without the pass
+    def test_matches_tree(self):
+        for text in PROGRAMS + [ESCAPING]:
+            with self.subTest(text=text):
+                self.assertEqual(run_program(text, optimize=('escape',)), run_program(text))
+
+    # A lambda that does not escape is created once instead of on every evaluation
+    def test_shared_lambda(self):
+        text = 'func apply(n) -> (lambda(x) : x + 1)(n)\nprint(apply(1))\nprint(apply(2))\nprint(apply(3))'
+        reports = []
+        with mock.patch.object(Lambda, '__init__', autospec=True, side_effect=Lambda.__init__) as init:
+            self.assertEqual(run_program(text, optimize=('escape',), reports=reports), ('2\n3\n4\n', '[<function apply>, 0, 0, 0]', None))
+        self.assertEqual(init.call_count, 1)
+        self.assertEqual(reports, [{'pass': 'escape', 'shared_definitions': 2, 'escaping_definitions': 0}])
+
+    # The frames of calls are freed when they return, without waiting for the garbage collector
+    def test_frames_freed(self):
+        gc.collect()
+        gc.disable()
+        try:
+            self.assertEqual(run_program('func sum(n) -> (n == 0) or (n + sum(n - 1))\nprint(sum(40))', optimize=('escape',)), ('821\n', '[<function sum>, 0]', None))
+            frames = [obj for obj in gc.get_objects() if type(obj) is Context and obj.display_name == 'sum']
+        finally:
+            gc.enable()
+        self.assertEqual(frames, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
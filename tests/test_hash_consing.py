@@ -0,0 +1,31 @@
+import unittest
+
+from tests.support import PROGRAMS, run_program
+
+
+REPEATED = 'func f(a, b) -> (a * b + 1) * (a * b + 1) - (a * b)\nprint(f(3, 4))\nprint((2 + 5) * (2 + 5))'
+
+
+class HashConsingTest(unittest.TestCase):
+    # Every program prints, returns and fails like it does without the pass
+    def test_matches_tree(self):
+        for text in PROGRAMS:
+            with self.subTest(text=text):
+                self.assertEqual(run_program(text, optimize=('hash-cons',)), run_program(text))
+
+    # Repeated subtrees are shared and repeated subexpressions reused, and the report counts both
+    def test_report(self):
+        reports = []
+        self.assertEqual(run_program(REPEATED, optimize=('hash-cons',), reports=reports), ('157\n49\n', '[<function f>, 0, 0]', None))
+        self.assertEqual(reports, [{'pass': 'hash-cons', 'nodes': 39, 'nodes_removed': 8, 'reused_subexpressions': 2}])
+
+    # An error on a reused value points where it does without the pass
+    def test_error_position(self):
+        text = 'func g(a) -> (a - a) + 1 / (a - a)\ng(2)'
+        _, _, error = run_program(text, optimize=('hash-cons',))
+        self.assertEqual(error, run_program(text)[2])
+        self.assertTrue(error.endswith('Runtime Error: Division by zero\n\nfunc g(a) -> (a - a) + 1 / (a - a)\n                            ^^^^^'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import random
+import unittest
+
+from PARSER.incremental import IncrementalDocument
+from PARSER.parser import parse_program
+from tests.support import dump
+
+
+# Pieces of source the random edits insert, including ones that fail to tokenize or parse.
+PIECES = ['func f(a, b) -> a + b\n', 'print(f(1, 2))\n', '3 + 3\n', '->', '3', '\n', ' ', '(', ')',
+          'func g(x)\n', 'return x * 2\n', 'end\n', '"s"', '"', '}', '!', '=', 'lambda(y) : y', ',', 'not ', '-']
+
+
+class IncrementalDocumentTest(unittest.TestCase):
+    # Checks that the document parses to the same AST or error as the full parser does on its text
+    def assert_matches_full_parse(self, doc):
+        res = doc.parse()
+        node, error = parse_program('<t>', doc.text)
+        if error or res.error:
+            self.assertEqual(res.error and res.error.as_string(), error and error.as_string(), repr(doc.text))
+        else:
+            self.assertEqual(dump(res.node.element_nodes), dump(node.element_nodes), repr(doc.text))
+
+    # Removing the statement an error was found in also removes the error
+    def test_deleted_error_chunk(self):
+        doc = IncrementalDocument('<t>', 'print(f(1,2))\n3+3\n->3')
+        for edit in [(18, 20, 'func f(a,b) -> a+b\nprint(f(1,2))\n'), (44, 50, ''), (34, 44, '')]:
+            doc.edit(*edit)
+            self.assert_matches_full_parse(doc)
+        self.assertIsNone(doc.parse().error)
+
+    def test_random_edits(self):
+        for seed in range(300):
+            rng = random.Random(seed)
+            doc = IncrementalDocument('<t>', ''.join(rng.choice(PIECES) for _ in range(10)))
+            for _ in range(15):
+                start = rng.randint(0, len(doc.text))
+                end = rng.randint(start, min(len(doc.text), start + 20))
+                doc.edit(start, end, ''.join(rng.choice(PIECES) for _ in range(rng.randint(0, 2))))
+                self.assert_matches_full_parse(doc)
+
+
+if __name__ == '__main__':
+    unittest.main()
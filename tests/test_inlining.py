@@ -0,0 +1,46 @@
+import unittest
+
+from OPTIMIZER.inlining import inline_functions
+from OPTIMIZER.nodes import InlineCallNode
+from PARSER.parser import CallNode, parse_program
+from tests.support import PROGRAMS, run_program
+
+
+class InliningTest(unittest.TestCase):
+    # Every program prints, returns and fails like it does without the pass
+    def test_matches_tree(self):
+        for text in PROGRAMS:
+            with self.subTest(text=text):
+                self.assertEqual(run_program(text, optimize=('inline',)), run_program(text))
+
+    # Calls of small arrow functions are inlined; recursive ones and calls with the wrong number of arguments are not
+    def test_inlined_calls(self):
+        node, _ = parse_program('<t>', 'func add(a, b) -> a + b\nfunc fact(n) -> (n == 0) or (n * fact(n - 1))\nadd(1, 2)\nadd(1)\nfact(3)')
+        node, report = inline_functions(node)
+        self.assertEqual([type(element) for element in node.element_nodes[2:]], [InlineCallNode, CallNode, CallNode])
+        self.assertEqual(report, {'pass': 'inline', 'inlined_functions': 1, 'inlined_calls': 1})
+
+    # An error in an inlined body is reported with the traceback of the call
+    def test_traceback(self):
+        self.assertEqual(run_program('func half(x) -> x / 0\nprint(1)\nprint(half(3))', optimize=('inline',)), ('1\n', 'None', (
+            'Traceback (most recent call last):\n'
+            '  File <test>, line 3, in <program>\n'
+            '  File <test>, line 1, in half\n'
+            'Runtime Error: Division by zero\n\n'
+            'func half(x) -> x / 0\n'
+            '                    ^'
+        )))
+
+    # A call through a name bound to another function when it runs calls that function
+    def test_rebound_name(self):
+        text = 'func add(a, b) -> a + b\nfunc apply(add) -> add(1, 2)\nprint(apply(lambda(a, b) : a * b))\nprint(add(2, 3))'
+        self.assertEqual(run_program(text, optimize=('inline',)), ('2\n5\n', '[<function add>, <function apply>, 0, 0]', None))
+
+    # Names an inlined body reads that are not its arguments are still looked up where the call runs
+    def test_dynamic_names(self):
+        text = 'func f(x) -> x + y\nfunc g(y) -> f(1)\nprint(g(5))'
+        self.assertEqual(run_program(text, optimize=('inline',)), ('6\n', '[<function f>, <function g>, 0]', None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import pickle
+import sys
+import unittest
+
+from ERRORS.errors import ExpectedCharError, IllegalCharError, SourceText
+from LAXER.lexer import KEYWORDS, TT_AND, TT_BOOL, TT_FUNC, TT_RETURN, TT_STR, Lexer, Token
+
+
+TEXT = 'func add(a, b) -> a + b\n# comment\nprint(add(1, 22)) "s"'
+
+
+# Returns the kind, value and offsets of every token of a text.
+def tokens_of(text):
+    tokens, error = Lexer('<t>', text).make_tokens()
+    assert error is None, error.as_string()
+    return [(tok.type, tok.value, tok.start, tok.end) for tok in tokens]
+
+
+class LexerTest(unittest.TestCase):
+    # Tokens keep the offsets of their text, and comments and blanks make no tokens
+    def test_offsets(self):
+        tokens, error = Lexer('<t>', TEXT).make_tokens()
+        self.assertIsNone(error)
+        self.assertEqual(repr(tokens), '[KEYWORD:func, STR:add, LPAREN, STR:a, COMMA, STR:b, RPAREN, ARROW, STR:a, PLUS, STR:b, NEWLINE, '
+                                       'STR:print, LPAREN, STR:add, LPAREN, INT:1, COMMA, INT:22, RPAREN, RPAREN, STRING:s, EOF]')
+        for tok in tokens[:-1]:
+            with self.subTest(tok=tok):
+                self.assertEqual(TEXT[tok.start:tok.end].strip('"'), str(tok.value or TEXT[tok.start:tok.end]))
+
+    # Lines and columns are looked up from the offsets when a position is read
+    def test_positions(self):
+        tokens, _ = Lexer('<t>', TEXT).make_tokens()
+        pos_start, pos_end = tokens[18].pos_start, tokens[18].pos_end
+        self.assertEqual((tokens[18].value, pos_start.idx, pos_start.ln, pos_start.col), (22, 47, 2, 13))
+        self.assertEqual((pos_end.idx, pos_end.ln, pos_end.col), (49, 2, 15))
+        self.assertEqual((pos_start.fn, pos_start.ftxt), ('<t>', TEXT))
+
+    # Text held as bytes, as memory-mapped files are, gives the same tokens
+    def test_bytes(self):
+        self.assertEqual(tokens_of(TEXT.encode()), tokens_of(TEXT))
+        self.assertEqual(tokens_of(SourceText('<t>', TEXT.encode())), tokens_of(TEXT))
+
+    # A character no token starts with stops the lexer with an error pointing at it
+    def test_illegal_character(self):
+        tokens, error = Lexer('<t>', 'a\n  b @').make_tokens()
+        self.assertEqual(tokens, [])
+        self.assertIsInstance(error, IllegalCharError)
+        self.assertEqual(error.as_string(), "Illegal Character: '@'\nFile <t>, line 2\n\n\n  b @\n    ^")
+
+    # A lone '!' or '=' asks for the '=' that should follow it
+    def test_expected_character(self):
+        _, error = Lexer('<t>', 'a ! b').make_tokens()
+        self.assertIsInstance(error, ExpectedCharError)
+        self.assertEqual(error.as_string(), "Expected Character: '=' (after '!')\nFile <t>, line 1\n\na ! b\n  ^^")
+
+
+class TokenTest(unittest.TestCase):
+    # Tokens have no instance dictionary
+    def test_slots(self):
+        self.assertFalse(hasattr(Token(TT_STR, 'a'), '__dict__'))
+
+    # Every keyword lexes to its own kind, and boolean literals to TT_BOOL
+    def test_keyword_kinds(self):
+        self.assertEqual(len(set(KEYWORDS.values())), len(KEYWORDS))
+        for word, kind in KEYWORDS.items():
+            with self.subTest(word=word):
+                self.assertEqual(tokens_of(word)[0][:2], (kind, word))
+        self.assertEqual([tok[0] for tok in tokens_of('func and return true false')[:-1]], [TT_FUNC, TT_AND, TT_RETURN, TT_BOOL, TT_BOOL])
+
+    # Identifiers are interned, so equal names are the same string object
+    def test_interned_identifiers(self):
+        name = ''.join(['some', 'Name'])
+        tokens = tokens_of('someName + someName')
+        self.assertIs(tokens[0][1], tokens[2][1])
+        self.assertIs(tokens[0][1], sys.intern(name))
+
+    # Tokens pickle as their kind, value and offsets
+    def test_pickle(self):
+        tokens, _ = Lexer('<t>', 'a + 12').make_tokens()
+        copy = pickle.loads(pickle.dumps(tokens))
+        self.assertEqual([(tok.type, tok.value, tok.start, tok.end) for tok in copy], tokens_of('a + 12'))
+        self.assertEqual(copy[2].pos_start.col, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import pickle
+import unittest
+
+from ERRORS.errors import OffsetPosition
+from PARSER.parser import SpanNode, TokenNode, parse_program
+from tests.support import PROGRAMS, dump
+
+
+# Yields a node and every node below it.
+def walk(node):
+    yield node
+    for name in [name for cls in type(node).__mro__ for name in getattr(cls, '__slots__', ())]:
+        value = getattr(node, name, None)
+        for child in value if isinstance(value, list) else [value]:
+            if isinstance(child, (TokenNode, SpanNode)):
+                yield from walk(child)
+
+
+class NodesTest(unittest.TestCase):
+    # No node has an instance dictionary
+    def test_slots(self):
+        for text in PROGRAMS:
+            node, _ = parse_program('<t>', text)
+            for child in walk(node):
+                with self.subTest(text=text, node=type(child).__name__):
+                    self.assertFalse(hasattr(child, '__dict__'))
+
+    # Nodes keep offsets, and their positions are only made when read
+    def test_positions(self):
+        node, _ = parse_program('<t>', 'func add(a, b) -> a + b\n\nprint(add(1, 2 * 3))')
+        bin_op = node.element_nodes[1].arg_nodes[0].arg_nodes[1]
+        self.assertEqual((type(bin_op).__name__, bin_op.start, bin_op.end), ('BinOpNode', 38, 43))
+        self.assertIsInstance(bin_op.pos_start, OffsetPosition)
+        self.assertEqual((bin_op.pos_start.ln, bin_op.pos_start.col, bin_op.pos_end.ln, bin_op.pos_end.col), (2, 13, 2, 18))
+
+    # Pickled nodes load as the same tree
+    def test_pickle(self):
+        for text in PROGRAMS:
+            with self.subTest(text=text):
+                node, _ = parse_program('<t>', text)
+                self.assertEqual(dump(pickle.loads(pickle.dumps(node))), dump(node))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+
+from PARSER.parser import Parser, parse_program
+from PARSER.pratt_parser import PrattParser
+from PARSER.stack_parser import StackParser
+from tests.support import PROGRAMS, dump, run_program
+
+
+# Programs every parser must reject with the same error.
+INVALID = [
+    'print(1 +)',
+    'func f(a b) -> a',
+    'func f(a,) -> a',
+    'lambda(x) x',
+    '1 2',
+    'func f(x)\n  return x\n',
+    '(1 + 2',
+    'f(1,',
+    'not',
+    '-(-1) * +2 - not 3 < 4 and 1 or 0',
+    'h(x)(1, 2)',
+]
+
+# More programs with operators of every precedence, which every parser must accept.
+VALID = [
+    'func (a) -> a',
+    '1 == 2 == 3',
+    'return',
+    '-(-1) * +2 - (not 3 < 4) and 1 or 0 % 7 >= 2 != 1',
+    'func g(x)\n  func h(y) -> y\n\n  return h((lambda() : x)())\nend\n\nprint(g(1))',
+]
+
+
+class ParsersTest(unittest.TestCase):
+    # The recursive, Pratt and stack parsers build the same AST, or fail with the same error
+    def test_equivalence(self):
+        for text in PROGRAMS + INVALID + VALID:
+            results = []
+            for parser_class in (Parser, PrattParser, StackParser):
+                node, error = parse_program('<t>', text, parser_class)
+                results.append(error.as_string() if error else dump(node))
+            with self.subTest(text=text):
+                self.assertEqual(results[1], results[0])
+                self.assertEqual(results[2], results[0])
+                self.assertEqual(isinstance(results[0], str), text in INVALID)
+
+    # The stack parser does not use Python's stack, so it takes nesting far deeper than the recursion limit
+    def test_deep_nesting(self):
+        text = 'print(' + '(' * 100000 + '1' + ')' * 100000 + ')'
+        self.assertEqual(run_program(text, parser='stack'), ('1\n', '[0]', None))
+        _, error = parse_program('<t>', '(' * 100000 + '1', StackParser)
+        self.assertTrue(error.as_string().startswith("Invalid Syntax: Expected ')'"))
+
+    # A program nested too deeply to evaluate fails with a runtime error instead of crashing
+    def test_too_deep_to_evaluate(self):
+        _, _, error = run_program('1 + ' * 100000 + '1', parser='stack')
+        self.assertTrue(error.startswith('Traceback (most recent call last):\n  File <test>, line 1, in <program>\n'
+                                         'Runtime Error: Maximum nesting depth exceeded'))
+
+
+if __name__ == '__main__':
+    unittest.main()
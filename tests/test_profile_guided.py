@@ -0,0 +1,65 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from INTERPRETER.Interpreter import run
+from OPTIMIZER.profile_guided import profile_path
+
+
+TEXT = '''func sq(x) -> x * x
+func never(x) -> x + 1
+func rep(n) -> (n == 0) or (sq(3) + rep(n - 1))
+print(rep(50))
+print(rep(50))
+print(rep(50))
+print(sq(3) + sq(4))'''
+
+
+class ProfileGuidedTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.fn = os.path.join(directory.name, 'script.lambda')
+        with open(self.fn, 'w') as f:
+            f.write(TEXT)
+
+    # Runs the script and returns what it printed, the repr of its values and the reports of its passes
+    def run_script(self, text=TEXT, **options):
+        reports = []
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            value, error = run(self.fn, text, use_cache=False, reports=reports, **options)
+        self.assertIsNone(error)
+        return output.getvalue(), repr(value), reports
+
+    # A profiling run stores what it counted, keyed by source position
+    def test_record(self):
+        self.assertEqual(self.run_script(profile=True), ('451\n451\n451\n25\n', '[<function sq>, <function never>, <function rep>, 0, 0, 0, 0]', []))
+        with open(profile_path(self.fn)) as f:
+            profile = json.load(f)
+        self.assertEqual(profile['calls']['79:88'], 150)
+        self.assertEqual(profile['functions']['14:19'], [152, 2])
+        self.assertEqual(profile['operands']['83:88'], [150, 0])
+        self.assertEqual(profile['branches']['59:88'], [3, 150])
+
+    # A later run uses the profile to inline the calls that ran, specialize operators and memoize
+    # hot functions, and prints the same
+    def test_apply(self):
+        self.run_script(profile=True)
+        output, value, reports = self.run_script(optimize=('pgo',))
+        self.assertEqual((output, value), ('451\n451\n451\n25\n', '[<function sq>, <function never>, <function rep>, 0, 0, 0, 0]'))
+        self.assertEqual(reports, [{'pass': 'pgo', 'profile': True, 'inlined_calls': 3, 'specialized_operations': 9, 'memoized_functions': 2}])
+
+    # Without a profile, or with one recorded for another text, the pass changes nothing
+    def test_missing_or_stale(self):
+        unchanged = {'pass': 'pgo', 'profile': False, 'inlined_calls': 0, 'specialized_operations': 0, 'memoized_functions': 0}
+        self.assertEqual(self.run_script(optimize=('pgo',))[2], [unchanged])
+        self.run_script(profile=True)
+        self.assertEqual(self.run_script(TEXT + '\nprint(1)', optimize=('pgo',))[2], [unchanged])
+
+
+if __name__ == '__main__':
+    unittest.main()
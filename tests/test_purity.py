@@ -0,0 +1,24 @@
+import unittest
+
+from INTERPRETER.Interpreter import run, global_symbol_table
+
+
+class PurityAcrossRunsTest(unittest.TestCase):
+    # A function bound by an earlier run may be effectful, so calling it is not pure
+    def test_function_of_an_earlier_run(self):
+        _, error = run('<stdin>', 'func p(x) -> print(x)', use_cache=False)
+        self.assertIsNone(error)
+        _, error = run('<stdin>', 'func q(x) -> p(x)', use_cache=False, optimize=('purity',))
+        self.assertIsNone(error)
+        self.assertFalse(global_symbol_table.get('q').pure)
+
+    # Functions calling only pure built-ins and each other stay pure
+    def test_pure_program(self):
+        _, error = run('<stdin>', 'func a(x) -> isNum(x)\nfunc b(x) -> a(x) + 1', use_cache=False, optimize=('purity',))
+        self.assertIsNone(error)
+        self.assertTrue(global_symbol_table.get('a').pure)
+        self.assertTrue(global_symbol_table.get('b').pure)
+
+
+if __name__ == '__main__':
+    unittest.main()
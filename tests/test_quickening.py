@@ -0,0 +1,50 @@
+import unittest
+
+from INTERPRETER.Interpreter import Interpreter, global_symbol_table
+from tests.support import run_program
+
+
+class QuickeningTest(unittest.TestCase):
+    # Returns the name of the visit method the body of a global function was specialized to
+    def quick_name(self, name):
+        quick = global_symbol_table.get(name).body_node.quick
+        return quick and quick.__name__
+
+    # A binary operation is specialized to the operand types of its first evaluation
+    def test_specializes(self):
+        self.assertEqual(run_program('func add(a, b) -> a + b\nfunc half(x) -> x / 2\nfunc div(a, b) -> a / b\nfunc cat(a, b) -> a + b\n'
+                                     'print(add(1, 2))\nprint(half(4))\nprint(div(6, 3))\nprint(cat("a", "b"))')[0], '3\n2.0\n2.0\nab\n')
+        self.assertEqual([self.quick_name(name) for name in ('add', 'half', 'div', 'cat')], [
+            'visit_quick_number_BinOpNode', 'visit_quick_constant_BinOpNode', 'visit_quick_divide_BinOpNode', 'visit_quick_concat_BinOpNode',
+        ])
+
+    # When the operands no longer fit the specialization, the node goes back to the generic operation
+    # and keeps giving the results of the unspecialized interpreter
+    def test_deoptimizes(self):
+        self.assertEqual(run_program('func inc(a) -> a * 2\nprint(inc(1))\nprint(inc("s"))\nprint(inc(3))'), ('2\nss\n6\n', '[<function inc>, 0, 0, 0]', None))
+        self.assertEqual(self.quick_name('inc'), 'visit_generic_BinOpNode')
+
+    # Errors of specialized operations and of the operations that fail their guard are the usual ones
+    def test_errors(self):
+        self.assertEqual(run_program('func d(a, b) -> a / b\nprint(d(1, 2))\nd(1, 0)'), ('0.5\n', 'None', (
+            'Traceback (most recent call last):\n'
+            '  File <test>, line 3, in <program>\n'
+            '  File <test>, line 1, in d\n'
+            'Runtime Error: Division by zero\n\n'
+            'func d(a, b) -> a / b\n'
+            '                    ^'
+        )))
+        _, _, error = run_program('func c(a, b) -> a + b\nprint(c("a", "b"))\nc("a", 1)')
+        self.assertTrue(error.endswith('Runtime Error: Illegal operation\n\nfunc c(a, b) -> a + b\n                ^^^^^'))
+        self.assertEqual(self.quick_name('c'), 'visit_generic_BinOpNode')
+
+    # Profiled runs count every operation, so they do not specialize
+    def test_profile(self):
+        outer_profile = Interpreter.profile
+        self.assertEqual(run_program('func add(a, b) -> a + b\nprint(add(1, 2))', profile=True)[0], '3\n')
+        self.assertIsNone(self.quick_name('add'))
+        self.assertIs(Interpreter.profile, outer_profile)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+from unittest import mock
+
+from INTERPRETER.Interpreter import SymbolTable
+from OPTIMIZER.resolver import GLOBAL_ADDRESS, resolve_names
+from PARSER.parser import parse_program
+from tests.support import PROGRAMS, run_program
+
+
+DYNAMIC = 'func f(x) -> x + y\nfunc g(y) -> f(1) + PI * 0\nfunc h(a)\n  func k(b) -> a + b\n  return k(a)\nend\nprint(g(5))\nprint(h(2))'
+
+
+class ResolverTest(unittest.TestCase):
+    # Every program prints, returns and fails like it does without the pass
+    def test_matches_tree(self):
+        for text in PROGRAMS + [DYNAMIC]:
+            with self.subTest(text=text):
+                self.assertEqual(run_program(text, optimize=('resolve',)), run_program(text))
+
+    # Functions get frame layouts, names bound in the frame they are read in get its slot, names no
+    # function binds are globals, and names bound by the callers are still looked up
+    def test_addresses(self):
+        node, _ = parse_program('<t>', DYNAMIC)
+        node, report = resolve_names(node)
+        f, _, h = node.element_nodes[:3]
+        self.assertEqual((f.frame_layout, h.frame_layout), ({'x': 0}, {'a': 0, 'k': 1}))
+        self.assertEqual((f.body_node.left_node.address, f.body_node.right_node.address), (0, None))
+        self.assertEqual(node.element_nodes[3].node_to_call.address, GLOBAL_ADDRESS)
+        self.assertEqual(report, {'pass': 'resolve', 'frames': 4, 'local_reads': 4, 'global_reads': 6, 'dynamic_reads': 2})
+
+    # Resolved reads do not walk the symbol tables, however deep the recursion
+    def test_lookups_independent_of_depth(self):
+        lookups = []
+        for n in (20, 40):
+            with mock.patch.object(SymbolTable, 'get', autospec=True, side_effect=SymbolTable.get) as get:
+                run_program(f'func sum(n) -> (n == 0) or (n + sum(n - 1))\nprint(sum({n}))', optimize=('resolve',))
+            lookups.append(get.call_count)
+        self.assertEqual(lookups[0], lookups[1])
+
+    # A program that may call run() is left unresolved
+    def test_run(self):
+        node, _ = parse_program('<t>', 'func f(x) -> run\nprint(1)')
+        _, report = resolve_names(node)
+        self.assertEqual(report, {'pass': 'resolve', 'frames': 0, 'local_reads': 0, 'global_reads': 0, 'dynamic_reads': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
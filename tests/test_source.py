@@ -0,0 +1,77 @@
+import contextlib
+import io
+import mmap
+import os
+import tempfile
+import unittest
+
+from ERRORS import errors
+from ERRORS.errors import SourceText, open_source
+from INTERPRETER.Interpreter import run
+
+
+class SourceTextTest(unittest.TestCase):
+    # Lines and columns come from the line-start index, which is built once
+    def test_locate(self):
+        src = SourceText('<t>', 'ab\ncdé\n\nx')
+        position = src.locate(6)
+        self.assertEqual((position.idx, position.ln, position.col, position.src), (6, 1, 3, src))
+        self.assertEqual(src.line_starts, [0, 3, 7, 8])
+        self.assertEqual(src.locate(9).ln, 3)
+
+    # Columns count characters when the text is held as bytes
+    def test_locate_bytes(self):
+        position = SourceText('<t>', 'ab\ncdé\n\nx'.encode()).locate(7)
+        self.assertEqual((position.ln, position.col), (1, 3))
+
+    # Lines are returned as errors print them, and lines past the end are empty
+    def test_line_text(self):
+        src = SourceText('<t>', 'ab\ncd\n\nx')
+        self.assertEqual([src.line_text(ln) for ln in range(5)], ['ab', '\ncd', '\n', '\nx', ''])
+
+
+class OpenSourceTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.fn = os.path.join(directory.name, 'script.lambda')
+        with open(self.fn, 'w') as f:
+            f.write('func f(x) -> x / 0\nprint(1)\nf(2)')
+
+    # Uses a memory-mapping threshold for the rest of the test
+    def set_threshold(self, threshold):
+        outer_threshold = errors.MMAP_THRESHOLD
+        errors.MMAP_THRESHOLD = threshold
+        self.addCleanup(setattr, errors, 'MMAP_THRESHOLD', outer_threshold)
+
+    # Files smaller than the threshold are read into memory
+    def test_small_file(self):
+        self.assertIsInstance(open_source(self.fn).text, bytes)
+
+    # Bigger files are memory-mapped until the source is closed
+    def test_mapped_file(self):
+        self.set_threshold(0)
+        src = open_source(self.fn)
+        self.assertIsInstance(src.text, mmap.mmap)
+        src.close()
+        self.assertTrue(src.text.closed)
+
+    # Errors in a mapped script print its lines in the traceback
+    def test_error_in_mapped_file(self):
+        self.set_threshold(0)
+        src = open_source(self.fn)
+        self.addCleanup(src.close)
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, error = run(self.fn, src, use_cache=False)
+        self.assertEqual(error.as_string(), (
+            'Traceback (most recent call last):\n'
+            f'  File {self.fn}, line 3, in <program>\n'
+            f'  File {self.fn}, line 1, in f\n'
+            'Runtime Error: Division by zero\n\n'
+            'func f(x) -> x / 0\n'
+            '                 ^'
+        ))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+from tests.support import run_program
+
+
+LOOP = 'func loop(n) -> (n == 0) or loop(n - 1)\n'
+
+
+class TailCallTest(unittest.TestCase):
+    # A loop of tail calls runs for a million iterations without Python's stack
+    def test_million_iterations(self):
+        self.assertEqual(run_program(LOOP + 'print(loop(1000000))'), ('1\n', '[<function loop>, 0]', None))
+
+    # The compiled engines walk programs making tail calls, so loops of them run there too
+    def test_compiled_engines(self):
+        for engine in ('vm', 'closure', 'python', 'tiered'):
+            with self.subTest(engine=engine):
+                self.assertEqual(run_program(LOOP + 'print(loop(5000))', engine=engine), ('1\n', '[<function loop>, 0]', None))
+
+    # Calls that are not in tail position take as few Python frames as before tail calls were made
+    # without the stack, so recursion goes as deep under the same recursion limit
+    def test_recursion_depth(self):
+        text = 'func sum(n) -> (n == 0) or (n + sum(n - 1))\nprint(sum(100))\nprint(sum(100))'
+        self.assertEqual(run_program(text), ('5051\n5051\n', '[<function sum>, 0, 0]', None))
+
+    # Tracebacks keep the callers of tail calls
+    def test_traceback(self):
+        _, _, error = run_program('func f(a) -> g(a)\nfunc g(a) -> a / 0\nf(1)')
+        self.assertEqual(error, 'Traceback (most recent call last):\n'
+                                '  File <test>, line 3, in <program>\n'
+                                '  File <test>, line 1, in f\n'
+                                '  File <test>, line 2, in g\n'
+                                'Runtime Error: Division by zero\n\n\n'
+                                'func g(a) -> a / 0\n'
+                                '                 ^')
+
+    # Results of tail calls still finish the 'and' and 'or' operations around them
+    def test_pending_operations(self):
+        text = 'func even(n) -> (n == 0) or ((n == 1) and 0) or odd(n - 1)\nfunc odd(n) -> (n != 0) and even(n - 1)\nprint(even(10))\nprint(odd(7))\nprint(even(7))'
+        self.assertEqual(run_program(text), run_program(text, optimize=('inline',)))
+        self.assertEqual(run_program(text)[0], '1\n1\n0\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,25 @@
+import unittest
+
+from tests.support import PROGRAMS, run_program
+
+
+class TiersTest(unittest.TestCase):
+    # Compiling every function on its first call keeps the results and errors
+    def test_matches_tree(self):
+        for text in PROGRAMS:
+            with self.subTest(text=text):
+                self.assertEqual(run_program(text, engine='tiered', tier_threshold=1), run_program(text))
+
+    # A hot function gives the same results once it is compiled
+    def test_hot_function(self):
+        text = 'func fact(n) -> (n == 0) or (n * fact(n - 1))\nprint(fact(20))'
+        self.assertEqual(run_program(text, engine='tiered', tier_threshold=5), run_program(text))
+
+    # A loop of tail calls stays walked, so it does not use Python's stack once it is hot
+    def test_tail_calls(self):
+        text = 'func loop(n) -> (n == 0) or loop(n - 1)\nprint(loop(5000))'
+        self.assertEqual(run_program(text, engine='tiered'), ('1\n', '[<function loop>, 0]', None))
+
+
+if __name__ == '__main__':
+    unittest.main()
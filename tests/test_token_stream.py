@@ -0,0 +1,54 @@
+import unittest
+
+from LAXER.lexer import Lexer
+from PARSER.parser import Parser, TokenStream
+from tests.support import dump, run_program
+
+
+class TokenStreamTest(unittest.TestCase):
+    # Parses a text through a stream and returns the result, the number of tokens the lexer made
+    # and the largest number of tokens the stream held while it pulled them
+    def parse_streamed(self, text):
+        lexer = Lexer('<t>', text)
+        sizes = []
+
+        def tokens():
+            for tok in lexer.iter_tokens():
+                sizes.append(len(stream.buffer))
+                yield tok
+
+        stream = TokenStream(tokens())
+        res = Parser(stream).parse()
+        return res, len(sizes), max(sizes)
+
+    # The parser pulls tokens as it goes instead of waiting for the whole text to be lexed:
+    # starting it takes only the first of the 5001 tokens
+    def test_lazy(self):
+        tokens = Lexer('<t>', 'print(1)\n' * 1000).iter_tokens()
+        Parser(TokenStream(tokens))
+        self.assertEqual(len(list(tokens)), 5000)
+
+    # The buffer stays small however long the program is, for top-level statements and block bodies alike
+    def test_bounded_buffer(self):
+        for text in ('func f(a, b) -> a + b\n' + 'print(f(1, 2))\n' * 5000,
+                     'func g(x)\n' + '  print(x + 1)\n' * 5000 + 'end\ng(1)'):
+            with self.subTest(text=text[:10]):
+                res, pulled, held = self.parse_streamed(text)
+                self.assertIsNone(res.error)
+                self.assertGreater(pulled, 30000)
+                self.assertLess(held, 100)
+
+    # Streaming gives the same AST as parsing the full token list
+    def test_same_ast(self):
+        text = 'func g(x)\n  print(x + 1)\n  return x\nend\nfunc f(a) -> g(a) * 2\nprint((lambda(y) : y - 1)(f(3)))'
+        tokens, _ = Lexer('<t>', text).make_tokens()
+        res, _, _ = self.parse_streamed(text)
+        self.assertEqual(dump(res.node), dump(Parser(tokens).parse().node))
+
+    # An illegal character after a syntax error is still the error reported
+    def test_character_error_first(self):
+        self.assertEqual(run_program('print(1 +)\n@'), ('', 'None', "Illegal Character: '@'\nFile <test>, line 2\n\n\n@\n^"))
+
+
+if __name__ == '__main__':
+    unittest.main()
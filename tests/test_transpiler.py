@@ -0,0 +1,54 @@
+import re
+import unittest
+
+from COMPILER.transpiler import transpile
+from PARSER.parser import parse_program
+from tests.support import PROGRAMS, run_program
+
+
+class TranspilerTest(unittest.TestCase):
+    # Every program prints, returns and fails like it does on the tree-walking interpreter
+    def test_matches_tree(self):
+        for text in PROGRAMS:
+            with self.subTest(text=text):
+                self.assertEqual(run_program(text, engine='python'), run_program(text))
+
+    # The passes the program is transpiled after keep the results and errors
+    def test_matches_tree_after_passes(self):
+        for text in PROGRAMS:
+            with self.subTest(text=text):
+                self.assertEqual(run_program(text, engine='python', optimize=('constant-fold', 'types', 'resolve')), run_program(text))
+
+    # Programs with nodes the transpiler has no code for are walked instead
+    def test_passes_adding_nodes(self):
+        for optimize in (('inline',), ('hash-cons',), ('inline', 'hash-cons')):
+            for text in PROGRAMS:
+                with self.subTest(text=text, optimize=optimize):
+                    self.assertEqual(run_program(text, engine='python', optimize=optimize), run_program(text))
+
+    # Every line of the source that names a position of the script maps back to that position
+    def test_source_map(self):
+        for text in PROGRAMS:
+            ast, error = parse_program('<test>', text)
+            self.assertIsNone(error)
+            _, transpiled = transpile('<test>', ast)
+            for lineno, line in enumerate(transpiled.source.splitlines(), 1):
+                match = re.search(r'# (\d+):(\d+)$', line)
+                if match:
+                    pos = transpiled.original_position(lineno)
+                    self.assertEqual((pos.ln + 1, pos.col + 1), (int(match[1]), int(match[2])), line)
+
+    # Errors raised in the source are reported at the script's position, with its traceback
+    def test_error_position(self):
+        _, _, error = run_program('func div(a, b) -> a / b\nfunc outer(a) -> div(a, 0) + 1\nouter(3)', engine='python')
+        self.assertEqual(error, 'Traceback (most recent call last):\n'
+                                '  File <test>, line 3, in <program>\n'
+                                '  File <test>, line 2, in outer\n'
+                                '  File <test>, line 1, in div\n'
+                                'Runtime Error: Division by zero\n\n'
+                                'func div(a, b) -> a / b\n'
+                                '                      ^')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+from ERRORS.errors import StaticTypeError
+from OPTIMIZER.type_inference import infer_types
+from PARSER.parser import parse_program
+from check import check_file
+from tests.support import PROGRAMS, run_program
+
+
+FACT = 'func fact(n) -> (n == 0) or (n * fact(n - 1))\nprint(fact(5))'
+
+
+# Returns the AST of a program after type inference and the report of the pass.
+def infer(text):
+    node, _ = parse_program('<t>', text)
+    return infer_types(node)
+
+
+class TypeInferenceTest(unittest.TestCase):
+    # Every program prints, returns and fails like it does without the pass
+    def test_matches_tree(self):
+        for text in PROGRAMS:
+            with self.subTest(text=text):
+                self.assertEqual(run_program(text, optimize=('types',)), run_program(text))
+
+    # Operators only ever given numbers are marked, and the others are not
+    def test_numeric(self):
+        node, report = infer(FACT)
+        body = node.element_nodes[0].body_node
+        self.assertEqual((body.numeric, body.left_node.numeric, body.right_node.numeric), (True, True, True))
+        self.assertEqual(report['numeric_operations'], 4)
+        self.assertEqual(run_program(FACT, optimize=('types',)), ('120\n', '[<function fact>, 0]', None))
+
+        node, report = infer('func cat(a, b) -> a + b\nprint(cat(1, 2))\nprint(cat("a", "b"))')
+        self.assertFalse(node.element_nodes[0].body_node.numeric)
+        self.assertEqual(report['numeric_operations'], 0)
+
+    # Operators whose operands can never be operated on are reported before the program runs,
+    # where the interpreter would fail on them
+    def test_type_errors(self):
+        _, report = infer('print(1)\nprint(1 + "a")')
+        [error] = report['type_errors']
+        self.assertIsInstance(error, StaticTypeError)
+        self.assertEqual(error.as_string(), 'Type Error: Illegal operation between number and string\nFile <t>, line 2\n\n\nprint(1 + "a")\n      ^^^^^^^')
+        self.assertEqual(infer('func f(x) -> x * 2\nprint(f(3))\nf("s") - 1')[1]['type_errors'], [])
+
+    # The check lists the type errors of a script that parses, without failing it
+    def test_check(self):
+        with tempfile.TemporaryDirectory() as directory:
+            fn = os.path.join(directory, 'script.lambda')
+            with open(fn, 'w') as f:
+                f.write('print(1)\nprint(1 + "a")')
+            result = check_file(fn)
+        self.assertEqual((result['ok'], result['error']), (True, None))
+        self.assertEqual(result['type_errors'], [{
+            'type': 'StaticTypeError', 'name': 'Type Error', 'details': 'Illegal operation between number and string',
+            'line': 2, 'col': 7, 'end_line': 2, 'end_col': 14,
+        }])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from COMPILER import vm
+from tests.support import PROGRAMS, run_program
+
+
+SUM = 'func sum(n) -> (n == 0) or (n + sum(n - 1))\nprint(sum(100000))'
+
+
+class VirtualMachineTest(unittest.TestCase):
+    # Every program prints, returns and fails like it does on the tree-walking interpreter
+    def test_matches_tree(self):
+        for text in PROGRAMS:
+            with self.subTest(text=text):
+                self.assertEqual(run_program(text, engine='vm'), run_program(text))
+
+    # The passes the machine runs after keep the results and errors
+    def test_matches_tree_after_passes(self):
+        for text in PROGRAMS:
+            with self.subTest(text=text):
+                self.assertEqual(run_program(text, engine='vm', optimize=('constant-fold', 'types', 'resolve')), run_program(text))
+
+    # Programs with nodes the machine has no code for are walked instead
+    def test_passes_adding_nodes(self):
+        for optimize in (('inline',), ('hash-cons',), ('inline', 'hash-cons')):
+            for text in PROGRAMS:
+                with self.subTest(text=text, optimize=optimize):
+                    self.assertEqual(run_program(text, engine='vm', optimize=optimize), run_program(text))
+
+    # Functions of earlier programs with nodes the machine has no code for only make the programs
+    # that call them walked
+    def test_earlier_functions_adding_nodes(self):
+        run_program('func half(x) -> x / 2\nfunc safe(x) -> half(x) + half(x + 1)', optimize=('inline',))
+        self.assertEqual(run_program('print(safe(4))', engine='vm'), ('4.5\n', '[0]', None))
+        self.assertEqual(run_program(SUM, engine='vm'), ('5000050001\n', '[<function sum>, 0]', None))
+
+    # Calls do not use Python's stack, so recursion is not limited by it
+    def test_deep_recursion(self):
+        self.assertEqual(run_program(SUM, engine='vm'), ('5000050001\n', '[<function sum>, 0]', None))
+
+    # A call depth limit stops deeper recursion with a runtime error
+    def test_call_depth_limit(self):
+        outer_max_depth = vm.MAX_CALL_DEPTH
+        vm.MAX_CALL_DEPTH = 1000
+        try:
+            _, _, error = run_program(SUM, engine='vm')
+        finally:
+            vm.MAX_CALL_DEPTH = outer_max_depth
+        self.assertIn('Runtime Error: Maximum nesting depth exceeded', error)
+
+
+if __name__ == '__main__':
+    unittest.main()